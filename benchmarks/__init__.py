@@ -0,0 +1,9 @@
+"""
+Benchmarks for orgpy, using synthetic org files (see 'benchmarks.generate').
+
+These are not installed with the package. Run them from the top-level
+directory of the repository; for example,
+
+    python3 -m benchmarks --sizes 1KB 1MB 10MB --json results.json
+    python3 -m benchmarks.bench_tokenizer --size 20MB
+"""
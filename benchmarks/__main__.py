@@ -0,0 +1,124 @@
+"""
+Time each stage of 'orgTreeFromFile' on synthetic org files.
+
+For each size, org files and a 'vimrc' are generated in a temporary directory,
+and the stages (reading the config, parsing, filtering, sorting or building
+the agenda, colorizing, and printing) are timed separately with
+'orgpy.timings'. The best time of '--repeat' runs is kept for each stage.
+The results can be saved as JSON, to compare runs across commits.
+
+    python3 -m benchmarks --sizes 1KB 100KB 1MB 10MB --json results.json
+    python3 -m benchmarks --sizes 1MB --agenda --num_days 30 --json -
+"""
+import io
+import os
+import sys
+import json
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+
+from orgpy import timings
+from orgpy.tree import orgTreeFromFile
+from .generate import add_arguments, generator_options, make_org_text, parse_size, write_vimrc
+
+stages = ['config', 'load', 'filter', 'sort', 'colorize', 'print']
+
+def run_stages(rcfile, **kwargs):
+    """Run 'orgTreeFromFile' once (discarding the output), with timings.
+
+    Returns:
+        A tuple with a dict of the time of each stage (in seconds), and a
+        dict of the counters (see 'orgpy.timings')
+    """
+    timings.enable(regex=False)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            orgTreeFromFile(rcfile=rcfile, file=None, **kwargs)
+        return dict(timings.times), dict(timings.counters)
+    finally:
+        timings.disable()
+
+def git_commit():
+    """Return the current git commit of the repository, if available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_size, nargs='+',
+                        default=[parse_size('100KB'), parse_size('1MB')],
+                        help='Total size(s) of the generated org files (e.g., 1KB, 10MB)')
+    parser.add_argument('--files', type=int, default=4,
+                        help='Number of org files to split each size across')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of runs for each size (the best time is kept)')
+    parser.add_argument('--json', metavar='FILE', default=None,
+                        help='Save the results as JSON ("-" for stdout)')
+    parser.add_argument('-c', '--colors', action='store_true', help='Colorize the output')
+    parser.add_argument('-a', '--agenda', action='store_true', help='Build the agenda')
+    parser.add_argument('-n', '--num_days', type=int, default=7, help='Days in the agenda')
+    parser.add_argument('-s', '--states', default=None, help='Filter by state(s)')
+    parser.add_argument('-t', '--tags', default=None, help='Filter by tag(s)')
+    parser.add_argument('-g', '--categories', default=None, help='Filter by category')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    cli = {'colors': args.colors, 'agenda': args.agenda, 'num_days': args.num_days,
+           'states': args.states, 'tags': args.tags, 'categories': args.categories,
+           'cache': False, 'jobs': 1}
+    results = []
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for size in args.sizes:
+            orgfiles = []
+            for i in range(args.files):
+                orgfiles.append(os.path.join(tmpdir, 'file%i.org' % i))
+                with open(orgfiles[-1], 'w') as f:
+                    f.write(make_org_text(size / args.files, seed=args.seed + i,
+                                          **generator_options(args)))
+            rcfile = os.path.join(tmpdir, 'vimrc')
+            write_vimrc(rcfile, orgfiles)
+
+            best = dict.fromkeys(stages, float('inf'))
+            for _ in range(args.repeat):
+                times, counters = run_stages(rcfile, **cli)
+                best = {k: min(best[k], times.get(k, 0.0)) for k in stages}
+            results.append({'size': size, 'files': args.files, 'counters': counters,
+                            'stages': best, 'total': sum(best.values())})
+
+            if args.json != '-':
+                print('%10s  %8i tasks  ' % ('%.0f KB' % (size / 1e3), counters['tasks created']) +
+                      '  '.join('%s %.4f' % (k, best[k]) for k in stages) +
+                      '  total %.4f s' % results[-1]['total'])
+    finally:
+        shutil.rmtree(tmpdir)
+
+    if args.json:
+        output = {
+            'commit': git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'options': vars(args),
+            'results': results,
+        }
+        if args.json == '-':
+            json.dump(output, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, 'w') as f:
+                json.dump(output, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare building the agenda with an 'AgendaIndex' against the previous
+'update_agenda', which scanned all tasks for each day. Also time the agenda
+of repeating tasks whose dates are 1 and 100 years back, which should take
+about the same time (see 'repeat.occurrences').
+
+    python3 -m benchmarks.bench_agenda --tasks 20000 --num_days 90
+"""
+import re
+import time
+import argparse
+from datetime import timedelta
+
+from orgpy import const, utils
+from orgpy.agenda import AgendaIndex
+from orgpy.task import Task
+from .bench_filter import make_tasks
+
+def agenda_scan(list_, num_days):
+    """The previous path: repeat deadlines, then scan the list for each day."""
+    todolist = [d.copy() for d in list_]
+    repeat_tasks = []
+    max_days = max([len(str(x['days'])) for x in todolist])
+    for i, d in enumerate(todolist):
+        if re.search('Deadline', d['date_two']):
+            day_str = str(d['days']).rjust(max_days+1)
+            if 0 < d['days'] < num_days:
+                d_copy = d.copy()
+                d_copy['date_one'] = const.regex['date'].sub(const.today_date, d['date_one'])
+                d_copy['date_two'] = ' In' + day_str + ' d.:'
+                repeat_tasks.append(d_copy)
+            elif d['days'] < 0:
+                todolist[i].update(date_one=const.today_date + '\n',
+                                   date_two=' In' + day_str + ' d.:')
+    todolist = todolist + repeat_tasks
+    for n in range(num_days):
+        d = (const.today + timedelta(n)).strftime('<%Y-%m-%d %a>')
+        if not any(re.search(d, item) for item in [x['date_one'] for x in todolist]):
+            todolist.append(Task(date_one=d, days=utils.days_until_due(d)))
+    return sorted(todolist, key=lambda d: (d['date_one'], d['days']))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--tasks', type=int, default=20000,
+                        help='Number of tasks to generate')
+    parser.add_argument('-d', '--num_days', type=int, default=90,
+                        help='Number of days in the agenda')
+    parser.add_argument('-r', '--repeating', type=int, default=2000,
+                        help='Number of repeating tasks')
+    args = parser.parse_args()
+
+    # Spread the due dates over the agenda, with some in the past
+    tasks = make_tasks(args.tasks)
+    for i, d in enumerate(tasks):
+        d['days'] = d['days'] % (args.num_days + 30) - 30
+        d['date_one'] = (const.today + timedelta(d['days'])).strftime('<%Y-%m-%d %a>\n')
+        d['date_two'] = (' Deadline:', 'Scheduled:', ' '*10)[i % 3]
+    tasks = [d for d in tasks if d['days'] < args.num_days]
+
+    t0 = time.perf_counter()
+    old = agenda_scan(tasks, args.num_days)
+    t1 = time.perf_counter()
+    new = AgendaIndex(tasks).agenda(args.num_days)
+    t2 = time.perf_counter()
+
+    print('%i tasks, %i agenda entries over %i days' % (len(tasks), len(new), args.num_days))
+    print('Scan:         %.3f s' % (t1 - t0))
+    print('AgendaIndex:  %.3f s' % (t2 - t1))
+    fields = ('date_one', 'date_two', 'text', 'days')
+    print('Same agenda: %s' % ([[d[k] for k in fields] for d in old] ==
+                               [[d[k] for k in fields] for d in new]))
+
+    # Repeating tasks, every 1-14 days, dated far back
+    for years in (1, 100):
+        repeating = []
+        for i, d in enumerate(make_tasks(args.repeating)):
+            day = const.today - timedelta(years * 365 + i % 30)
+            d.update(date_one=day.strftime('<%Y-%m-%d %a +') + '%id>\n' % (i % 14 + 1),
+                     date_two='Scheduled:', days=day.toordinal() - const.today_ordinal)
+            repeating.append(d)
+        t0 = time.perf_counter()
+        entries = AgendaIndex(repeating).agenda(args.num_days)
+        t1 = time.perf_counter()
+        print('%i repeating tasks from %3i year(s) back: %.3f s (%i agenda entries)' % (
+            len(repeating), years, t1 - t0, len(entries)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare loading org files one at a time and concurrently ('--io-limit'), when
+each open of an org file is delayed to simulate a slow network file system.
+
+    python3 -m benchmarks.bench_aio --files 20 --delay 0.05 --limit 8
+"""
+import os
+import time
+import shutil
+import argparse
+import builtins
+import tempfile
+
+from orgpy import aio
+from orgpy.tree import load_trees
+from .generate import make_org_text, parse_size, todostates
+
+def delayed_open(delay, prefix):
+    """Return a version of 'open' that sleeps for 'delay' seconds before
+    opening any file under 'prefix'."""
+    real_open = builtins.open
+    def open_(file, *args, **kwargs):
+        if isinstance(file, str) and file.startswith(prefix):
+            time.sleep(delay)
+        return real_open(file, *args, **kwargs)
+    return open_
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--files', type=int, default=20,
+                        help='Number of org files to generate')
+    parser.add_argument('-s', '--size', type=parse_size, default='20KB',
+                        help='Size of each generated org file (e.g., 20KB, 1MB)')
+    parser.add_argument('-d', '--delay', type=float, default=0.05,
+                        help='Seconds added to each open of an org file')
+    parser.add_argument('-l', '--limit', type=int, default=8,
+                        help='Number of files read concurrently')
+    args = parser.parse_args()
+
+    opts = {'agenda': False, 'states': None, 'tags': None, 'categories': None,
+            'num_days': 7, 'cache': False, 'jobs': 1}
+    tmpdir = tempfile.mkdtemp()
+    real_open = builtins.open
+    try:
+        orgfiles = []
+        for i in range(args.files):
+            orgfiles.append(os.path.join(tmpdir, 'file%i.org' % i))
+            with open(orgfiles[-1], 'w') as f:
+                f.write(make_org_text(args.size, seed=i))
+
+        builtins.open = delayed_open(args.delay, tmpdir)
+        t0 = time.perf_counter()
+        serial = load_trees(orgfiles, todostates, **opts)
+        t1 = time.perf_counter()
+        concurrent = aio.run(aio.load_trees(orgfiles, todostates, args.limit, **opts))
+        t2 = time.perf_counter()
+    finally:
+        builtins.open = real_open
+        shutil.rmtree(tmpdir)
+
+    same = [x.tasks for x in serial] == [x.tasks for x in concurrent]
+    print('%i files, %.0f ms per open' % (args.files, args.delay * 1e3))
+    print('One at a time:    %.3f s' % (t1 - t0))
+    print('Concurrent (%2i):  %.3f s' % (args.limit, t2 - t1))
+    print('Same tasks: %s' % same)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare answering a set of report views with one 'orgTreeFromFile' call per
+view against a single 'run_batch' call (see 'orgpy.batch').
+
+    python3 -m benchmarks.bench_batch --files 10 --size 1MB
+"""
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+from orgpy import const, orgTreeFromFile, run_batch
+from orgpy.__main__ import parse_cli
+from .generate import make_org_text, parse_size, write_vimrc
+
+# One view per tag and per category, and an agenda for each of a few windows
+views = ([{'tags': x} for x in ('tag0', 'tag1', 'urgent')] +
+         [{'categories': x} for x in ('synth0', 'proj1', 'proj2')] +
+         [{'agenda': True, 'num_days': n} for n in (1, 7, 30)])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--files', type=int, default=10,
+                        help='Number of org files to generate')
+    parser.add_argument('-s', '--size', type=parse_size, default='1MB',
+                        help='Size of each generated org file (e.g., 500KB, 10MB)')
+    parser.add_argument('--no-cache', action='store_false', dest='cache',
+                        help='Parse the org files for each call')
+    parser.add_argument('--no-colors', action='store_false', dest='colors',
+                        help="Don't colorize the tasks")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['XDG_CACHE_HOME'] = os.path.join(tmpdir, 'cache')
+    try:
+        orgfiles = []
+        for i in range(args.files):
+            orgfiles.append(os.path.join(tmpdir, 'file%i.org' % i))
+            with open(orgfiles[-1], 'w') as f:
+                f.write(make_org_text(args.size, seed=i))
+        rcfile = os.path.join(tmpdir, 'vimrc')
+        write_vimrc(rcfile, orgfiles)
+        opts = dict(vars(parse_cli([])), rcfile=rcfile, cache=args.cache, colors=args.colors)
+        if args.cache:
+            run_batch([], **opts)           # Populate the cache
+
+        t0 = time.perf_counter()
+        separate = []
+        for view in views:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                orgTreeFromFile(**dict(opts, **view))
+            separate.append(out.getvalue())
+        t1 = time.perf_counter()
+        outs = [io.StringIO() for view in views]
+        run_batch([dict(view, out=out) for view, out in zip(views, outs)], **opts)
+        t2 = time.perf_counter()
+
+        print('%i views of %i files (cache: %s, colors: %s)' % (
+            len(views), args.files, args.cache, args.colors))
+        print('Separate calls: %.3f s' % (t1 - t0))
+        print('run_batch:      %.3f s' % (t2 - t1))
+        # (Ignoring the colors, which are stripped when stdout isn't a terminal)
+        plain = lambda str_: const.regex['ansicolors'].sub('', str_)
+        print('Same output: %s' % (list(map(plain, separate)) ==
+                                   [plain(out.getvalue()) for out in outs]))
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    main()
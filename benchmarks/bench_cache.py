@@ -0,0 +1,52 @@
+"""
+Time parsing a set of org files without the cache, with an empty ("cold")
+cache, and with a populated ("warm") cache.
+
+    python3 -m benchmarks.bench_cache --files 20 --size 1MB
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from orgpy import cache, OrgTree
+from .generate import make_org_text, parse_size, todostates
+
+def load_all(orgfiles, use_cache):
+    """Create an 'OrgTree' for each file, as 'orgTreeFromFile' does."""
+    opts = {'agenda': False, 'states': None, 'tags': None, 'categories': None,
+            'num_days': 7, 'cache': use_cache}
+    t0 = time.perf_counter()
+    ntasks = sum(len(OrgTree(f, todostates, **opts).active) for f in orgfiles)
+    return time.perf_counter() - t0, ntasks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--files', type=int, default=20,
+                        help='Number of org files to generate')
+    parser.add_argument('-s', '--size', type=parse_size, default='1MB',
+                        help='Size of each generated org file (e.g., 500KB, 10MB)')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['XDG_CACHE_HOME'] = os.path.join(tmpdir, 'cache')
+    try:
+        orgfiles = []
+        for i in range(args.files):
+            orgfiles.append(os.path.join(tmpdir, 'file%i.org' % i))
+            with open(orgfiles[-1], 'w') as f:
+                f.write(make_org_text(args.size, seed=i))
+
+        for label, use_cache in [('No cache', False), ('Cold', True), ('Warm', True)]:
+            secs, ntasks = load_all(orgfiles, use_cache)
+            print('%-9s %.3f s (%i tasks)' % (label + ':', secs, ntasks))
+        print('Cache size: %.1f MB in %s' % (
+            sum(x.stat().st_size for x in os.scandir(cache.cache_dir())) / 1e6,
+            cache.cache_dir()))
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare colorizing tasks with the one-pass, cached markup scanner
+('utils.format_inline_width') against the previous search/findall/replace
+path that it replaced.
+
+    python3 -m benchmarks.bench_colorize --size 5MB --repeat 3
+"""
+import os
+import time
+import argparse
+import tempfile
+
+from orgpy import const, utils
+from orgpy.__main__ import parse_cli
+from orgpy.tree import load_trees
+from .generate import make_org_text, parse_size, todostates
+
+def format_inline_old(str_, reset='normal'):
+    """The previous path: a search, then a 'findall' and replacements for
+    each type of markup."""
+    added = 0
+    if const.regex['url'].search(str_):
+        text = utils.slugify(str_.split('[[')[1].split('][')[1].split(']]')[0])
+        str_, n = const.regex['url'].subn(const.styles['url'] + text + const.styles[reset], str_)
+        added += n * (len(const.styles['url']) + len(const.styles[reset]))
+
+    for key, val in const.inline.items():
+        if val['pattern'].search(str_):
+            matches = val['pattern'].findall(str_)
+            style = const.styles[val["style"]]
+            repls = [style + x.replace(val["delim"], "") + const.styles[reset]
+                        for x in matches]
+            for x, y in zip(matches, repls):
+                added += str_.count(x) * (len(style) + len(const.styles[reset]))
+                str_ = str_.replace(x, y)
+
+    return str_, len(str_) - added
+
+def colorize_all(tasks, repeat, **kwargs):
+    """Colorize copies of the tasks 'repeat' times (timing only the colorizing).
+
+    Returns:
+        A tuple with the time per run (in seconds), and the last copies of
+        the tasks with their widths
+    """
+    total = 0
+    for _ in range(repeat):
+        copies = [dict(d) for d in tasks]
+        t0 = time.perf_counter()
+        widths = [utils.colorize(d, **kwargs) for d in copies]
+        total += time.perf_counter() - t0
+    return total / repeat, copies, widths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--size', type=parse_size, default='5MB',
+                        help='Size of the generated org file (e.g., 500KB, 20MB)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Number of times the task list is colorized')
+    args = parser.parse_args()
+
+    # The previous path passed all of the command-line options to 'colorize'
+    opts = dict(vars(parse_cli([])), colors=True, cache=False, jobs=1)
+    with tempfile.NamedTemporaryFile('w', suffix='.org', delete=False) as f:
+        f.write(make_org_text(args.size))
+    try:
+        tasks = load_trees([f.name], todostates, **opts)[0].tasks
+    finally:
+        os.remove(f.name)
+
+    new_path = utils.format_inline_width
+    utils.format_inline_width = format_inline_old
+    try:
+        t_old, old, old_widths = colorize_all(tasks, args.repeat, **opts)
+    finally:
+        utils.format_inline_width = new_path
+
+    new_path.cache_clear()
+    t_cold, new, new_widths = colorize_all(tasks, 1, num_days=opts['num_days'])
+    t_cached = colorize_all(tasks, args.repeat, num_days=opts['num_days'])[0]
+
+    # The old path replaced everything from the first link to the last one
+    # with the first description, so only compare headings with one link
+    same = all(a == b and x == y for a, b, x, y, d in zip(old, new, old_widths, new_widths, tasks)
+               if d['text'].count('[[') <= 1)
+    print('%i tasks' % len(tasks))
+    print('Previous path:      %.3f s per run' % t_old)
+    print('One pass (cold):    %.3f s' % t_cold)
+    print('One pass (cached):  %.3f s per run' % t_cached)
+    print('Cache: %s' % (new_path.cache_info(),))
+    print('Same output (headings with at most one link): %s' % same)
+
+if __name__ == '__main__':
+    main()
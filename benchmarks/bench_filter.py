@@ -0,0 +1,88 @@
+"""
+Compare filtering tasks with a compiled 'Query' (with and without a
+'TaskIndex', and on a columnar 'TaskTable') against the previous per-task
+filters (one 'eval' per task and option).
+
+    python3 -m benchmarks.bench_filter --tasks 1000000
+"""
+import re
+import time
+import random
+import argparse
+
+from orgpy import table
+from orgpy.index import TaskIndex
+from orgpy.query import Query
+from orgpy.table import TaskTable
+from orgpy.task import Task
+
+def make_tasks(n, seed=0):
+    """Create 'n' random tasks, with 'days' already set."""
+    rand = random.Random(seed)
+    states = [' TODO ', ' DOING ', ' WAIT ']
+    tags = ['', '\t:work:', '\t:home:', '\t:work:urgent:']
+    categories = ['Home: House', 'Work: Project', 'c%d' % rand.randint(0, 6)]
+    return [Task(level='**', todostate=rand.choice(states), text='Task %d' % i,
+                 tag=rand.choice(tags), category=rand.choice(categories),
+                 days=rand.randint(-30, 60))
+            for i in range(n)]
+
+def subset_eval(tasks, **cli):
+    """The previous filtering path, one pass per option."""
+    conds = {
+        'agenda': "d['days'] < " + str(cli['num_days']),
+        'states': "re.search(cli['states'], d['todostate'], re.IGNORECASE)",
+        'tags': "re.search(cli['tags'], d['tag'], re.IGNORECASE)",
+        'categories': "re.search(cli['categories'], d['category'], re.IGNORECASE)"
+    }
+    env = {'cli': cli, 're': re}
+    for p in ['agenda', 'states', 'tags', 'categories']:
+        if cli[p]:
+            todos = []
+            for d in tasks:
+                env['d'] = d
+                if eval(conds[p], env):
+                    todos.append(d)
+            tasks = todos
+    return tasks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--tasks', type=int, default=200000,
+                        help='Number of tasks to generate')
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    cli = {'agenda': True, 'num_days': 14, 'states': 'TODO|WAIT', 'tags': 'work',
+           'categories': 'Project'}
+
+    t0 = time.perf_counter()
+    old = subset_eval(tasks, **cli)
+    t1 = time.perf_counter()
+    index = TaskIndex(tasks)
+    t2 = time.perf_counter()
+    query = Query.from_options(**cli)
+    scanned = query.select(tasks)
+    t3 = time.perf_counter()
+    indexed = query.select(tasks, index)
+    t4 = time.perf_counter()
+    tabled = TaskTable(None, [(tasks, index)]).select(query)
+    t5 = time.perf_counter()
+    numpy, table.np = table.np, None
+    pure = TaskTable(tasks).select(query)
+    t6 = time.perf_counter()
+    table.np = numpy
+
+    print('%i tasks, %i selected' % (len(tasks), len(old)))
+    print('eval filters:      %.3f s' % (t1 - t0))
+    print('TaskIndex build:   %.3f s' % (t2 - t1))
+    print('Query (one pass):  %.3f s (plan: %s)' % (t3 - t2, ' '.join(map(str, query.plan()))))
+    print('Query with index:  %.3f s (plan: %s)' % (t4 - t3,
+                                                    ' '.join(map(str, query.plan(index)))))
+    print('TaskTable:         %.3f s (NumPy: %s)' % (t5 - t4, numpy is not None))
+    print('TaskTable masks:   %.3f s (pure Python, no index)' % (t6 - t5))
+    print('Same tasks: %s' % (old == scanned == indexed == tabled == pure))
+
+if __name__ == '__main__':
+    main()
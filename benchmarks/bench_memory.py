@@ -0,0 +1,54 @@
+"""
+Measure the memory used by parsed tasks with 'tracemalloc', comparing the
+slotted 'Task' records against the dicts that were used before, and of
+reading an org file line by line or memory-mapped.
+
+    python3 -m benchmarks.bench_memory --size 20MB
+"""
+import os
+import argparse
+import tempfile
+import tracemalloc
+
+from orgpy import lexer, OrgTree
+from .generate import make_org_text, parse_size, todostates
+
+def traced(func):
+    """Return the result of 'func()' and the memory it allocated (MB)."""
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1e6, peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--size', type=parse_size, default='10MB',
+                        help='Size of the generated org file (e.g., 500KB, 20MB)')
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.org', delete=False) as f:
+        f.write(make_org_text(args.size))
+    try:
+        with open(f.name, 'r') as org:
+            parsed = list(lexer.tokenize(org, lexer.get_keywords(todostates)))
+
+        # The strings are shared, so this is only the cost of the records
+        _, tasks_mb, _ = traced(lambda: [x.copy() for x in parsed])
+        _, dicts_mb, _ = traced(lambda: [dict(x.items()) for x in parsed])
+        print('%i headings' % len(parsed))
+        print('Task records: %7.1f MB' % tasks_mb)
+        print('Dicts:        %7.1f MB' % dicts_mb)
+
+        opts = {'agenda': False, 'states': None, 'tags': None, 'categories': None,
+                'num_days': 7}
+        for label, mapped in [('read', False), ('mmap', True)]:
+            tree, current, peak = traced(lambda: OrgTree(f.name, todostates, mmap=mapped, **opts))
+            print('OrgTree, %s (%.0f MB file): %.1f MB retained, %.1f MB peak' % (
+                label, os.path.getsize(f.name) / 1e6, current, peak))
+    finally:
+        os.remove(f.name)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Time starting up orgpy: the imports (with 'python3 -X importtime'), and
+whole runs of 'python3 -m orgpy' on a small org file, with and without colors.
+
+Most invocations are short shell hooks, where startup dominates, so this
+also lists the slowest imports, and whether 'colorama' was imported.
+
+    python3 -m benchmarks.bench_startup --repeat 20
+    python3 -m benchmarks.bench_startup --json startup.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from .generate import make_org_text, parse_size, write_vimrc
+
+def import_times(module='orgpy.__main__'):
+    """Import a module in a new interpreter with '-X importtime'.
+
+    Returns:
+        A dict with the cumulative import time (in microseconds) of each
+        imported module
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+def run_time(argv):
+    """Return the wall time (in seconds) of one run of 'python3 -m orgpy'."""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'orgpy'] + argv,
+                   stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Number of runs of each command (the best time is kept)')
+    parser.add_argument('--size', type=parse_size, default='10KB',
+                        help='Size of the generated org file')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Number of the slowest imports to list')
+    parser.add_argument('--json', metavar='FILE', default=None,
+                        help='Save the results as JSON ("-" for stdout)')
+    args = parser.parse_args()
+
+    # Imports (the best of the runs, for each module)
+    best = {}
+    for _ in range(args.repeat):
+        for name, usecs in import_times().items():
+            best[name] = min(best.get(name, usecs), usecs)
+    results = {'import': best['orgpy.__main__'], 'colorama': 'colorama' in best,
+               'slowest': sorted(best.items(), key=lambda x: -x[1])[:args.top]}
+
+    # Whole runs (the cache is kept in the temporary directory)
+    tmpdir = tempfile.mkdtemp()
+    os.environ['XDG_CACHE_HOME'] = os.path.join(tmpdir, 'cache')
+    try:
+        orgfile = os.path.join(tmpdir, 'file.org')
+        with open(orgfile, 'w') as f:
+            f.write(make_org_text(args.size))
+        rcfile = os.path.join(tmpdir, 'vimrc')
+        write_vimrc(rcfile, [orgfile])
+        for label, argv in [('plain', []), ('colors', ['-c']), ('agenda', ['-ac'])]:
+            argv = ['-r', rcfile] + argv
+            results[label] = min(run_time(argv) for _ in range(args.repeat))
+    finally:
+        shutil.rmtree(tmpdir)
+
+    if args.json:
+        if args.json == '-':
+            json.dump(results, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+    if args.json != '-':
+        print('Import orgpy.__main__: %.1f ms (colorama imported: %s)' % (
+            results['import'] / 1e3, results['colorama']))
+        for name, usecs in results['slowest']:
+            print('  %-32s %8.1f ms' % (name, usecs / 1e3))
+        for label in ('plain', 'colors', 'agenda'):
+            print('%-7s python3 -m orgpy: %.1f ms' % (label + ':', results[label] * 1e3))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare the line tokenizer ('orgpy.lexer') against the regex-based parsing
+('get_parse_string') that it replaced.
+
+    python3 -m benchmarks.bench_tokenizer --size 20MB
+"""
+import os
+import re
+import time
+import argparse
+import tempfile
+
+from orgpy import const, lexer
+from .generate import make_org_text, parse_size, todostates
+
+def get_parse_string(todostates):
+    """Return the (compiled) regex that the previous parser matched against
+    each node, with the groups 'level', 'todostate', 'text', 'num_tasks',
+    'date_one', 'tag', and 'date_two'."""
+    level_string = r'(?P<level>\*{1,9}|[^\S\n ]{1,9}-)'
+    todos = [x.pattern.split('|') for x in todostates.values()]
+    todos = [item for sublist in todos for item in sublist]
+    todos = [r'\s' + x + r'\s' for x in todos]
+    todostate_string = r'(?P<todostate>(' + r'|'.join(todos) + r')|)'
+    headerText_string = r'(?P<text>.*?)'
+    numTasks_string = r'(?P<num_tasks>\s*\[\d+/\d+\]|)'
+    date1 = r'(?P<date_one>' + const.date_str + '|)'
+    tag_string = r'(?P<tag>[ \t]*:[\w:]*:)*'
+    date2 = r'(?P<date_two>\n\s+[A-Z]+:\s' + const.date_str + r'(?:\n|$)|(?:\n|$))'
+    line_string = level_string + todostate_string + headerText_string \
+            + numTasks_string + date1 + tag_string + date2
+    return re.compile(line_string, re.MULTILINE)
+
+def parse_regex(data):
+    """The previous parsing path: split, re-join, and run the big regex."""
+    pattern = get_parse_string(todostates)
+    lines = data.splitlines()
+    bounds = [i for i, x in enumerate(lines) if re.search(r'^\*{1} ', x)] + [len(lines)]
+    parsed = []
+    for i in range(len(bounds) - 1):
+        tree = '\n'.join(lines[bounds[i]:bounds[i+1]]) + '\n'
+        for d in (x.groupdict() for x in pattern.finditer(tree)):
+            if not d['tag']:
+                d['tag'] = ''
+            if const.regex['date'].search(d['date_two']):
+                if re.search('SCHEDULED|DEADLINE', d['date_two']):
+                    d['date_one'] = d['date_two'].strip().split(': ')[1]
+                    d['date_two'] = d['date_two'].strip().split(': ')[0].title() + ':'
+                    if re.search('Deadline', d['date_two']):
+                        d['date_two'] = ' ' + d['date_two']
+            if d['date_two'] == '\n':
+                d['date_two'] = ' '*10
+            if '\n' not in d['date_one']:
+                d['date_one'] = d['date_one'] + '\n'
+            parsed.append(d)
+
+    return parsed
+
+def parse_tokenizer(orgfile):
+    """The streaming path: read the file line by line."""
+    with open(orgfile, 'r') as f:
+        return list(lexer.tokenize(f, lexer.get_keywords(todostates)))
+
+def active(parsed):
+    fields = const.task_fields[:-1]     # No category at this stage
+    return [tuple(d[k] for k in fields) for d in parsed
+            if d['date_one'].strip() and todostates['in_progress'].search(d['todostate'])]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--size', type=parse_size, default='5MB',
+                        help='Size of the generated org file (e.g., 500KB, 20MB)')
+    args = parser.parse_args()
+
+    data = make_org_text(args.size)
+    with tempfile.NamedTemporaryFile('w', suffix='.org', delete=False) as f:
+        f.write(data)
+    try:
+        t0 = time.perf_counter()
+        old = parse_regex(data)
+        t1 = time.perf_counter()
+        new = parse_tokenizer(f.name)
+        t2 = time.perf_counter()
+    finally:
+        os.remove(f.name)
+
+    print('File size:  %.1f MB' % (len(data) / 1e6))
+    print('Regex:      %.3f s (%i active tasks)' % (t1 - t0, len(active(old))))
+    print('Tokenizer:  %.3f s (%i active tasks)' % (t2 - t1, len(active(new))))
+    print('Same active tasks: %s' % (active(old) == active(new)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+A seeded generator of synthetic org files, for the benchmarks.
+
+The same seed and options always give the same file (for a given 'today'),
+so runs can be compared across commits. For example, to write a 10 MB file:
+
+    python3 -m benchmarks.generate --size 10MB -o big.org
+"""
+import re
+import random
+import argparse
+from datetime import date, timedelta
+
+# TODO keywords used in the generated files, and the matching 'todostates'
+in_progress = ['TODO', 'DOING', 'WAIT']
+completed = ['DONE', 'CANCELED']
+todostates = {'in_progress': re.compile('|'.join(in_progress)),
+              'completed': re.compile('|'.join(completed))}
+
+words = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'review', 'call', 'email',
+         'plan', 'report', '*bold text*', '/italics/', '=code=', '~verb it~',
+         '[[https://orgmode.org][a link]]']
+
+def parse_size(str_):
+    """Convert a size such as '1KB', '2.5MB', or '100' (bytes) to bytes."""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMG]?)B?\s*', str_.upper())
+    if not match:
+        raise argparse.ArgumentTypeError('invalid size: %r' % str_)
+    scale = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9}[match.group(2)]
+    return int(float(match.group(1)) * scale)
+
+def make_org_text(size, seed=0, depth=4, todo_density=0.6, num_tags=8,
+                  drawers=0.3, planning=0.5, checkboxes=4, today=None):
+    """Create a random org file of roughly 'size' bytes.
+
+    Args:
+        size (int): the approximate size of the file (bytes)
+        seed (int): seed for the random number generator
+        depth (int): the maximum heading level
+        todo_density (float): fraction of headings with a TODO keyword (about
+            1 in 4 of these are completed)
+        num_tags (int): the number of distinct tags
+        drawers (float): fraction of headings with a property drawer
+        planning (float): fraction of headings with a SCHEDULED or DEADLINE
+            line; some others have a date in the heading itself
+        checkboxes (int): the maximum # of checkbox items under a heading
+        today (date): dates are spread around this day (default: today)
+
+    Returns:
+        The text of the org file
+    """
+    rand = random.Random(seed)
+    today = today or date.today()
+    tags = ['tag%d' % i for i in range(num_tags)] + ['urgent']
+    dates = [(today + timedelta(n)).strftime('<%Y-%m-%d %a>') for n in range(-30, 91)]
+
+    lines = ['#+TITLE: Synthetic org file %d' % seed, '#+CATEGORY: synth%d' % seed, '']
+    nbytes = sum(len(x) + 1 for x in lines)
+    level = 0
+    while nbytes < size:
+        block = []
+        if level == 0 or depth < 2 or rand.random() < 0.2:
+            level = 1
+        else:
+            level = rand.randint(2, min(level + 1, depth))
+        heading = '*' * level
+        if level > 1 and rand.random() < todo_density:
+            heading += ' ' + rand.choice(completed if rand.random() < 0.25 else in_progress)
+        heading += ' ' + ' '.join(rand.choice(words) for _ in range(rand.randint(2, 6)))
+        if checkboxes and rand.random() < 0.3:
+            heading += ' [%d/%d]' % (rand.randint(0, checkboxes), checkboxes)
+        kind = rand.random()
+        if kind < 0.1:
+            heading += ' ' + rand.choice(dates)
+        if rand.random() < 0.4:
+            heading += '\t\t:' + ':'.join(rand.sample(tags, rand.randint(1, 2))) + ':'
+        block.append(heading)
+
+        if 0.1 <= kind < 0.1 + planning:
+            block.append('   %s: %s' % (rand.choice(['SCHEDULED', 'DEADLINE']), rand.choice(dates)))
+        if rand.random() < drawers:
+            block += ['   :PROPERTIES:', '   :CATEGORY: proj%d' % rand.randint(0, 9),
+                      '   :OWNER: %s' % rand.choice(['alice', 'bob']), '   :END:']
+        for j in range(rand.randint(0, checkboxes)):
+            block.append('   - [%s] %s' % (rand.choice(' X'), rand.choice(words)))
+        if rand.random() < 0.5:
+            block.append('   Some body text, which is not a heading.')
+
+        nbytes += sum(len(x) + 1 for x in block)
+        lines += block
+
+    return '\n'.join(lines) + '\n'
+
+def write_vimrc(filename, orgfiles):
+    """Write a 'vimrc' file listing the org files and the TODO keywords."""
+    with open(filename, 'w') as f:
+        f.write('let g:org_agenda_files = [%s]\n' % ', '.join("'%s'" % x for x in orgfiles))
+        f.write("let g:org_todo_keywords = [%s, '|', %s]\n" % (
+            ', '.join("'%s'" % x for x in in_progress),
+            ', '.join("'%s'" % x for x in completed)))
+
+def add_arguments(parser):
+    """Add the generator's options to an 'ArgumentParser'."""
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the random number generator')
+    parser.add_argument('--depth', type=int, default=4,
+                        help='Maximum heading level')
+    parser.add_argument('--todo-density', type=float, default=0.6,
+                        help='Fraction of headings with a TODO keyword')
+    parser.add_argument('--num-tags', type=int, default=8,
+                        help='Number of distinct tags')
+    parser.add_argument('--drawers', type=float, default=0.3,
+                        help='Fraction of headings with a property drawer')
+    parser.add_argument('--planning', type=float, default=0.5,
+                        help='Fraction of headings with a SCHEDULED/DEADLINE line')
+    parser.add_argument('--checkboxes', type=int, default=4,
+                        help='Maximum number of checkbox items under a heading')
+
+def generator_options(args):
+    """Return the generator's keyword arguments from parsed CLI options."""
+    return {'depth': args.depth, 'todo_density': args.todo_density,
+            'num_tags': args.num_tags, 'drawers': args.drawers,
+            'planning': args.planning, 'checkboxes': args.checkboxes}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--size', type=parse_size, default='1MB',
+                        help='Size of the org file (e.g., 1KB, 10MB)')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Name of the org file to write')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with open(args.output, 'w') as f:
+        f.write(make_org_text(args.size, seed=args.seed, **generator_options(args)))
+
+if __name__ == '__main__':
+    main()
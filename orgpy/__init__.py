@@ -1,8 +1,29 @@
 """
 A Python parser for Org mode files.
 """
+import sys
+import importlib
 
-__all__ = ['OrgTree', 'orgTreeFromFile']    # Seems equal to the stuff in ".tree" below
+__all__ = ['OrgTree', 'orgTreeFromFile', 'iter_tasks', 'export_tasks', 'Query',
+           'run_batch']
 
-from .tree import OrgTree, orgTreeFromFile
-from . import const, utils
+# The submodules are only imported when first used (e.g., 'orgpy.client' needs
+# none of them), so that starting up is fast
+_lazy = {'OrgTree': 'tree', 'orgTreeFromFile': 'tree', 'iter_tasks': 'tree',
+         'export_tasks': 'tree', 'Query': 'query', 'run_batch': 'batch',
+         'const': None, 'utils': None}
+
+def __getattr__(name):
+    """Import a submodule (or an object from it) the first time it is used."""
+    if name not in _lazy:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    module = importlib.import_module('.' + (_lazy[name] or name), __name__)
+    value = getattr(module, name) if _lazy[name] else module
+    globals()[name] = value
+    return value
+
+if sys.version_info < (3, 7):       # No module '__getattr__'
+    from .tree import OrgTree, orgTreeFromFile, iter_tasks, export_tasks
+    from .query import Query
+    from .batch import run_batch
+    from . import const, utils
@@ -3,14 +3,21 @@ import sys
 import argparse
 
 import orgpy
+from orgpy import timings
 
-def parse_cli(argv=None):
+def parse_cli(argv=None, namespace=None):
     """Parse an 'org' file to list TODO's, agendas, etc."""
 
     ex = """EXAMPLES:
     python3 -m orgpy --agenda --colors
     python3 -m orgpy -ct personal
     python3 -m orgpy -f ~/todo.org
+    python3 -m orgpy -q 'state:TODO|WAIT tag:work -tag:someday days<14'
+    python3 -m orgpy -p OWNER=alice -p 'EFFORT>=2:00'
+
+To keep the org files parsed in memory, start a server and use the client:
+    python3 -m orgpy serve
+    python3 -m orgpy.client --agenda --colors
     """
     parser = argparse.ArgumentParser(description=__doc__,
             formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -33,18 +40,65 @@ def parse_cli(argv=None):
     parser.add_argument('-g', '--categories',
                         action='store', default=None,
                         help='Filter by category')
+    parser.add_argument('-q', '--query',
+                        action='store', default=None,
+                        help='Filter with a query, e.g. "state:TODO|WAIT tag:work -tag:someday '
+                             'days<14 category:proj" (combined with the other filters)')
+    parser.add_argument('-p', '--property',
+                        action='append', default=None, dest='properties', metavar='COND',
+                        help='Filter by a drawer property, e.g. "OWNER=alice", "EFFORT>=2:00", or '
+                             '"TICKET" (is set); may be repeated')
     parser.add_argument('-r', '--rcfile',
                         action='store', default=os.path.expanduser('~/.vimrc'),
                         help='Vim config file containing vim-orgmode info')
     parser.add_argument('-f', '--file',
                         action='store', default=None,
                         help='Choose a single org file to print information from')
+    parser.add_argument('-j', '--jobs',
+                        action='store', type=int, default=os.cpu_count(),
+                        help='Number of processes for parsing org files (default: # of CPUs)')
+    parser.add_argument('--no-cache',
+                        action='store_false', dest='cache',
+                        help='Always parse the org files, ignoring the cache')
+    parser.add_argument('--mmap',
+                        action='store_true', default=False,
+                        help='Memory-map the org files, decoding one node at a time (for huge files)')
+    parser.add_argument('--io-limit',
+                        action='store', type=int, default=None, metavar='N',
+                        help='Read up to N org files concurrently, e.g. on a network file system')
+    parser.add_argument('--max-rows',
+                        action='store', type=int, default=None, metavar='N',
+                        help='Print at most N tasks')
+    parser.add_argument('--stream',
+                        action='store_true', default=False,
+                        help='Print the tasks of each file as soon as it is read, with fixed '
+                             'column widths (sorted within each file; not for the agenda)')
+    parser.add_argument('--format',
+                        action='store', default=None, choices=['json', 'ndjson', 'csv'],
+                        help='Write the tasks as records (unsorted, one file at a time) '
+                             'instead of a table')
+    parser.add_argument('--timings',
+                        action='store_true', default=False,
+                        help='Print the time of each stage, and some counts, to stderr')
+    parser.add_argument('--profile',
+                        action='store', default=None, metavar='FILE',
+                        help='Save cProfile statistics to a file (see "pstats")')
 
-    args = parser.parse_args(argv)
+    args = parser.parse_args(argv, namespace)
+    if args.states or args.tags or args.categories or args.properties or args.query:
+        from orgpy.query import Query
+        try:
+            Query.from_options(**vars(args))
+        except ValueError as e:
+            parser.error(str(e))
     return args
 
 def run():
     """Run from the command line."""
+    if sys.argv[1:2] == ['serve']:
+        from orgpy import server
+        server.run(sys.argv[2:])
+        return
 
     # Parse CLI options
     options = parse_cli()
@@ -52,8 +106,27 @@ def run():
         sys.exit(1)
     opts = vars(options)
 
-    # Run
-    orgpy.orgTreeFromFile(**opts)
+    # Run (optionally with timings, or under the profiler); an invalid vimrc
+    # is reported like an invalid option
+    from orgpy.config import ConfigError
+    if opts['timings']:
+        timings.enable()
+    try:
+        if opts['profile']:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.runcall(orgpy.orgTreeFromFile, **opts)
+            profiler.dump_stats(opts['profile'])
+        else:
+            orgpy.orgTreeFromFile(**opts)
+    except ConfigError as e:
+        sys.exit('orgpy: error: %s' % e)
+    finally:
+        timings.disable()
+
+    if opts['timings']:
+        sys.stdout.flush()
+        timings.report()
 
 if __name__ == '__main__':
     run()
@@ -0,0 +1,173 @@
+"""
+A date-ordered index of tasks for the agenda view.
+
+The tasks are sorted once by the ordinal of their due date, so the tasks for
+any day (or range of days) are found with 'bisect' instead of a scan of the
+whole list. Tasks with a 'Deadline' are also kept in a separate sorted array,
+which gives the overdue deadlines (shown with today's tasks) and those within
+the warning period (repeated on today's date).
+
+The tasks with a repeater (e.g., '<2021-03-08 Mon +1w>') are also shown on
+each later date they recur within the agenda's days. Their occurrences are
+generated lazily (see 'repeat.occurrences'), and merged in date order with a
+heap, so only the occurrences within the agenda's days are created. A task
+that is overdue but recurs within the agenda's days is only shown on those
+dates, not on its (past) date; outside of the agenda, it is listed at its next
+occurrence instead (see 'next_occurrence').
+"""
+import heapq
+import itertools
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+
+from . import const, repeat
+from .task import Task
+
+__all__ = ['AgendaIndex', 'next_occurrence']
+
+class AgendaIndex:
+    """Class definition for a date-ordered index of tasks.
+
+    Args:
+        tasks (list): 'Task' objects (with 'days' already calculated)
+
+    Attributes:
+        tasks (list): the tasks sorted by due date; tasks due on the same
+            date keep their original order
+        dates (array): the (sorted) date ordinals of 'tasks'
+        deadlines (list): the tasks with a 'Deadline', sorted by due date
+        deadline_dates (array): the (sorted) date ordinals of 'deadlines'
+        repeating (list): the tasks with a repeater, and their repeaters (see
+            'repeat.repeater')
+
+    Example:
+        index = AgendaIndex(tasks)
+        todolist = index.agenda(num_days=14)
+    """
+    def __init__(self, tasks):
+        today = const.today_ordinal
+        self.tasks = sorted(tasks, key=lambda d: d['days'])
+        self.dates = array('l', [today + d['days'] for d in self.tasks])
+        self.deadlines = [d for d in self.tasks if 'Deadline' in d['date_two']]
+        self.deadline_dates = array('l', [today + d['days'] for d in self.deadlines])
+        self.repeating = []
+        for d in self.tasks:
+            if '+' in d['date_one']:
+                rep = repeat.repeater(d['date_one'])
+                if rep is not None:
+                    self.repeating.append((d, rep))
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def between(self, start=None, end=None, deadlines=False):
+        """Return the tasks due from date ordinal 'start' up to (but not
+        including) 'end'; either can be None for an open range."""
+        if deadlines:
+            dates, tasks = self.deadline_dates, self.deadlines
+        else:
+            dates, tasks = self.dates, self.tasks
+        lo = 0 if start is None else bisect_left(dates, start)
+        hi = len(dates) if end is None else bisect_left(dates, end)
+        return tasks[lo:hi]
+
+    def recurring(self, start, end):
+        """Yield a copy of a repeating task for each date it recurs on, from
+        date ordinal 'start' up to (but not including) 'end', in date order
+        (lazily; tasks recurring on the same date keep their order)."""
+        today = const.today_ordinal
+        merged = heapq.merge(*[zip(repeat.occurrences(today + d['days'], rep, start, end),
+                                   itertools.repeat(i))
+                               for i, (d, rep) in enumerate(self.repeating)])
+        dates = {}
+        for ordinal, i in merged:
+            date = dates.get(ordinal)
+            if date is None:
+                date = dates[ordinal] = _date_string(ordinal)
+            d = self.repeating[i][0].copy()
+            d.update(date_one=date, ordinal=ordinal, days=ordinal - today)
+            yield d
+
+    def agenda(self, num_days):
+        """Return copies of the tasks in agenda order, for the next 'num_days'.
+
+        Overdue deadlines are moved to today, and deadlines in the next
+        'num_days' (and within their warning period, if they have one) are
+        repeated on today's date, both with a 'date_two' of "In X d.:".
+        Repeating tasks are also added on each date they recur on (and an
+        overdue one that recurs within 'num_days' only there). A blank entry
+        is added for each day without tasks. Other overdue tasks come first,
+        and tasks after 'num_days' come last.
+        """
+        today = const.today_ordinal
+        pad = max((len(str(d['days'])) for d in self.tasks), default=0) + 1
+        last = today + max(num_days, 1)
+        recurs = {id(d) for d, rep in self.repeating if d['days'] < 0 and
+                  next(repeat.occurrences(today + d['days'], rep, today, last), None) is not None}
+
+        def moved(d):
+            d = d.copy()
+            d.update(date_one=const.today_date + '\n',
+                     date_two=' In' + str(d['days']).rjust(pad) + ' d.:')
+            return d
+
+        # Overdue tasks (other than deadlines)
+        todolist = [d.copy() for d in self.between(None, today)
+                    if 'Deadline' not in d['date_two'] and id(d) not in recurs]
+
+        # The occurrences of the repeating tasks, taken from the merged
+        # generators one day at a time
+        recurring = self.recurring(today, last)
+        upcoming = next(recurring, None)
+
+        def recur(ordinal):
+            nonlocal upcoming
+            todos = []
+            while upcoming is not None and upcoming['ordinal'] == ordinal:
+                todos.append(upcoming)
+                upcoming = next(recurring, None)
+            return todos
+
+        def warned(d):
+            warning = repeat.warning(d['date_one'])
+            return warning is None or d['days'] <= warning
+
+        # Today: overdue deadlines, today's tasks, then upcoming deadlines
+        todos = [moved(d) for d in self.between(None, today, True) if id(d) not in recurs]
+        todos += [d.copy() for d in self.between(today, today + 1)] + recur(today)
+        todos += [moved(d) for d in self.between(today + 1, today + num_days, True)
+                  if warned(d)]
+
+        # The next 'num_days', with a blank entry for days without tasks
+        for n in range(last - today):
+            if n > 0:
+                todos = [d.copy() for d in self.between(today + n, today + n + 1)]
+                todos += recur(today + n)
+            if not todos and n < num_days:
+                date = (const.today + timedelta(n)).strftime('<%Y-%m-%d %a>')
+                todos = [Task(date_one=date, ordinal=today + n, days=n)]
+            todolist += todos
+
+        return todolist + [d.copy() for d in self.between(last, None)]
+
+def _date_string(ordinal):
+    """Return the date string of a date ordinal, as in '<2021-03-08 Mon>'."""
+    day = const.today + timedelta(ordinal - const.today_ordinal)
+    return day.strftime('<%Y-%m-%d %a>\n')
+
+def next_occurrence(d):
+    """Return a copy of an overdue repeating task at the next date it recurs
+    on (from today on), or the task itself if it isn't one."""
+    if d['days'] >= 0 or '+' not in d['date_one']:
+        return d
+    rep = repeat.repeater(d['date_one'])
+    if rep is None:
+        return d
+    today = const.today_ordinal
+    ordinal = repeat.next_occurrence(today + d['days'], rep, today)
+    if ordinal is None:
+        return d
+    d = d.copy()
+    d.update(date_one=_date_string(ordinal), ordinal=ordinal, days=ordinal - today)
+    return d
@@ -0,0 +1,65 @@
+"""
+Loading org files concurrently with asyncio, for slow (e.g., network) file
+systems.
+
+On a file system such as NFS, each stat and read of a file costs a round trip,
+and reading the agenda files one after another adds up the latencies. Here,
+the stats (for the cache keys) and reads of all files are started at once, in
+a pool of at most 'limit' threads, and each file is parsed in the event loop as
+soon as its contents arrive, while the other reads are still waiting.
+
+    trees = aio.run(aio.load_trees(orgfiles, todostates, limit=16, **cli))
+
+The 'mmap' and 'jobs' options aren't used by this loader; the other options
+(e.g., 'cache') are the same as for 'tree.load_trees'.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from . import cache
+from .tree import OrgTree
+
+__all__ = ['load_trees', 'read_file', 'run']
+
+def read_file(orgfile):
+    """Return the contents of an org file (this runs in a worker thread)."""
+    with open(orgfile, 'r') as f:
+        return f.read()
+
+async def load_tree(orgfile, todostates, pool, **kwargs):
+    """Read an org file (or load it from the cache) in 'pool', and parse it."""
+    loop = asyncio.get_event_loop()
+    key = None
+    if kwargs.get('cache'):
+        key = await loop.run_in_executor(pool, cache.get_key, orgfile, todostates)
+        tree = OrgTree.from_cache(orgfile, todostates, key, **kwargs)
+        if tree is not None:
+            return tree
+    text = await loop.run_in_executor(pool, read_file, orgfile)
+    return OrgTree.from_text(orgfile, todostates, text, key, **kwargs)
+
+async def load_trees(orgfiles, todostates, limit=8, **kwargs):
+    """Create an 'OrgTree' for each org file, reading up to 'limit' files at once.
+
+    Args:
+        orgfiles (list): full pathnames of the org files
+        todostates (dict): dictionary containing the 'in_progress' and
+            'completed' TODO keywords
+        limit (int): the maximum number of files being stat'ed or read at once
+        **kwargs: dictionary containing the command-line arguments
+
+    Returns:
+        A list of 'OrgTree' objects, in the same order as 'orgfiles'
+    """
+    with ThreadPoolExecutor(max(1, limit)) as pool:
+        trees = await asyncio.gather(*(load_tree(f, todostates, pool, **kwargs)
+                                       for f in orgfiles))
+    return list(trees)
+
+def run(coro):
+    """Run a coroutine in a new event loop, and return its result."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
@@ -0,0 +1,107 @@
+"""
+Answering many queries ("views") from a single load of the org files.
+
+Each view is a dict of the CLI options that select and print tasks (e.g.,
+'tags', 'query', 'agenda', 'num_days', 'colors', or 'format'), or the text of
+a query (see 'orgpy.query'). The config is read and the org files are loaded
+once, without filtering, and the days until each due date are computed once;
+then each view's query is run on a table of the shared tasks (see
+'orgpy.table'), whose columns are only built once.
+
+A view is printed as a table (or written as records, with 'format') to its
+'out' option, a file or a path; a view without 'out' is only returned. The
+colorized tasks are shared by the (non-agenda) views that print them.
+
+    results = run_batch([{'tags': 'work', 'out': 'work.txt'},
+                         {'agenda': True, 'num_days': 14, 'out': 'agenda.txt'},
+                         'category:proj -tag:someday'],
+                        rcfile='~/.vimrc', colors=False)
+"""
+import os
+
+from . import timings, utils
+from .query import Query
+from .table import TaskTable
+from .tree import get_config, load_all, print_todolist
+
+__all__ = ['run_batch', 'shared_options']
+
+# Options that change how the org files are loaded, so they are the same for
+# all views
+shared_options = ('rcfile', 'file', 'cache', 'jobs', 'mmap', 'io_limit')
+
+# Options used when loading; filtering happens for each view instead
+_no_filters = {'agenda': False, 'states': None, 'tags': None, 'categories': None,
+               'properties': None, 'query': None}
+
+def _view_options(view, opts):
+    """Return the options of a view (with the defaults from 'opts').
+
+    Raises:
+        ValueError: if the view sets an option in 'shared_options'
+    """
+    if isinstance(view, str):
+        view = {'query': view}
+    shared = [x for x in shared_options if x in view]
+    if shared:
+        raise ValueError('option(s) %s must be the same for all views' % ', '.join(shared))
+    vopts = dict(opts, **view)
+    Query.from_options(**vopts)         # Check the filters before loading
+    return vopts
+
+def _write_view(todolist, files, colorized, out=None, **kwargs):
+    """Print a view's tasks as a table, or write them as records."""
+    if out is None:
+        return
+    if isinstance(out, (str, os.PathLike)):
+        with open(os.path.expanduser(out), 'w') as f:
+            _write_view(todolist, files, colorized, out=f, **kwargs)
+        return
+
+    if kwargs.get('format'):
+        from . import export
+        with timings.stage('export'):
+            export.write((export.record(d, files[id(d)]) for d in todolist),
+                         kwargs['format'], out)
+    else:
+        print_todolist(todolist, colorized=colorized, out=out, **kwargs)
+
+def run_batch(views, **kwargs):
+    """Load the org files once, and answer many views (see the module's
+    docstring).
+
+    Args:
+        views (list): the views; a dict of CLI options, or a query's text
+        **kwargs: the options shared by all views (with the defaults of the
+            CLI options), e.g. 'rcfile'
+
+    Returns:
+        A list with the tasks of each view (sorted as in the org files; the
+        'Task' objects are shared, so don't modify them)
+
+    Raises:
+        ValueError: if a view is invalid
+    """
+    from .__main__ import parse_cli
+
+    opts = dict(vars(parse_cli([])), **kwargs)
+    views = [_view_options(view, opts) for view in views]
+
+    if any(v['colors'] and not v.get('format') for v in views):
+        utils.init_colors()
+    todostates, orgfiles = get_config(**opts)
+    with timings.stage('load'):
+        trees = load_all(orgfiles, todostates, **dict(opts, **_no_filters))
+    files = {id(d): tree.properties['file'] for tree in trees for d in tree.tasks}
+    table = TaskTable.from_trees(trees)
+
+    results = []
+    colorized = {}
+    for vopts in views:
+        query = Query.from_options(**vopts)
+        with timings.stage('filter'):
+            todolist = table.select(query)
+        timings.count('tasks matched', len(todolist))
+        results.append(todolist)
+        _write_view(todolist, files, colorized, **vopts)
+    return results
@@ -0,0 +1,85 @@
+"""
+A persistent, on-disk cache of parsed org files.
+
+Each entry holds the (unfiltered) active tasks and the file-wide properties
+of a single 'OrgTree'. Entries are keyed on the file's path, modification
+time, and size, and on the TODO keywords; if any of these change, the entry
+is stale and the file is parsed again. The total size of the cache is capped,
+and the least recently used entries are removed first.
+"""
+import os
+import pickle
+import hashlib
+
+__all__ = ['cache_dir', 'get_key', 'load', 'save', 'evict']
+
+VERSION = 8                     # Increase whenever the cached data changes
+MAX_SIZE = 64 * 1024 * 1024     # Maximum total size of the cache, in bytes
+
+def cache_dir():
+    """Return the cache directory ('$XDG_CACHE_HOME/orgpy')."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'orgpy')
+
+def get_key(orgfile, todostates):
+    """Return the key identifying the current contents of an org file.
+
+    The file is stat'ed *before* it is parsed, so a file that changes while
+    it is being read will not be matched on the next run.
+    """
+    stat = os.stat(orgfile)
+    states = tuple(x.pattern for x in todostates.values())
+    return (VERSION, os.path.abspath(orgfile), stat.st_mtime_ns, stat.st_size, states)
+
+def _entry(orgfile):
+    """Return the name of the cache file for an org file."""
+    name = hashlib.sha1(os.path.abspath(orgfile).encode()).hexdigest()
+    return os.path.join(cache_dir(), name + '.pickle')
+
+def load(key):
+    """Return the cached data for 'key', or None if it is missing or stale."""
+    path = _entry(key[1])
+    try:
+        with open(path, 'rb') as f:
+            cached_key, data = pickle.load(f)
+    except Exception:       # Missing, unreadable, or corrupt entries
+        return None
+    if cached_key != key:
+        return None
+
+    # Mark the entry as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data
+
+def save(key, data, max_size=MAX_SIZE):
+    """Write 'data' to the cache, then evict old entries if necessary."""
+    path = _entry(key[1])
+    tmp = '%s.%i.tmp' % (path, os.getpid())
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        with open(tmp, 'wb') as f:
+            pickle.dump((key, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:         # e.g., a read-only file system; just don't cache
+        return
+    evict(max_size)
+
+def evict(max_size=MAX_SIZE):
+    """Remove the least recently used entries until the cache fits 'max_size'."""
+    try:
+        entries = [(x.stat().st_mtime, x.stat().st_size, x.path)
+                   for x in os.scandir(cache_dir()) if x.name.endswith('.pickle')]
+    except OSError:
+        return
+    total = sum(x[1] for x in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
@@ -0,0 +1,64 @@
+"""
+A thin client for the orgpy server (see 'orgpy.server').
+
+It accepts the same options as 'python3 -m orgpy', and prints the same output:
+
+    python3 -m orgpy.client -ca
+
+If no server is running, the query is run directly instead.
+"""
+import os
+import sys
+import json
+import socket
+import tempfile
+
+def socket_path():
+    """Return the path of the server's Unix socket.
+
+    This is '$ORGPY_SOCKET' if it is set, otherwise 'orgpy-<uid>.sock' in
+    '$XDG_RUNTIME_DIR' (or the temporary directory).
+    """
+    if os.environ.get('ORGPY_SOCKET'):
+        return os.environ['ORGPY_SOCKET']
+    base = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(base, 'orgpy-%i.sock' % os.getuid())
+
+def query(argv, tty=False, path=None):
+    """Send the CLI arguments to the server, and return its response.
+
+    Returns:
+        A dict with keys 'output' and 'error' (the text written to stdout and
+        stderr) and 'status' (the exit status).
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path or socket_path())
+        sock.sendall(json.dumps({'argv': argv, 'tty': tty, 'cwd': os.getcwd()}).encode()
+                     + b'\n')
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    return json.loads(b''.join(chunks).decode())
+
+def main(argv=None):
+    """Run from the command line."""
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        response = query(argv, tty=sys.stdout.isatty())
+    except OSError:
+        # No server; run the query in this process
+        from orgpy.__main__ import run
+        sys.argv = [sys.argv[0]] + argv
+        return run()
+
+    sys.stdout.write(response['output'])
+    sys.stderr.write(response['error'])
+    sys.exit(response['status'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+The vim-orgmode configuration (the agenda files and TODO keywords).
+
+The settings are read from a 'vimrc' file once per process, and are also
+saved in the on-disk cache (see 'orgpy.cache'), keyed on the file's path,
+modification time, and size. Every 'OrgTree' shares the same 'todostates'
+and keywords, so nothing derived from them is rebuilt for each file.
+
+    cfg = config.load('~/.vimrc')
+    trees = load_trees(cfg.agenda_files(), cfg.todostates, **cli)
+
+The agenda files are only required if no org files are given (e.g., with the
+'-f' option); an invalid config raises a 'ConfigError'.
+"""
+import os
+import re
+
+from . import cache, lexer, timings, utils
+
+__all__ = ['Config', 'ConfigError', 'get_key', 'load', 'parse', 'parse_org_files',
+           'parse_todo_states']
+
+_loaded = {}        # The configs already loaded by this process, keyed on path
+
+class ConfigError(ValueError):
+    """An invalid or unreadable 'vimrc' file."""
+
+class Config:
+    """Class definition for the settings read from a 'vimrc' file.
+
+    Args:
+        rcfile (str): the path of the 'vimrc' file
+        orgfiles (list): full pathnames of the agenda files (None if
+            'g:org_agenda_files' isn't set)
+        todostates (dict): regex patterns matching the 'in_progress' and
+            'completed' TODO keywords
+
+    Attributes:
+        keywords (tuple): all TODO keywords, 'in progress' states first (see
+            'lexer.get_keywords')
+        key (tuple): identifies the version of 'rcfile' that was read (or
+            None if it wasn't read from a file)
+    """
+    def __init__(self, rcfile, orgfiles, todostates, key=None):
+        self.rcfile = rcfile
+        self.orgfiles = orgfiles
+        self.todostates = todostates
+        self.keywords = lexer.get_keywords(todostates)
+        self.key = key
+
+    def __repr__(self):
+        return 'Config(%r, %i files, %r)' % (self.rcfile, len(self.orgfiles or ()),
+                                             self.keywords)
+
+    def __getstate__(self):
+        # Only the patterns are saved; they are compiled again when loaded
+        states = {k: v.pattern for k, v in self.todostates.items()}
+        return (self.rcfile, self.orgfiles, states, self.key)
+
+    def __setstate__(self, state):
+        rcfile, orgfiles, states, key = state
+        self.__init__(rcfile, orgfiles, {k: re.compile(v) for k, v in states.items()}, key)
+
+    def agenda_files(self, files=None):
+        """Return the org files to read: 'files' (a string of space-separated
+        paths, e.g. the '-f' option) if given, otherwise the agenda files.
+
+        Raises:
+            ConfigError: if no 'files' are given, and 'g:org_agenda_files'
+                isn't set or is empty
+        """
+        if files:
+            return files.split()
+        if self.orgfiles is None:
+            raise ConfigError("%s: 'g:org_agenda_files' is not set" % self.rcfile)
+        if not any(self.orgfiles):
+            raise ConfigError("%s: 'g:org_agenda_files' is empty" % self.rcfile)
+        return self.orgfiles
+
+def get_key(rcfile):
+    """Return the key identifying the current contents of a 'vimrc' file."""
+    stat = os.stat(rcfile)
+    return (cache.VERSION, os.path.abspath(rcfile), stat.st_mtime_ns, stat.st_size, 'config')
+
+def load(rcfile, use_cache=True):
+    """Return the 'Config' of a 'vimrc' file.
+
+    The config is only read again if the file has changed since it was last
+    loaded (by this process or, if 'use_cache' is True, by an earlier one).
+
+    Args:
+        rcfile (str): the path of the 'vimrc' file
+        use_cache (bool): whether to use the on-disk cache
+
+    Raises:
+        ConfigError: if the file can't be read, or the TODO keywords are
+            invalid
+    """
+    try:
+        key = get_key(rcfile)
+    except OSError as e:
+        raise ConfigError('%s: %s' % (rcfile, e.strerror)) from None
+    cfg = _loaded.get(key[1])
+    if cfg is not None and cfg.key == key:
+        return cfg
+
+    cfg = cache.load(key) if use_cache else None
+    if cfg is not None:
+        timings.count('config cached')
+    else:
+        try:
+            with open(rcfile, 'r') as vimrc:
+                data = vimrc.read()
+        except OSError as e:
+            raise ConfigError('%s: %s' % (rcfile, e.strerror)) from None
+        cfg = parse(data, rcfile, key)
+        if use_cache:
+            cache.save(key, cfg)
+    _loaded[key[1]] = cfg
+    return cfg
+
+#-------------------------------------------------------------------------------
+# Reading the settings from the text of a 'vimrc' file
+#-------------------------------------------------------------------------------
+def parse(data, rcfile='vimrc', key=None):
+    """Return the 'Config' in the text of a 'vimrc' file (see 'load')."""
+    return Config(rcfile, parse_org_files(data, rcfile), parse_todo_states(data, rcfile), key)
+
+def parse_org_files(data, rcfile='vimrc'):
+    """Get a list of org files from the text of a 'vimrc' file, or None if
+    'g:org_agenda_files' isn't set (see 'Config.agenda_files')."""
+    orgfiles = re.search(r'org_agenda_files\s=.*?\[.*?\]', data, re.DOTALL)
+    if orgfiles is None:
+        return None
+    orgfiles = orgfiles.group().split('[')[1].split(', ')
+    return [utils.slugify(x) for x in orgfiles]
+
+def parse_todo_states(data, rcfile='vimrc'):
+    """Get the 'TODO' states/keywords from the text of a 'vimrc' file.
+
+    Returns a dictionary for both the 'in progress' and 'completed' states.
+    The values are regular expression pattern objects.
+
+    For example, you may have the following in your '.vimrc':
+
+        let g:org_todo_keywords =
+            \\ ['TODO(t)', 'DOING(s)', 'WAIT(w)', '|',
+            \\ 'DONE(d)', 'CANCELED(c)', 'DEFERRED(f)']
+
+    In this case, the 'in progress' states are matched by 'TODO|DOING|WAIT',
+    and similarly for the 'completed' states. Without a '|', the last keyword
+    is the only 'completed' state (as in Org mode).
+    """
+    todostates = re.search(r'org_todo_keywords\s=.*?\[.*?\]', data, re.DOTALL)
+    if todostates is None:
+        return {
+            'in_progress': re.compile('TODO'),
+            'completed': re.compile('DONE')
+        }
+
+    todostates = re.sub(r'\([a-z]\)', '', todostates.group())
+    todostates = [[x.strip() for x in y.split(',') if x.strip()]
+                  for y in utils.slugify(todostates.split('[')[1]).split('|')]
+    if len(todostates) == 1:
+        todostates = [todostates[0][:-1], todostates[0][-1:]]
+    if len(todostates) != 2 or not all(todostates):
+        raise ConfigError("%s: 'g:org_todo_keywords' needs 'in progress' and 'completed' "
+                         "keywords, separated by '|'" % rcfile)
+    for x in todostates[0] + todostates[1]:
+        if not re.fullmatch(r'[\w-]+', x):
+            raise ConfigError('%s: invalid TODO keyword: %r' % (rcfile, x))
+
+    todostates = [re.compile('|'.join(x)) for x in todostates]
+    return {
+        'in_progress': todostates[0],
+        'completed': todostates[1]
+    }
@@ -1,60 +1,108 @@
 import re
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
 
-from colorama import init, Fore, Back, Style
-init(autoreset=True)
+# The keys of each task's dict, in order (see 'OrgNode.parse')
+task_fields = ('level', 'todostate', 'text', 'num_tasks', 'date_one', 'tag',
+               'date_two', 'category')
+
+# A date may end with a repeater (e.g., '+1w', '++1m', or '.+1d') and a warning
+# period (e.g., '-3d'), in either order (see 'orgpy.repeat')
+repeater_str = r'(?:\+|\+\+|\.\+)\d+[hdwmy]'
+warning_str = r'--?\d+[hdwmy]'
+date_str = r'[\<\[]' + r'\d{4}-\d{2}-\d{2}' + r' [a-zA-Z]{3}' \
+        + r'(?: (?:' + repeater_str + '|' + warning_str + r')){0,2}' + r'[\>\]]'
 
-# Global variables
 #-------------------------------------------------------------------------------
-today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-today_date = '<' + today.strftime('%Y-%m-%d %a') + '>'
-
-styles = {
-    # Basic styles
-    'normal': Fore.WHITE + Back.BLACK + Style.NORMAL,
-    'bright': Fore.WHITE + Back.BLACK + Style.BRIGHT,
-    # todo-state styles
-    'todo': Fore.WHITE + Back.RED,
-    'doing': Fore.WHITE + Back.BLUE,
-    'wait': Fore.BLACK + Back.YELLOW,
-    # "date_two" styles
-    'deadline': Fore.RED + Back.BLACK + Style.BRIGHT,
-    'deadline_two': Fore.YELLOW + Back.BLACK + Style.BRIGHT,
-    'scheduled': Fore.CYAN + Back.BLACK + Style.BRIGHT,
-    # "date_one" styles (and "category" for overdue tasks)
-    'late': Fore.RED + Back.BLACK + Style.BRIGHT,
-    'today': Fore.GREEN + Back.BLACK + Style.BRIGHT,
-    'later': Fore.BLUE + Back.BLACK + Style.BRIGHT,
-    # Other styles
-    'checkbox': Fore.MAGENTA + Back.BLACK + Style.BRIGHT,
-    'code': Fore.GREEN + Style.BRIGHT,
-    'category': Fore.MAGENTA + Style.BRIGHT,
-    'tag': Fore.YELLOW + Style.BRIGHT,
-    'urgent': Fore.WHITE + Back.RED + Style.BRIGHT, # For special "urgent" tags
-    'url': Fore.BLUE + Style.BRIGHT,
-    'verb': Fore.CYAN + Style.BRIGHT
-}
+# The other globals ('today', 'styles', 'regex', etc.) are only created when
+# they are first used (see '__getattr__'), so that starting up is fast; e.g.,
+# 'colorama' is only imported if the output has colors.
+#-------------------------------------------------------------------------------
+def _today():
+    """Today's date (at midnight), also as a string and an ordinal."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'today': today,
+        'today_date': '<' + today.strftime('%Y-%m-%d %a') + '>',
+        'today_ordinal': today.toordinal()
+    }
 
-# Regex patterns
-#---------------------------------------
-inline = {
-    'bold': {
-        'pattern': re.compile('\*[,\w\s-]+\*'),
-        'delim': '*',
-        'cols': styles['bright']},
-    'code': {
-        'pattern': re.compile("=[\._'\w]+="),
-        'delim': '=',
-        'cols': styles['code']},
-    'verb': {
-        'pattern': re.compile("~[\._'\w\s]+~"),
-        'delim': '~',
-        'cols': styles['verb']}
-}
-date_str = r'[\<\[]' + r'\d{4}-\d{2}-\d{2}' + r' [a-zA-Z]{3}' + r'[\>\]]'
-regex = {
-    'url': re.compile('\[\[.*\]\]'),
-    'date': re.compile(date_str),
-    'properties': re.compile(r'#\+([A-Z]*): (.*)\n'),
-    'ansicolors': re.compile(r'(\x1b\[[0-9]+[mM])+')
+def _styles():
+    """ANSI sequences for each type of output."""
+    from colorama import Fore, Back, Style
+    styles = {
+        # Basic styles
+        'normal': Fore.WHITE + Back.BLACK + Style.NORMAL,
+        'bright': Fore.WHITE + Back.BLACK + Style.BRIGHT,
+        'bold': Style.BRIGHT,
+        # todo-state styles
+        'todo': Fore.WHITE + Back.RED,
+        'doing': Fore.WHITE + Back.BLUE,
+        'wait': Fore.BLACK + Back.YELLOW,
+        # "date_two" styles
+        'deadline': Fore.RED + Back.BLACK + Style.BRIGHT,
+        'deadline_two': Fore.YELLOW + Back.BLACK + Style.BRIGHT,
+        'scheduled': Fore.CYAN + Back.BLACK + Style.BRIGHT,
+        # "date_one" styles (and "category" for overdue tasks)
+        'late': Fore.RED + Back.BLACK + Style.BRIGHT,
+        'today': Fore.GREEN + Back.BLACK + Style.BRIGHT,
+        'later': Fore.BLUE + Back.BLACK + Style.BRIGHT,
+        # Other styles
+        'checkbox': Fore.MAGENTA + Back.BLACK + Style.BRIGHT,
+        'code': Fore.GREEN + Style.BRIGHT,
+        'category': Fore.MAGENTA + Style.BRIGHT,
+        'tag': Fore.YELLOW + Style.BRIGHT,
+        'urgent': Fore.WHITE + Back.RED + Style.BRIGHT, # For special "urgent" tags
+        'url': Fore.BLUE + Style.BRIGHT,
+        'verb': Fore.CYAN + Style.BRIGHT
+    }
+    return {'styles': styles}
+
+def _regex():
+    """Regex patterns (the markup in 'inline' is colored with 'styles[style]').
+
+    The 'markup' pattern is an alternation of a (single) link and each type
+    of 'inline' markup; the name of the group that matched is the type.
+    """
+    inline = {
+        'bold': {
+            'pattern': re.compile(r'\*[,\w\s-]+\*'),
+            'delim': '*',
+            'style': 'bright'},
+        'code': {
+            'pattern': re.compile(r"=[\._'\w]+="),
+            'delim': '=',
+            'style': 'code'},
+        'verb': {
+            'pattern': re.compile(r"~[\._'\w\s]+~"),
+            'delim': '~',
+            'style': 'verb'}
+    }
+    # One pass over a heading's text finds all of its links and markup
+    markup = [r'(?P<url>\[\[[^\]]*\](?:\[[^\]]*\])?\])']
+    markup += ['(?P<%s>%s)' % (k, v['pattern'].pattern) for k, v in inline.items()]
+    regex = {
+        'url': re.compile(r'\[\[.*\]\]'),
+        'markup': re.compile('|'.join(markup)),
+        'date': re.compile(date_str),
+        'properties': re.compile(r'#\+([A-Z]*): (.*)'),
+        'ansicolors': re.compile(r'(\x1b\[[0-9]+[mM])+')
+    }
+    return {'inline': inline, 'regex': regex}
+
+_builders = {
+    'today': _today, 'today_date': _today, 'today_ordinal': _today,
+    'styles': _styles,
+    'inline': _regex, 'regex': _regex
 }
+
+def __getattr__(name):
+    """Create a global the first time it is used (see PEP 562)."""
+    if name not in _builders:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    globals().update(_builders[name]())
+    return globals()[name]
+
+if sys.version_info < (3, 7):       # No module '__getattr__'
+    for _build in (_today, _styles, _regex):
+        globals().update(_build())
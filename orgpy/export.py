@@ -0,0 +1,99 @@
+"""
+Writing tasks as machine-readable records (JSON, NDJSON, or CSV).
+
+Each task becomes a flat record with plain values, e.g.
+
+    {"file": "/home/me/todo.org", "level": 2, "state": "TODO",
+     "text": "Call the dentist", "category": "Personal", "tags": ["health"],
+     "date": "2021-03-08", "type": "deadline", "days": 3}
+
+The records are written one at a time as the tasks arrive (see
+'tree.iter_tasks'), without colorizing, padding, or sorting them, so only one
+record is held in memory at a time.
+
+    with open('tasks.ndjson', 'w') as f:
+        export.write(tasks, 'ndjson', f)
+"""
+import sys
+import csv
+import json
+from datetime import date
+
+from . import const, utils
+
+__all__ = ['fields', 'formats', 'record', 'write']
+
+# The keys of each record, in order (also the CSV columns)
+fields = ('file', 'level', 'state', 'text', 'category', 'tags', 'date', 'type', 'days')
+
+def record(task, orgfile):
+    """Return the record (a dict) for a task of an org file.
+
+    Args:
+        task (Task): an active task, with its tags and category resolved
+        orgfile (str): the path of the task's org file
+
+    Returns:
+        A dict with the keys in 'fields'; 'level' is the # of asterisks (0
+        for a list item), 'tags' is a list, 'date' is in ISO format, and
+        'type' is 'scheduled', 'deadline', or ''
+    """
+    level = task['level']
+    if 'ordinal' not in task:
+        task['ordinal'] = utils.date_ordinal(task['date_one'])
+    return {
+        'file': orgfile,
+        'level': len(level) if level.startswith('*') else 0,
+        'state': task['todostate'].strip(),
+        'text': task['text'].strip(),
+        'category': task['category'],
+        'tags': list(dict.fromkeys(x for x in task['tag'].replace(' ', ':').split(':')
+                                   if x.strip())),
+        'date': date.fromordinal(task['ordinal']).isoformat(),
+        'type': task['date_two'].strip(' :').lower(),
+        'days': task['ordinal'] - const.today_ordinal,
+    }
+
+#-------------------------------------------------------------------------------
+# Writers for each format; each returns the number of records written
+#-------------------------------------------------------------------------------
+def _write_json(records, out):
+    """Write a JSON array, with one record per line."""
+    n = 0
+    for n, rec in enumerate(records, 1):
+        out.write(('[' if n == 1 else ',\n') + json.dumps(rec))
+    out.write(']\n' if n else '[]\n')
+    return n
+
+def _write_ndjson(records, out):
+    """Write one JSON object per line (newline-delimited JSON)."""
+    n = 0
+    for n, rec in enumerate(records, 1):
+        out.write(json.dumps(rec) + '\n')
+    return n
+
+def _write_csv(records, out):
+    """Write a CSV header and one row per record (tags joined with ':')."""
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(fields)
+    n = 0
+    for n, rec in enumerate(records, 1):
+        rec['tags'] = ':'.join(rec['tags'])
+        writer.writerow([rec[k] for k in fields])
+    return n
+
+formats = {'json': _write_json, 'ndjson': _write_ndjson, 'csv': _write_csv}
+
+def write(records, fmt='json', out=None):
+    """Write records in a format ('json', 'ndjson', or 'csv').
+
+    Args:
+        records (iterable): the records (see 'record'); they are written as
+            they are generated
+        fmt (str): the output format
+        out (file): where to write (default: 'sys.stdout')
+
+    Returns:
+        The number of records written
+    """
+    return formats[fmt](records, out or sys.stdout)
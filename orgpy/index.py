@@ -0,0 +1,116 @@
+"""
+An inverted index from the TODO states, tags, and categories to tasks.
+
+Each distinct value of a field (e.g., the tag string '\t:work:urgent:') maps to
+the ids of the tasks that have it, where a task's id is its position in
+'OrgTree.tasks'. Since the CLI options are regexes, a query is matched against
+the distinct values only (with a plain substring test if the pattern has no
+special characters), and the ids of the matching values are joined with set
+operations. The index is built once the inherited tags and the categories
+are resolved, and is saved in the parse cache with the tasks.
+
+The drawer properties are indexed the same way, by name and then by value
+(e.g., 'effort' -> '2:00' -> ids), so a condition on a property (see
+'orgpy.properties') is only tested once for each distinct value.
+"""
+import re
+from array import array
+
+__all__ = ['TaskIndex', 'matcher']
+
+# The CLI options that filter on a string field, and the name of the field
+coded_fields = {'states': 'todostate', 'tags': 'tag', 'categories': 'category'}
+
+def matcher(pattern):
+    """Return a function testing whether a string matches a (case-insensitive)
+    regex; a plain substring test is used if the pattern has no special
+    characters."""
+    if re.escape(pattern) == pattern:
+        pattern = pattern.lower()
+        return lambda str_: pattern in str_.lower()
+    return re.compile(pattern, re.IGNORECASE).search
+
+class TaskIndex:
+    """Class definition for an inverted index of tasks.
+
+    Args:
+        tasks (list): 'Task' objects, with tags and categories resolved
+
+    Attributes:
+        size (int): the number of tasks
+        postings (dict): for each of 'states', 'tags', and 'categories', a
+            dict mapping each distinct value to an array of task ids
+        properties (dict): for each property name (in lowercase), a dict
+            mapping each distinct value to an array of task ids
+
+    Example:
+        index = TaskIndex(tree.tasks)
+        ids = index.ids('tags', 'work')
+    """
+    def __init__(self, tasks):
+        self.size = len(tasks)
+        self.postings = {}
+        for option, field in coded_fields.items():
+            post = {}
+            for i, d in enumerate(tasks):
+                ids = post.get(d[field])
+                if ids is None:
+                    ids = post[d[field]] = array('L')
+                ids.append(i)
+            self.postings[option] = post
+
+        self.properties = {}
+        for i, d in enumerate(tasks):
+            for name, value in (d.get('properties') or {}).items():
+                post = self.properties.get(name)
+                if post is None:
+                    post = self.properties[name] = {}
+                ids = post.get(value)
+                if ids is None:
+                    ids = post[value] = array('L')
+                ids.append(i)
+        self._memo = {}
+
+    def __getstate__(self):
+        return {'size': self.size, 'postings': self.postings, 'properties': self.properties}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._memo = {}
+
+    def keys(self, option, pattern):
+        """Return the distinct values of a field that match a (case-insensitive) regex."""
+        match = matcher(pattern)
+        return [k for k in self.postings[option] if match(k)]
+
+    def count(self, option, pattern):
+        """Return the number of tasks whose field matches a regex."""
+        post = self.postings[option]
+        return sum(len(post[k]) for k in self.keys(option, pattern))
+
+    def ids(self, option, pattern):
+        """Return the set of ids of the tasks whose field matches a regex."""
+        key = (option, pattern)
+        if key not in self._memo:
+            post = self.postings[option]
+            matches = self.keys(option, pattern)
+            if len(matches) == 1:
+                self._memo[key] = set(post[matches[0]])
+            else:
+                self._memo[key] = set().union(*(post[k] for k in matches))
+        return self._memo[key]
+
+    def property_count(self, name, check):
+        """Return the number of tasks with a property whose value passes
+        'check' (see 'properties.condition')."""
+        post = self.properties.get(name, {})
+        return sum(len(ids) for value, ids in post.items() if check(value))
+
+    def property_ids(self, name, check):
+        """Return the set of ids of the tasks with a property whose value
+        passes 'check'."""
+        key = (name, check)
+        if key not in self._memo:
+            post = self.properties.get(name, {})
+            self._memo[key] = set().union(*(ids for value, ids in post.items() if check(value)))
+        return self._memo[key]
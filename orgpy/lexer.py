@@ -0,0 +1,201 @@
+"""
+A line-oriented tokenizer for org files.
+
+Each line is classified by looking at its first characters (heading, planning
+line, drawer, list item, etc.), so a file can be tokenized in a single pass
+while it is being read, without building one large multi-line regex.
+"""
+import re
+
+from . import const
+from .task import Task
+
+__all__ = ['classify', 'get_keywords', 'tokenize']
+
+# Line types returned by 'classify'
+#-------------------------------------------------------------------------------
+HEADING = 'heading'
+PLANNING = 'planning'
+DRAWER = 'drawer'
+PROPERTY = 'property'
+DRAWER_END = 'drawer_end'
+LIST_ITEM = 'list_item'
+KEYWORD = 'keyword'
+BLANK = 'blank'
+TEXT = 'text'
+
+_planning = re.compile(r'(SCHEDULED|DEADLINE|CLOSED):\s+(' + const.date_str + r')$')
+_drawer = re.compile(r':[\w-]+:$')
+_num_tasks = re.compile(r'\s*\[\d+/\d+\]$')
+_datelen = 16       # Length of '<%Y-%m-%d %a>' (without a repeater or warning)
+_drawer_kinds = (DRAWER, PROPERTY, DRAWER_END)
+
+_keywords = {}      # Memo table, keyed on the patterns of the TODO states
+
+def get_keywords(todostates):
+    """Return a tuple of all TODO keywords, 'in progress' states first.
+
+    The same tuple is returned for the same TODO states, so all trees share it.
+    """
+    patterns = tuple(x.pattern for x in todostates.values())
+    try:
+        return _keywords[patterns]
+    except KeyError:
+        todos = [x.split('|') for x in patterns]
+        return _keywords.setdefault(patterns, tuple(item for sublist in todos for item in sublist))
+
+def classify(line):
+    """Return the type of a single line (without its trailing newline)."""
+    stripped = line.strip()
+    if not stripped:
+        return BLANK
+
+    first = line[0]
+    if first == '*':
+        stars = len(line) - len(line.lstrip('*'))
+        if stars == len(line) or line[stars] in ' \t':
+            return HEADING
+    elif first == '#' and line.startswith('#+'):
+        return KEYWORD
+
+    if stripped[0] == ':':
+        if stripped.upper() == ':END:':
+            return DRAWER_END
+        if _drawer.match(stripped):
+            return DRAWER
+        return PROPERTY
+    if stripped[0] in '-+' and (len(stripped) == 1 or stripped[1] in ' \t'):
+        return LIST_ITEM
+    if _planning.match(stripped):
+        return PLANNING
+
+    return TEXT
+
+#-------------------------------------------------------------------------------
+# Splitting a heading (or list item) into its components
+#-------------------------------------------------------------------------------
+def _split_tags(str_, end):
+    """Find the trailing tag groups (e.g., ':work:urgent:') of a string.
+
+    Returns:
+        A tuple with the position where the tags begin and the last tag group
+        (including its leading whitespace), which is '' if there are no tags.
+    """
+    tag = ''
+    while end > 0 and str_[end-1] == ':':
+        i = end
+        while i > 0 and (str_[i-1] == ':' or str_[i-1] == '_' or str_[i-1].isalnum()):
+            i -= 1
+        start = str_.index(':', i, end)
+        if end - start < 2:
+            break
+        while start > 0 and str_[start-1] in ' \t':
+            start -= 1
+        if not tag:
+            tag = str_[start:end]
+        end = start
+
+    return end, tag
+
+def _split_line(level, rest, keywords):
+    """Split the text following the level marker into a 'Task'."""
+    todostate = ''
+    if rest[:1].isspace():
+        for kw in keywords:
+            n = len(kw) + 1
+            # The keyword is followed by whitespace, or ends the line (e.g.,
+            # a heading without a title, but with a planning line)
+            if rest.startswith(kw, 1) and not rest[n:n+1].strip():
+                todostate = rest[:n+1].ljust(n+1)
+                rest = rest[n+1:]
+                break
+
+    end, tag = _split_tags(rest, len(rest))
+    date_one = ''
+    if end >= _datelen and rest[end-1] in '>]':
+        start = max(rest.rfind('<', 0, end), rest.rfind('[', 0, end))
+        if end - start >= _datelen and const.regex['date'].fullmatch(rest, start, end):
+            date_one = rest[start:end]
+            end = start
+    num_tasks = ''
+    if end > 0 and rest[end-1] == ']':
+        match = _num_tasks.search(rest, 0, end)
+        if match:
+            num_tasks = match.group()
+            end = match.start()
+
+    return Task(level, todostate, rest[:end], num_tasks, date_one + '\n', tag, ' '*10)
+
+def _task_item(line, indent):
+    """Return whether a list item can be a task: as with the regex-based
+    parser that the tokenizer replaced, it must be indented with 1-9 tabs, and
+    have a '-' bullet."""
+    return 0 < indent <= 9 and line[indent] == '-' and line[:indent] == '\t' * indent
+
+def _add_planning(task, line):
+    """Update a heading's task with the date in a 'SCHEDULED|DEADLINE' line."""
+    match = _planning.match(line.strip())
+    dtype = match.group(1)
+    if dtype == 'CLOSED':
+        return
+    task.date_one = match.group(2) + '\n'
+    task.date_two = dtype.title() + ':'
+    if dtype == 'DEADLINE':
+        task.date_two = ' ' + task.date_two
+
+#===============================================================================
+# Main function to tokenize a sequence of lines
+#===============================================================================
+def tokenize(lines, keywords, outline=None):
+    """Parse headings and list items from a sequence of lines.
+
+    This is a generator, so 'lines' can be an open file object and only one
+    heading is held in memory at a time.
+
+    Args:
+        lines (iterable): lines of an org file, with or without newlines
+        keywords (tuple): all TODO keywords (see 'get_keywords')
+        outline (Outline): if given, the headings, list items, and drawers
+            are added to it (see 'orgpy.outline'), which sets the inherited
+            tags and categories of the tasks once each section ends
+
+    Yields:
+        A 'Task' for each heading, and each list item indented with tabs (see
+        '_task_item'), with fields
+        - level     (the leading asterisks, or the indentation and bullet)
+        - todostate (one of "TODO", "DONE", etc., with surrounding whitespace)
+        - text      (the text of the task)
+        - num_tasks (a box for tasks with multiple sub-tasks, e.g. "[2/5]")
+        - date_one  (the date string and a newline; just a newline if none)
+        - tag       (tags surrounded by ":", if present; e.g. ":work:urgent:")
+        - date_two  ("Scheduled:" or " Deadline:" if the date came from a
+                     planning line, otherwise blank padding)
+    """
+    pending = None
+    for line in lines:
+        line = line.rstrip('\n')
+        kind = classify(line)
+        if pending is not None:
+            if kind == BLANK:
+                continue
+            if kind == PLANNING:
+                _add_planning(pending, line)
+            yield pending
+            pending = None
+
+        if kind == HEADING:
+            stars = len(line) - len(line.lstrip('*'))
+            pending = _split_line(line[:stars], line[stars:], keywords)
+            if outline is not None:
+                outline.heading(pending)
+        elif kind == LIST_ITEM:
+            indent = len(line) - len(line.lstrip())
+            if _task_item(line, indent):
+                pending = _split_line(line[:indent+1], line[indent+1:], keywords)
+                if outline is not None:
+                    outline.item(pending)
+        elif outline is not None and kind in _drawer_kinds:
+            outline.drawer_line(kind, line)
+
+    if pending is not None:
+        yield pending
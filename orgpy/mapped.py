@@ -0,0 +1,113 @@
+"""
+Reading an org file through a memory map, one top-level node at a time.
+
+The level-1 headings and the file-wide property lines ("#+") are found by
+their byte offsets, with 'find' on the mapped file, so the whole file is never
+decoded or split into lines. Each node is handed out as a 'MappedLines' (a
+byte range of the map) that is only decoded when its lines are first used.
+Since the pages of the map are backed by the file, only the node being parsed
+is held in memory as text.
+
+Example:
+    with open(orgfile, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for start, end in node_offsets(buf):
+                lines = MappedLines(buf, start, end)
+"""
+import locale
+from collections.abc import Sequence
+
+__all__ = ['MappedLines', 'keyword_lines', 'node_offsets']
+
+def node_offsets(buf):
+    """Yield the start and end offsets of each top-level node.
+
+    A node begins at a line starting with '* ', and ends where the next one
+    begins (or at the end of the file).
+    """
+    if buf[:2] == b'* ':
+        start = 0
+    else:
+        start = buf.find(b'\n* ') + 1
+        if start == 0:
+            return
+    while True:
+        end = buf.find(b'\n* ', start) + 1
+        if end == 0:
+            yield start, len(buf)
+            return
+        yield start, end
+        start = end
+
+def keyword_lines(buf, encoding=None):
+    """Yield the start offset and (decoded) text of each line containing '#+'."""
+    encoding = encoding or locale.getpreferredencoding(False)
+    i = buf.find(b'#+')
+    while i >= 0:
+        start = buf.rfind(b'\n', 0, i) + 1
+        end = buf.find(b'\n', i)
+        if end < 0:
+            end = len(buf)
+        yield start, str(buf[start:end], encoding).rstrip('\r')
+        i = buf.find(b'#+', end)
+
+class MappedLines(Sequence):
+    """The lines of a byte range of a memory-mapped file, decoded lazily.
+
+    The lines are the same as those read from the file in text mode (with
+    universal newlines), without their trailing newlines. The range is
+    decoded the first time a line is used, so nodes that are never used
+    (e.g., those reused by 'OrgTree.refresh') are never decoded.
+
+    Args:
+        buf (mmap.mmap): the memory-mapped file
+        start (int): the offset of the first byte
+        end (int): the offset after the last byte
+        encoding (str): the file's encoding (default: as for 'open')
+
+    Example:
+        lines = MappedLines(buf, 0, 120)
+        lines[0]            # The first line, e.g. '* TODO Some task'
+    """
+    def __init__(self, buf, start, end, encoding=None):
+        self.buf = buf
+        self.start = start
+        self.end = end
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self._lines = None
+
+    def __repr__(self):
+        return 'MappedLines(%i:%i)' % (self.start, self.end)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, i):
+        return self.lines[i]
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    @property
+    def lines(self):
+        """The decoded lines (the range is decoded on first use)."""
+        if self._lines is None:
+            with memoryview(self.buf) as view, view[self.start:self.end] as part:
+                text = str(part, self.encoding)
+            if '\r' in text:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            self._lines = text.split('\n')
+            if text.endswith('\n'):
+                del self._lines[-1]
+        return self._lines
+
+    def update_hash(self, h):
+        """Update a hash object with the raw bytes of the range, without copying.
+
+        For a file with '\\n' line endings, this gives the same digest as
+        hashing each line and a newline (as 'OrgTree.parse' does).
+        """
+        with memoryview(self.buf) as view, view[self.start:self.end] as part:
+            h.update(part)
+        if self.end == len(self.buf) and self.buf[self.end-1:self.end] != b'\n':
+            h.update(b'\n')
@@ -0,0 +1,188 @@
+"""
+The outline of an org node: a tree of headings with inherited attributes.
+
+The outline is built in the same pass over the lines as the tasks (see
+'lexer.tokenize'), with a stack of the headings that are still open. When a
+heading's section ends (at the next heading), its own tags and property
+drawer are known, and its effective tags, category, and properties are
+resolved from its parent's, which were resolved before. A heading without
+tags or a drawer refers to its parent's values instead of copying them, so
+resolving is O(# of headings), and no text is scanned twice.
+
+A heading's tags are its own, then those of its ancestors that it doesn't
+have, each once (e.g., ':urgent:work:'). Its category is the nearest one set
+in its own or an ancestor's drawer, joined with the file's; e.g., a heading
+with the category 'pets' in a file with the category 'home' has the category
+'Home: Pets' (lowercase categories are title-cased).
+
+    outline = Outline(category='Home')
+    tasks = list(lexer.tokenize(lines, keywords, outline))
+    outline.close()
+"""
+from . import lexer
+
+__all__ = ['Heading', 'Outline', 'drawer_properties', 'inherit_tags', 'join_category',
+           'tag_string']
+
+def join_category(file_category, own):
+    """Return the category of a heading, from the file's and the one set in
+    its (or its nearest ancestor's) drawer."""
+    if own.islower():
+        own = own.title()
+    return file_category + ': ' + own if file_category else own
+
+def inherit_tags(own, inherited):
+    """Return the distinct tags of a task, from its own tag string (e.g.,
+    '\t:urgent:work:') and the tags of its heading, its own first."""
+    return tuple(dict.fromkeys([x for x in own.strip().split(':') if x] + list(inherited)))
+
+def tag_string(tags):
+    """Return the displayed tag string of some tags (e.g., ':urgent:work:')."""
+    return ':' + ':'.join(tags) + ':' if tags else ''
+
+def _property(line):
+    """Return the (lowercase) key and the value of a property line."""
+    stripped = line.strip()
+    end = stripped.find(':', 1)
+    if end < 0:
+        return stripped[1:].lower(), ''
+    return stripped[1:end].lower(), stripped[end+1:].strip()
+
+class Heading:
+    """Class definition for a heading, with its effective attributes.
+
+    Args:
+        level (int): the # of asterisks (0 for the root of an outline)
+        parent (Heading): the enclosing heading (None for the root)
+        task (Task): the heading's task (None for the root)
+
+    Attributes:
+        drawer (dict): the heading's own properties (from its drawer)
+        tags (tuple): the distinct tags of the heading and its ancestors,
+            nearest first (see 'inherit_tags')
+        tag (str): the displayed tags (see 'tag_string')
+        category (str): the effective category (see 'join_category')
+        properties (dict): the effective properties; the same dict as the
+            parent's if the heading has no drawer, so don't modify it
+    """
+    __slots__ = ('level', 'parent', 'task', 'drawer', 'tags', 'tag', 'category', 'properties')
+
+    _empty = {}
+
+    def __init__(self, level, parent=None, task=None):
+        self.level = level
+        self.parent = parent
+        self.task = task
+        self.drawer = self._empty
+
+    def __repr__(self):
+        return 'Heading(%i, %r, %r)' % (self.level, self.task['text'] if self.task else '',
+                                        self.category)
+
+    def resolve(self, file_category=''):
+        """Set the effective attributes from the parent's (already resolved).
+
+        Args:
+            file_category (str): the category of the file (the root's)
+        """
+        parent = self.parent
+        self.tags, self.tag = parent.tags, parent.tag
+        if self.task['tag'].strip():
+            self.tags = inherit_tags(self.task['tag'], parent.tags)
+            self.tag = tag_string(self.tags)
+        self.category = parent.category
+        if 'category' in self.drawer:
+            self.category = join_category(file_category, self.drawer['category'])
+        self.properties = parent.properties
+        if self.drawer:
+            self.properties = dict(parent.properties, **self.drawer)
+
+class Outline:
+    """Class definition for building the outline of an org node.
+
+    'lexer.tokenize' calls 'heading' and 'item' for each task it creates,
+    and 'drawer_line' for the drawer lines; 'close' must be called at the
+    end. Each task then has its effective tags, category, and properties
+    (a list item has those of its heading).
+
+    Args:
+        category (str): the category of the file (the root of the outline)
+
+    Attributes:
+        root (Heading): the root of the outline (level 0)
+        headings (list): all headings, in the order of the file
+    """
+    def __init__(self, category=''):
+        self.root = Heading(0)
+        self.root.tags = ()
+        self.root.tag = ''
+        self.root.category = category
+        self.root.properties = {}
+        self.headings = []
+        self._stack = [self.root]
+        self._items = []        # The list items in the current section
+        self._drawer = False    # Whether inside a properties drawer
+
+    def __len__(self):
+        return len(self.headings)
+
+    def heading(self, task):
+        """Start the section of a new heading (for a task with asterisks)."""
+        self.end_section()
+        level = len(task['level'])
+        stack = self._stack
+        while stack[-1].level >= level:
+            stack.pop()
+        heading = Heading(level, stack[-1], task)
+        stack.append(heading)
+        self.headings.append(heading)
+
+    def item(self, task):
+        """Add a list item to the current section."""
+        self._items.append(task)
+
+    def drawer_line(self, kind, line):
+        """Read a drawer line (see 'lexer.classify') of the current section."""
+        if kind == lexer.DRAWER_END:
+            self._drawer = False
+        elif self._drawer:
+            key, value = _property(line)
+            heading = self._stack[-1]
+            if heading.drawer is Heading._empty:
+                heading.drawer = {}
+            heading.drawer[key] = value
+        elif kind == lexer.DRAWER:
+            self._drawer = line.strip().upper() == ':PROPERTIES:'
+
+    def end_section(self):
+        """Resolve the current heading, and set the tags, category, and
+        properties of its tasks."""
+        heading = self._stack[-1]
+        if heading is not self.root:
+            heading.resolve(self.root.category)
+            task = heading.task
+            task['tag'] = heading.tag
+            task['category'] = heading.category
+            task['properties'] = heading.properties
+        for task in self._items:
+            own = task['tag']
+            task['tag'] = tag_string(inherit_tags(own, heading.tags)) if own.strip() else heading.tag
+            task['category'] = heading.category
+            task['properties'] = heading.properties
+        self._items = []
+        self._drawer = False
+
+    def close(self):
+        """End the last section (after all lines have been read)."""
+        self.end_section()
+
+def drawer_properties(lines):
+    """Return the properties in the drawers of a section's lines, as read by
+    'Outline' (e.g., to know a heading's category before it is parsed)."""
+    outline = Outline()
+    outline._stack.append(Heading(1))
+    for line in lines:
+        kind = lexer.classify(line)
+        if kind in (lexer.DRAWER, lexer.PROPERTY, lexer.DRAWER_END):
+            outline.drawer_line(kind, line)
+    return outline._stack[-1].drawer
@@ -0,0 +1,144 @@
+"""
+Cheap pre-filters that skip parsing the parts of a node that can't match.
+
+A task's TODO state and own tags are copied from its line, and the only other
+tags it gets are those of its ancestors (see 'orgpy.outline'). So if the
+state or tag option is a plain word (without regex characters), a task can
+only match if the word is in the text of its section (its heading or list
+item and the lines up to the next heading) or, for tags, in the heading of an
+ancestor. Before a node is parsed, it is split into sections, and the
+sections without the words are dropped, except for the ancestors of the
+sections that are kept (whose tags and drawers are inherited). The category
+of each section is found from the file's category and the CATEGORY
+properties of the section and its ancestors, so it is matched exactly.
+
+The tasks that are parsed are still filtered as usual (see 'orgpy.index'), so
+the results are the same as when every node is parsed.
+"""
+import re
+from itertools import accumulate
+
+from . import lexer
+from .index import matcher
+from .outline import drawer_properties, join_category
+from .query import Query
+
+__all__ = ['NodeFilter']
+
+def _word(pattern, exclude=''):
+    """Return a pattern in lowercase if it is a plain ASCII word that can be
+    searched for in the text, or None."""
+    if not pattern or re.escape(pattern) != pattern:
+        return None
+    if any(ord(ch) > 127 or ch in exclude for ch in pattern):
+        return None
+    return pattern.lower()
+
+class NodeFilter:
+    """Class definition for the pre-filters from the CLI options.
+
+    Tags are only pre-filtered if the pattern has no colons or whitespace,
+    since the inherited tags are appended to a task's own tags (separated
+    by a space).
+
+    Args:
+        **kwargs: dictionary containing the command-line arguments (the
+            'states', 'tags', and 'categories' options are used)
+
+    Attributes:
+        states (str): the lowercase state word, or None
+        tags (str): the lowercase tag word, or None
+        category (function): tests a section's category, or None
+
+    Example:
+        node_filter = NodeFilter.from_options(tags='work')
+        lines = node_filter.prune(lines, category='Home')
+    """
+    def __init__(self, **kwargs):
+        self.states = _word(kwargs.get('states'))
+        self.tags = _word(kwargs.get('tags'), ': \t')
+        self.category = matcher(kwargs['categories']) if kwargs.get('categories') else None
+
+    @classmethod
+    def from_options(cls, **kwargs):
+        """Return a 'NodeFilter', or None if none of the options can be used.
+
+        The options are those of the query (see 'Query.from_options'); only
+        its first clause for each field is used, and negated clauses aren't.
+        """
+        node_filter = cls(**Query.from_options(**kwargs).patterns())
+        if node_filter.states or node_filter.tags or node_filter.category:
+            return node_filter
+        return None
+
+    def prune(self, lines, category):
+        """Return the lines of a node's sections that may have matching tasks.
+
+        The ancestors of a section are kept if it is, since their tags and
+        properties are inherited. If no section may match, an empty list is
+        returned.
+
+        Args:
+            lines (list): all lines of the node (without newlines)
+            category (str): the category of the file
+        """
+        text = '\n'.join(lines).lower()
+        if self.category is not None and ':category:' not in text:
+            # All sections have the file's category
+            if not self.category(category):
+                return []
+            if not (self.states or self.tags):
+                return lines
+        elif not (self.states or self.tags or self.category):
+            return lines
+
+        bounds = [0] + [i for i in range(1, len(lines))
+                        if lines[i][:1] == '*' and lexer.classify(lines[i]) == lexer.HEADING]
+        bounds.append(len(lines))
+        offsets = [0]
+        offsets += accumulate(len(x) + 1 for x in lines)
+
+        # The open ancestors of each section: (level, heading lines, category, index)
+        stack = [(0, '', category, -1)]
+        kept = []
+        for j in range(len(bounds) - 1):
+            first = lines[bounds[j]]
+            level = len(first) - len(first.lstrip('*'))
+            while stack[-1][0] >= level:
+                stack.pop()
+            start, end = offsets[bounds[j]], offsets[bounds[j+1]]
+            inherited = stack[-1][1] + '\n' + text[start:start + len(first)]
+            cat = stack[-1][2]
+            if self.category is not None and text.find(':category:', start, end) >= 0:
+                own = drawer_properties(lines[bounds[j]:bounds[j+1]]).get('category')
+                if own is not None:
+                    cat = join_category(category, own)
+
+            kept.append(self.search(text, start, end, inherited, cat))
+            if kept[-1]:
+                for x in stack[1:]:
+                    kept[x[3]] = True
+            stack.append((level, inherited, cat, j))
+
+        if not any(kept):
+            return []
+        return [line for j, keep in enumerate(kept) if keep
+                for line in lines[bounds[j]:bounds[j+1]]]
+
+    def search(self, text, start, end, inherited, category):
+        """Return whether a section has the state and tag words, and the category.
+
+        Args:
+            text (str): the node's text, in lowercase
+            start, end (int): the bounds of the section in 'text'
+            inherited (str): the heading lines of the section and its
+                ancestors, in lowercase
+            category (str): the category of the section's tasks
+        """
+        if self.category is not None and not self.category(category):
+            return False
+        if self.states and text.find(self.states, start, end) < 0:
+            return False
+        if self.tags and text.find(self.tags, start, end) < 0 and self.tags not in inherited:
+            return False
+        return True
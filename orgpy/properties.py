@@ -0,0 +1,101 @@
+"""
+Typed values of drawer properties, and conditions on them.
+
+The properties of each heading are read with its outline (see
+'orgpy.outline'), and a property's value is compared as the first of these
+types that fits it:
+
+- a duration, as in Org's effort estimates: '1:30' (hours and minutes), or
+  with units, e.g. '45min', '2h', or '1d 4h' (in minutes)
+- a number: e.g. '3' or '-2.5'
+- a date: e.g. '2021-03-08' or '<2021-03-08 Mon>' (as an ordinal)
+- otherwise, text (compared case-insensitively)
+
+A number is compared with a duration as a # of minutes (as in Org). Values of
+other, different types are only compared by '=' and '!=', as text.
+
+    name, check = condition('EFFORT>=2:00')
+    check('2:30')       # True
+"""
+import re
+import operator
+from datetime import date
+
+__all__ = ['condition', 'duration', 'typed']
+
+_units = {'min': 1, 'h': 60, 'd': 1440, 'w': 10080, 'm': 43200, 'y': 525960}
+_regex = {
+    'duration': re.compile(r'((?:\d+(?:\.\d+)?\s*(?:min|h|d|w|m|y)\s*)*)(?:(\d+):(\d\d))?'),
+    'unit': re.compile(r'(\d+(?:\.\d+)?)\s*(min|h|d|w|m|y)'),
+    'number': re.compile(r'[-+]?\d+(?:\.\d+)?'),
+    'date': re.compile(r'[<\[]?(\d{4})-(\d\d)-(\d\d)(?: [^>\]]*)?[>\]]?'),
+    'condition': re.compile(r'\s*([^\s=!<>]+)\s*(?:(!=|<=|>=|=|<|>)\s*(.*?))?\s*', re.DOTALL),
+}
+
+_compare = {'=': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+            '>': operator.gt, '>=': operator.ge}
+
+def duration(value):
+    """Return a duration (e.g., '1:30' or '1d 4h') in minutes, or None."""
+    match = _regex['duration'].fullmatch(value.strip())
+    if match is None or not (match.group(1) or match.group(2)):
+        return None
+    minutes = sum(float(n) * _units[u] for n, u in _regex['unit'].findall(match.group(1)))
+    if match.group(2):
+        minutes += int(match.group(2)) * 60 + int(match.group(3))
+    return minutes
+
+def typed(value):
+    """Return a property value as a tuple of its type and its typed value
+    (e.g., ('duration', 90.0) for '1:30')."""
+    minutes = duration(value)
+    if minutes is not None:
+        return ('duration', minutes)
+    value = value.strip()
+    if _regex['number'].fullmatch(value):
+        return ('number', float(value))
+    match = _regex['date'].fullmatch(value)
+    if match:
+        try:
+            return ('date', date(*map(int, match.groups())).toordinal())
+        except ValueError:
+            pass
+    return ('text', value.lower())
+
+def condition(text):
+    """Return the (lowercase) property name of a condition, and a function
+    testing a value of the property (None if a task doesn't have it).
+
+    The condition is a name ('OWNER', which tests that the property is set),
+    or a name, an operator ('=', '!=', '<', '<=', '>', or '>='), and a value
+    ('OWNER=alice' or 'EFFORT>=2:00'). A task without the property only
+    matches '!='.
+
+    Raises:
+        ValueError: if the condition is invalid, or has an operator without
+            a value (e.g., 'EFFORT>')
+    """
+    match = _regex['condition'].fullmatch(text)
+    if match is None:
+        raise ValueError('invalid property condition %r (e.g., "OWNER=alice" or '
+                         '"EFFORT>=2:00")' % text)
+    name, op, value = match.groups()
+    if op is None:
+        return name.lower(), lambda have: have is not None
+    if not value:
+        raise ValueError('property condition %r has no value after %r (e.g., "%s%s2:00", '
+                         'or "%s" to test that it is set)' % (text, op, name, op, name))
+
+    compare = _compare[op]
+    want = typed(value)
+    text_want = value.lower()
+    def check(have):
+        if have is None:
+            return op == '!='
+        kind, typed_have = typed(have)
+        if kind == want[0] or {kind, want[0]} == {'duration', 'number'}:
+            return compare(typed_have, want[1])
+        if op in ('=', '!='):
+            return compare(have.strip().lower(), text_want)
+        return False
+    return name.lower(), check
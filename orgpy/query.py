@@ -0,0 +1,306 @@
+"""
+A small query language for selecting tasks, compiled into a filter plan.
+
+A query is a list of clauses separated by whitespace, all of which a task
+must match; e.g.
+
+    state:TODO|WAIT tag:work -tag:someday days<14 category:proj
+
+- 'state:', 'tag:', and 'category:' match the TODO state, tags, and
+  category with a case-insensitive regex (a plain word is a substring test)
+- 'days' compares the # of days until the due date with '<', '<=', '>',
+  '>=', or '=' (e.g., 'days<0' for overdue tasks)
+- 'property:' tests a drawer property, with its typed value (e.g.,
+  'property:OWNER=alice' or 'property:EFFORT>=2:00'; see 'orgpy.properties')
+- a leading '-' negates a clause; quotes group words (e.g.,
+  'category:"Home: Pets"')
+
+The CLI options are clauses too: '-s X' is 'state:X', '-t X' is 'tag:X', '-g X'
+is 'category:X', '-p X' is 'property:X', and '-a' is 'days<N' (with 'N'
+from '-n'). A query is only
+compiled once for the same options (see 'Query.from_options'). Each clause
+remembers its result for each distinct value of its field, so a regex runs
+once per distinct value, as in 'orgpy.index'. The clauses are ordered so
+that the ones that reject the most tasks run first (see 'Query.plan'), and
+each task is dropped at the first clause that it fails.
+
+    query = Query.parse('state:TODO -tag:someday days<14')
+    todolist = query.select(tasks)
+"""
+import re
+import shlex
+import operator
+
+from . import properties
+from .index import coded_fields, matcher
+
+__all__ = ['Clause', 'Query', 'parse']
+
+_term = re.compile(r'(-?)([a-z]+)(<=|>=|[:<>=])(.+)', re.DOTALL)
+
+# The names of each field in a query, and the CLI option they stand for
+_options = {'state': 'states', 'states': 'states', 'tag': 'tags', 'tags': 'tags',
+            'category': 'categories', 'categories': 'categories', 'days': 'days',
+            'property': 'properties', 'properties': 'properties', 'prop': 'properties'}
+_names = {'states': 'state', 'tags': 'tag', 'categories': 'category', 'days': 'days',
+          'properties': 'property'}
+
+_compare = {':': operator.eq, '=': operator.eq, '<': operator.lt, '<=': operator.le,
+            '>': operator.gt, '>=': operator.ge}
+
+# The estimated fraction of tasks matching a clause, if there is no index
+_priors = {'states': 0.6, 'tags': 0.2, 'categories': 0.3, 'days': 0.5, 'properties': 0.2}
+
+_plans = {}         # The queries already compiled, keyed on the options
+
+class Clause:
+    """Class definition for a single clause of a query.
+
+    Args:
+        option (str): 'states', 'tags', 'categories', 'properties', or 'days'
+        op (str): the operator (':' for all but 'days')
+        value (str or int): the pattern, the property condition, or the # of
+            days
+        negate (bool): whether the clause is negated
+
+    Attributes:
+        test (function): tests a task (a 'Task' or dict)
+        name (str): the property's name (for 'properties')
+        check (function): tests a value of the field, or of the property
+            (without the negation; not for 'days')
+
+    Raises:
+        ValueError: if the pattern or the property condition is invalid
+    """
+    __slots__ = ('option', 'op', 'value', 'negate', 'test', 'name', 'check')
+
+    def __init__(self, option, op, value, negate=False):
+        self.option = option
+        self.op = op
+        self.value = value
+        self.negate = negate
+        if option == 'days':
+            self.test = self._compare(_compare[op], value, negate)
+        elif option == 'properties':
+            self.name, self.check = properties.condition(value)
+            self.test = self._property(self.name, self.check, negate)
+        else:
+            try:
+                self.check = matcher(value)
+            except re.error as e:
+                raise ValueError('invalid pattern in %r: %s' % (str(self), e)) from None
+            self.test = self._lookup(coded_fields[option], self.check, negate)
+
+    def __repr__(self):
+        return 'Clause(%r)' % str(self)
+
+    def __str__(self):
+        value = str(self.value)
+        if any(ch.isspace() or ch in '"\'' for ch in value):
+            value = shlex.quote(value)
+        return '%s%s%s%s' % ('-' if self.negate else '', _names[self.option], self.op, value)
+
+    @staticmethod
+    def _lookup(field, match, negate):
+        """Return a test of a string field, remembering the result for each value."""
+        results = {}
+        def test(d):
+            value = d[field]
+            result = results.get(value)
+            if result is None:
+                result = results[value] = bool(match(value)) != negate
+            return result
+        return test
+
+    @staticmethod
+    def _property(name, check, negate):
+        """Return a test of a task's property, remembering the result for each value."""
+        results = {}
+        empty = {}
+        def test(d):
+            value = (d.get('properties') or empty).get(name)
+            result = results.get(value)
+            if result is None:
+                result = results[value] = check(value) != negate
+            return result
+        return test
+
+    @staticmethod
+    def _compare(compare, days, negate):
+        """Return a test of the # of days until the due date."""
+        if negate:
+            return lambda d: not compare(d['days'], days)
+        return lambda d: compare(d['days'], days)
+
+    @property
+    def indexed(self):
+        """Whether the matching tasks can be looked up in a 'TaskIndex' (a
+        property condition can't if tasks without the property match it)."""
+        if self.negate:
+            return False
+        if self.option == 'properties':
+            return not self.check(None)
+        return self.option in coded_fields
+
+    def count(self, index):
+        """Return the number of tasks in a 'TaskIndex' that match the
+        clause (without the negation)."""
+        if self.option == 'properties':
+            count = index.property_count(self.name, self.check)
+            if self.check(None):
+                count += index.size - index.property_count(self.name, lambda value: True)
+            return count
+        return index.count(self.option, self.value)
+
+    def ids(self, index):
+        """Return the set of ids of the tasks in a 'TaskIndex' that match an
+        indexed clause."""
+        if self.option == 'properties':
+            return index.property_ids(self.name, self.check)
+        return index.ids(self.option, self.value)
+
+    def estimate(self, index=None):
+        """Return the estimated fraction of tasks that match the clause.
+
+        With a 'TaskIndex', the fraction is exact for all but 'days'.
+        """
+        if index is not None and self.option != 'days':
+            fraction = self.count(index) / index.size if index.size else 0
+        elif self.option == 'days' and self.op in (':', '='):
+            fraction = 0.05
+        else:
+            fraction = _priors[self.option]
+        return 1 - fraction if self.negate else fraction
+
+class Query:
+    """Class definition for a compiled query (see the module's docstring).
+
+    Args:
+        clauses (list): 'Clause' objects, all of which a task must match
+
+    Example:
+        query = Query.from_options(states='TODO', agenda=True, num_days=7)
+        todolist = query.select(tree.tasks, tree.index)
+    """
+    def __init__(self, clauses=()):
+        self.clauses = list(clauses)
+
+    def __repr__(self):
+        return 'Query(%r)' % str(self)
+
+    def __str__(self):
+        return ' '.join(str(c) for c in self.clauses)
+
+    def __bool__(self):
+        return bool(self.clauses)
+
+    def __call__(self, task):
+        """Return whether a task matches all clauses."""
+        return all(c.test(task) for c in self.clauses)
+
+    @classmethod
+    def parse(cls, text):
+        """Return the 'Query' for the text of a query.
+
+        Raises:
+            ValueError: if a clause is invalid
+        """
+        try:
+            terms = shlex.split(text)
+        except ValueError as e:
+            raise ValueError('invalid query %r: %s' % (text, e)) from None
+
+        clauses = []
+        for term in terms:
+            match = _term.fullmatch(term)
+            if match is None or match.group(2) not in _options:
+                raise ValueError('invalid clause %r (e.g., "state:TODO", "-tag:work", '
+                                 'or "days<7")' % term)
+            negate, name, op, value = match.groups()
+            option = _options[name]
+            if option == 'days':
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ValueError('invalid # of days in %r' % term) from None
+            elif op != ':':
+                raise ValueError("invalid clause %r (use ':' for %s)" % (term, name))
+            clauses.append(Clause(option, op, value, bool(negate)))
+        return cls(clauses)
+
+    @classmethod
+    def from_options(cls, **kwargs):
+        """Return the 'Query' for the CLI options.
+
+        The 'states', 'tags', and 'categories' options, the 'properties'
+        conditions (a list), 'agenda' (with 'num_days'), and the 'query' text
+        are combined; any that are missing or empty are ignored. The query is
+        compiled once for the same options.
+        """
+        agenda = kwargs.get('agenda')
+        key = (kwargs.get('query'), kwargs.get('states'), kwargs.get('tags'),
+               kwargs.get('categories'), tuple(kwargs.get('properties') or ()),
+               kwargs.get('num_days') if agenda else None)
+        query = _plans.get(key)
+        if query is None:
+            clauses = [Clause(x, ':', kwargs[x]) for x in coded_fields if kwargs.get(x)]
+            clauses += [Clause('properties', ':', x) for x in kwargs.get('properties') or ()]
+            if agenda:
+                clauses.append(Clause('days', '<', kwargs['num_days']))
+            if kwargs.get('query'):
+                clauses += cls.parse(kwargs['query']).clauses
+            query = _plans[key] = cls(clauses)
+        return query
+
+    def patterns(self):
+        """Return the pattern of the first (non-negated) clause for each of
+        'states', 'tags', and 'categories' that has one (e.g., for a
+        'NodeFilter')."""
+        patterns = {}
+        for c in self.clauses:
+            if c.option in coded_fields and not c.negate:
+                patterns.setdefault(c.option, c.value)
+        return patterns
+
+    def plan(self, index=None):
+        """Return the clauses in the order they are tested: those matching
+        the fewest tasks first, and the # of days before the string fields
+        when the estimates are equal (since it is the cheapest test)."""
+        return sorted(self.clauses, key=lambda c: (c.estimate(index), c.option != 'days'))
+
+    def filter(self, tasks):
+        """Yield the tasks that match, in their original order (lazily)."""
+        tests = [c.test for c in self.plan()]
+        if not tests:
+            yield from tasks
+            return
+        first, rest = tests[0], tests[1:]
+        for d in tasks:
+            if first(d) and all(test(d) for test in rest):
+                yield d
+
+    def select(self, tasks, index=None):
+        """Return the tasks that match, in their original order.
+
+        If 'index' is the 'TaskIndex' of 'tasks', and the clause matching the
+        fewest tasks is indexed and matches fewer than half of them, only the
+        tasks it matches are tested against the other clauses.
+        """
+        plan = self.plan(index)
+        if not plan:
+            return list(tasks)
+        if index is not None and plan[0].indexed and plan[0].estimate(index) < 0.5:
+            lead = plan.pop(0)
+            tasks = [tasks[i] for i in sorted(lead.ids(index))]
+            if not plan:
+                return tasks
+
+        tests = [c.test for c in plan]
+        if len(tests) == 1:
+            return list(filter(tests[0], tasks))
+        first, rest = tests[0], tests[1:]
+        return [d for d in tasks if first(d) and all(test(d) for test in rest)]
+
+def parse(text):
+    """Return the 'Query' for the text of a query (see 'Query.parse')."""
+    return Query.parse(text)
@@ -0,0 +1,154 @@
+"""
+Writing the task list as aligned columns.
+
+The width of each column is the length of the plain text of its longest
+field. The plain lengths are recorded when the fields are created (see
+'utils.colorize' and 'plain_widths'), so the ANSI sequences never need to be
+stripped again to measure them. All lines are joined and written at once,
+which is much faster than printing each line when the output is a pipe.
+
+For the streaming mode ('--stream'), the widths are fixed ahead of time
+instead (see 'fixed_widths'), so the tasks of each file can be written as soon
+as the file has been parsed.
+
+Example:
+    writer = TaskWriter(table_widths(widths, agenda=False), colors=True)
+    writer.write(header(**cli) + writer.rows(todolist, widths))
+"""
+import sys
+
+from . import const
+
+__all__ = ['columns', 'plain_widths', 'table_widths', 'fixed_widths', 'header', 'TaskWriter']
+
+# The padded columns, in the order of the widths of each task
+columns = ('todostate', 'category', 'text', 'num_tasks', 'tag', 'date_two')
+
+RESET = '\x1b[0m'
+
+def plain_widths(task):
+    """Return the widths of the columns of a task that isn't colorized."""
+    return tuple(len(task[c]) for c in columns)
+
+def table_widths(widths, agenda=False):
+    """Return the width of each column from the widths of all tasks.
+
+    The 'category' column also holds the dates, so it is at least as wide as
+    a date (16 characters in agenda mode, 14 otherwise).
+    """
+    table = [max(x) for x in zip(*widths)] if widths else [0] * len(columns)
+    table[1] = max(16 if agenda else 14, table[1])
+    return table
+
+def fixed_widths(todostates, colors=False, agenda=False, text=50, **kwargs):
+    """Return column widths that are known before any file is parsed.
+
+    The TODO states and the 'Scheduled:'/'Deadline:' labels have known
+    widths; the category and text columns get fixed widths, and longer
+    fields just push the rest of their line to the right.
+    """
+    keywords = [x for y in todostates.values() for x in y.pattern.split('|')]
+    state = max(len(x) for x in keywords) + (0 if colors else 2)
+    return [state, 16 if agenda else 14, text, 6, 0, 10]
+
+#-------------------------------------------------------------------------------
+# The header printed above the tasks (if the output has colors)
+#-------------------------------------------------------------------------------
+def delim(n=30):
+    """Return a line of blue '#' symbols."""
+    return '\t\t' + const.styles['url'] + n*'#'
+
+def header(**kwargs):
+    """Return the lines of a colorful, informative header."""
+    if not kwargs['colors']:
+        return []
+    styles = const.styles
+    if kwargs['agenda']:
+        if kwargs['num_days'] == 7:
+            line = '\t\t\t      {}WEEK AGENDA{}'.format(styles['checkbox'], styles['normal'])
+        else:
+            line = '\t\t\t     {}{} DAY AGENDA{}'.format(styles['checkbox'], kwargs['num_days'], styles['normal'])
+    elif kwargs['tags']:
+        line = '\t\t    {}Headlines with {}TAGS {}match: {}{}'.format(
+            styles['checkbox'],
+            styles['tag'],
+            styles['checkbox'],
+            styles['late'],
+            kwargs['tags'])
+    elif kwargs['categories']:
+        line = '\t\t {}Headlines with {}CATEGORY {}match: {}{}'.format(
+            styles['checkbox'],
+            styles['tag'],
+            styles['checkbox'],
+            styles['late'],
+            kwargs['categories'])
+
+    # All dates and tags
+    else:
+        if kwargs['states']:
+            state = styles[kwargs['states'].lower()] + kwargs['states'].upper()
+            statelen = len(kwargs['states'].upper())
+        else:
+            state = styles['late'] + 'ALL'
+            statelen = 3
+        line = '\t\t' + styles['checkbox'] + ' '*(5 - statelen) + 'Global list of ' \
+               + styles['todo'] + 'TODO' + styles['checkbox'] + ' items of type: ' + state
+
+    return [delim(40), line, delim(40)]
+
+#===============================================================================
+# Writing the lines
+#===============================================================================
+class TaskWriter:
+    """Class definition for writing tasks as lines with aligned columns.
+
+    When the output has colors, the style is reset around the end of each
+    line, as 'colorama' does after each 'print' (see 'utils.init_colors');
+    it resets the style after the last line itself.
+
+    Args:
+        widths (list): the width of each column (see 'table_widths' and
+            'fixed_widths')
+        out (file): where to write (default: 'sys.stdout' when writing)
+        colors (bool): whether the output has colors
+
+    Attributes:
+        end (str): the end of each line (except the last)
+        last (str): the end of the last line
+
+    Example:
+        writer = TaskWriter(widths, colors=True)
+        writer.write(writer.rows(todolist, task_widths))
+    """
+    def __init__(self, widths, out=None, colors=False, **kwargs):
+        self.widths = widths
+        self.out = out
+        self.end = RESET + '\n' + RESET if colors else '\n'
+        self.last = RESET + '\n' if colors else '\n'
+
+    def rows(self, tasks, widths):
+        """Return a line for each task, padding its columns.
+
+        Args:
+            tasks (list): the tasks (possibly colorized)
+            widths (list): the plain widths of each task's columns
+        """
+        state, cat, text, check, tag, date2 = self.widths
+        lines = []
+        for d, (w_state, w_cat, w_text, w_check, w_tag, w_date2) in zip(tasks, widths):
+            lines.append(''.join([
+                d['date_one'].replace('<', '').replace('>', ''), ' ',
+                d['category'], ' '*(cat + 1 - w_cat),
+                ' '*(date2 + 1 - w_date2), d['date_two'], ' ',
+                d['todostate'], ' '*(state + 2 - w_state),
+                d['text'], d['num_tasks'], ' '*(text + 1 - w_text), ' '*(check + 1 - w_check),
+                d['tag'], ' '*(tag + 1 - w_tag)]))
+        return lines
+
+    def write(self, lines):
+        """Write lines (with a single 'write' call), and flush the output."""
+        if not lines:
+            return
+        out = self.out or sys.stdout
+        out.write(self.end.join(lines) + self.last)
+        out.flush()
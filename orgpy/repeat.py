@@ -0,0 +1,112 @@
+"""
+Repeating dates and warning periods (e.g., '<2021-03-08 Mon +1w -3d>').
+
+A repeater ('+1w', '++1m', or '.+1d') makes a task recur at each interval
+after its date. The three kinds only differ in how Org moves the date when
+the task is marked done, so they recur the same way in the agenda. The
+occurrences are generated lazily, starting with the first one in a range of
+days, so the cost is the # of occurrences in the range, however far back the
+task's date is. An hourly repeater ('+5h') counts from the start of the date
+(dates don't have times), and the task recurs once on each day it falls on.
+
+A warning period ('-3d') is how long before a deadline it is shown on today's
+date in the agenda (otherwise, it is shown as soon as it is in the agenda's
+range of days).
+
+    rep = repeater('<2021-03-08 Mon +1w>')     # ('+', 1, 'w')
+    list(occurrences(date(2021, 3, 8).toordinal(), rep, start, end))
+"""
+import re
+import calendar
+from datetime import date
+
+__all__ = ['next_occurrence', 'occurrences', 'repeater', 'warning']
+
+_regex = {
+    'repeater': re.compile(r' (\+\+|\.\+|\+)(\d+)([hdwmy])'),
+    'warning': re.compile(r' --?(\d+)([hdwmy])'),
+}
+_days = {'h': 1 / 24, 'd': 1, 'w': 7, 'm': 30.4, 'y': 365.25}
+_max_days = {'h': 1, 'd': 1, 'w': 7, 'm': 31, 'y': 366}    # Longest interval, per unit
+
+_repeaters = {}     # Memo tables, keyed on the date strings
+_warnings = {}
+
+def repeater(datestr):
+    """Return the repeater of a date string as a tuple of its kind ('+',
+    '++', or '.+'), its interval, and its unit ('h', 'd', 'w', 'm', or 'y'),
+    or None if the date doesn't repeat."""
+    try:
+        return _repeaters[datestr]
+    except KeyError:
+        match = _regex['repeater'].search(datestr)
+        rep = (match.group(1), int(match.group(2)), match.group(3)) if match else None
+        _repeaters[datestr] = rep
+        return rep
+
+def warning(datestr):
+    """Return the warning period of a date string in days (e.g., 3 for
+    '-3d'), or None if it has none."""
+    try:
+        return _warnings[datestr]
+    except KeyError:
+        match = _regex['warning'].search(datestr)
+        days = int(int(match.group(1)) * _days[match.group(2)]) if match else None
+        _warnings[datestr] = days
+        return days
+
+def _add_months(day, months):
+    """Return the ordinal of a date plus some months (the day of the month is
+    clipped to the last day of a shorter month)."""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1])).toordinal()
+
+def _hourly(ordinal, hours, start, end):
+    """Yield the date ordinals on which an hourly repeater recurs (once for
+    each day, other than the date's own)."""
+    if hours <= 24:
+        # Consecutive times are at most a day apart, so every day has one
+        yield from range(max(start, ordinal + 1), end)
+        return
+    first = ordinal * 24 + hours                        # In hours
+    k = max(0, -(-(start * 24 - first) // hours))
+    for time in range(first + k * hours, end * 24, hours):
+        yield time // 24
+
+def occurrences(ordinal, rep, start, end):
+    """Yield the date ordinals on which a repeating date recurs, from 'start'
+    up to (but not including) 'end' (lazily).
+
+    Args:
+        ordinal (int): the ordinal of the date itself (not yielded)
+        rep (tuple): the date's repeater (see 'repeater')
+        start, end (int): the date ordinals of the range
+    """
+    kind, n, unit = rep
+    if n <= 0:
+        return
+    if unit == 'h':
+        yield from _hourly(ordinal, n, start, end)
+    elif unit in ('m', 'y'):
+        day = date.fromordinal(ordinal)
+        months = n * 12 if unit == 'y' else n
+        first = date.fromordinal(max(start, ordinal + 1))
+        k = max(1, ((first.year - day.year) * 12 + first.month - day.month) // months)
+        while True:
+            next_ = _add_months(day, k * months)
+            if next_ >= end:
+                return
+            if next_ >= start:
+                yield next_
+            k += 1
+    else:
+        step = max(1, int(n * _days[unit]))
+        k = max(1, -(-(start - ordinal) // step))
+        yield from range(ordinal + k * step, end, step)
+
+def next_occurrence(ordinal, rep, start):
+    """Return the ordinal of the first date on or after 'start' on which a
+    repeating date recurs (see 'occurrences'), or None if it doesn't."""
+    n, unit = rep[1:]
+    return next(occurrences(ordinal, rep, start, start + n * _max_days[unit] + 1), None)
@@ -0,0 +1,295 @@
+"""
+A long-running server that keeps the parsed org files in memory.
+
+Start the server with
+
+    python3 -m orgpy serve
+
+and query it with the thin client, which accepts the same options as orgpy:
+
+    python3 -m orgpy.client -ca
+
+The agenda files are watched for changes (with inotify if the optional
+'inotify_simple' package is installed, otherwise by polling), and only the
+top-level nodes that changed are parsed again (see 'OrgTree.refresh').
+"""
+import io
+import os
+import sys
+import json
+import socket
+import argparse
+import threading
+import contextlib
+import socketserver
+
+from . import config, const, timings, utils
+from .client import socket_path
+from .query import Query
+from .tree import OrgTree, print_todolist, stream_trees
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+__all__ = ['OrgServer', 'run']
+
+RESET = '\x1b[0m'
+# Options used when (re-)parsing; filtering happens for each query instead
+_no_filters = {'agenda': False, 'states': None, 'tags': None, 'categories': None,
+               'properties': None, 'query': None, 'num_days': 7, 'cache': False}
+
+class _AutoResetWriter(io.StringIO):
+    """Add a reset sequence after each write, as colorama does for terminals."""
+    def write(self, str_):
+        n = super().write(str_)
+        super().write(RESET)
+        return n
+
+#===============================================================================
+# Server class
+#===============================================================================
+class OrgServer(socketserver.UnixStreamServer):
+    """Answer orgpy queries on a Unix socket from the trees held in memory.
+
+    Args:
+        path (str): path of the Unix socket
+        rcfile (str): vim config file containing vim-orgmode info
+        interval (float): seconds between checks for changed files, if
+            inotify isn't available
+        mmap (bool): whether to memory-map the org files (see 'OrgTree')
+
+    Attributes:
+        config (Config): the settings read from 'rcfile'
+        rcfile (str): the absolute path of 'rcfile'
+        orgfiles (list): the agenda files from 'rcfile' (may be empty, if
+            the queries give their files with '-f')
+        todostates (dict): the TODO keywords from 'rcfile'
+        options (dict): the options used when (re-)parsing the org files
+        trees (dict): an 'OrgTree' for each org file that has been queried
+        log (file): where to report reloaded files (the server's stderr; the
+            output of a query is written to streams of its own)
+    """
+    def __init__(self, path, rcfile, interval=1.0, mmap=False):
+        self.config = cfg = config.load(rcfile)
+        self.rcfile = os.path.abspath(os.path.expanduser(rcfile))
+        self.log = sys.stderr
+        self.todostates = cfg.todostates
+        self.orgfiles = [f for f in cfg.orgfiles or () if f]
+        self.interval = interval
+        self.options = dict(_no_filters, mmap=mmap)
+        self.lock = threading.Lock()
+        self.trees = {}
+        self.stats = {}
+        for f in self.orgfiles:
+            self.add_file(f)
+
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, RequestHandler)
+
+    def add_file(self, orgfile):
+        """Parse an org file and start watching it."""
+        self.stats[orgfile] = self.get_stat(orgfile)
+        self.trees[orgfile] = OrgTree(orgfile, self.todostates, **self.options)
+
+    @staticmethod
+    def get_stat(orgfile):
+        """Return the modification time and size of a file, or None."""
+        try:
+            stat = os.stat(orgfile)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    #-------------------------------------------------------
+    # Watching files for changes
+    #-------------------------------------------------------
+    def check(self, orgfile):
+        """Refresh the tree for an org file if the file has changed."""
+        stat = self.get_stat(orgfile)
+        if stat is None or stat == self.stats[orgfile]:
+            return
+        with self.lock:
+            self.trees[orgfile].properties['cli'] = self.options
+            reused, rebuilt = self.trees[orgfile].refresh()
+            self.stats[orgfile] = stat
+        print('%s: reused %i nodes, rebuilt %i' % (orgfile, reused, rebuilt), file=self.log)
+
+    def watch(self):
+        """Watch the org files for changes; this runs in its own thread."""
+        if inotify_simple is None:
+            while True:
+                threading.Event().wait(self.interval)
+                for f in list(self.trees):
+                    self.check(f)
+
+        # Watch the directories, since editors often replace the file
+        inotify = inotify_simple.INotify()
+        flags = inotify_simple.flags
+        dirs = {}
+        for f in list(self.trees):
+            dirname = os.path.dirname(os.path.abspath(f))
+            if dirname not in dirs.values():
+                wd = inotify.add_watch(dirname, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+                dirs[wd] = dirname
+        while True:
+            for event in inotify.read(timeout=int(self.interval * 1000)):
+                path = os.path.join(dirs[event.wd], event.name)
+                for f in list(self.trees):
+                    if os.path.abspath(f) == path:
+                        self.check(f)
+            for f in list(self.trees):
+                if os.path.dirname(os.path.abspath(f)) not in dirs.values():
+                    self.check(f)       # Files added by a query (e.g., '-f')
+
+    #-------------------------------------------------------
+    # Answering queries
+    #-------------------------------------------------------
+    def query(self, argv, tty=False, cwd=None):
+        """Run a query with the given CLI arguments, as 'orgTreeFromFile' does.
+
+        The '--format', '--stream', and '--timings' options work as in the
+        CLI; '--profile' is rejected, since the server's process isn't the
+        client's, and so is an '--rcfile' other than the server's.
+
+        Only the parsing of the arguments redirects 'sys.stdout' and
+        'sys.stderr' (for 'argparse'); the query writes to streams of its own,
+        so that nothing that other threads print ends up in the response.
+
+        Args:
+            argv (list): the CLI arguments
+            tty (bool): whether the client's stdout is a terminal
+            cwd (str): the client's working directory, for a relative
+                '--rcfile' (default: the server's)
+
+        Returns:
+            A dict with the text written to stdout ('output') and stderr
+            ('error'), and the exit status ('status').
+        """
+        from .__main__ import parse_cli
+
+        out = io.StringIO()
+        err = io.StringIO()
+        status = 0
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                # The rcfile stays None unless it is given
+                opts = vars(parse_cli(argv, argparse.Namespace(rcfile=None)))
+            except SystemExit as e:         # From 'argparse' (e.g., '--help')
+                return {'output': out.getvalue(), 'error': err.getvalue(), 'status': e.code or 0}
+
+        # The records are written as they are (without reset sequences)
+        if tty and not opts['format']:
+            out = _AutoResetWriter()
+        rcfile = opts['rcfile']
+        if rcfile is not None:
+            rcfile = os.path.abspath(os.path.join(cwd or '', os.path.expanduser(rcfile)))
+        if opts['profile']:
+            print('orgpy server: --profile is not supported; run "python3 -m orgpy '
+                  '--profile FILE" instead', file=err)
+            status = 2
+        elif rcfile is not None and rcfile != self.rcfile:
+            print('orgpy server: --rcfile %s is not the server\'s (%s); restart the server '
+                  'with "python3 -m orgpy serve -r %s"' % (opts['rcfile'], self.rcfile, rcfile),
+                  file=err)
+            status = 2
+        else:
+            if opts['timings']:
+                timings.enable()
+            try:
+                self.answer(dict(opts, rcfile=self.rcfile, out=out))
+            except config.ConfigError as e:
+                print('orgpy: error: %s' % e, file=err)
+                status = 2
+            except Exception as e:
+                print('orgpy server: %r' % e, file=err)
+                status = 1
+            finally:
+                if opts['timings']:
+                    timings.report(err)
+                    timings.disable()
+
+        output = out.getvalue()
+        if not tty:
+            output = const.regex['ansicolors'].sub('', output)
+        return {'output': output, 'error': err.getvalue(), 'status': status}
+
+    def answer(self, opts):
+        """Print the tasks matching the CLI options (already parsed) from the
+        trees in memory: as a table, streamed, or as records ('format'), to
+        the 'out' option (a file), or 'sys.stdout'."""
+        orgfiles = self.config.agenda_files(opts['file'])
+        query = Query.from_options(**opts)
+        utils.update_today()
+        with self.lock:
+            trees = []
+            for f in orgfiles:
+                if f not in self.trees:
+                    self.add_file(f)
+                self.trees[f].get_days_to_duedate()
+                trees.append((f, self.trees[f]))
+
+            if opts['format']:
+                from . import export
+                with timings.stage('export'):
+                    count = export.write((export.record(d, f) for f, tree in trees
+                                          for d in tree.select(query)), opts['format'],
+                                         opts.get('out'))
+                timings.count('tasks matched', count)
+                return
+            if opts['stream'] and not opts['agenda']:
+                stream_trees((tree for f, tree in trees), self.todostates, copies=True, **opts)
+                return
+            with timings.stage('filter'):
+                todolist = [d.copy() for f, tree in trees for d in tree.select(query)]
+        timings.count('tasks matched', len(todolist))
+        print_todolist(todolist, **opts)
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Read a JSON request from the client, and write a JSON response."""
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode())
+        response = self.server.query(request['argv'], request.get('tty', False),
+                                     request.get('cwd'))
+        self.wfile.write(json.dumps(response).encode())
+
+#-------------------------------------------------------------------------------
+# Run from the command line
+#-------------------------------------------------------------------------------
+def run(argv=None):
+    """Start the server ('python3 -m orgpy serve')."""
+    parser = argparse.ArgumentParser(prog='python3 -m orgpy serve',
+            description='Keep org files parsed in memory and answer orgpy queries.')
+    parser.add_argument('-r', '--rcfile',
+                        action='store', default=os.path.expanduser('~/.vimrc'),
+                        help='Vim config file containing vim-orgmode info')
+    parser.add_argument('-s', '--socket',
+                        action='store', default=socket_path(),
+                        help='Path of the Unix socket (default: %(default)s)')
+    parser.add_argument('-i', '--interval',
+                        action='store', type=float, default=1.0,
+                        help='Seconds between checks for changed files')
+    parser.add_argument('--mmap',
+                        action='store_true', default=False,
+                        help='Memory-map the org files; unchanged nodes are not decoded again')
+    args = parser.parse_args(argv)
+
+    # Don't replace the socket of a server that is still running
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        if sock.connect_ex(args.socket) == 0:
+            sys.exit('orgpy server is already running at %s' % args.socket)
+
+    try:
+        server = OrgServer(args.socket, args.rcfile, args.interval, args.mmap)
+    except config.ConfigError as e:
+        sys.exit('orgpy server: %s' % e)
+    threading.Thread(target=server.watch, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
@@ -0,0 +1,172 @@
+"""
+A columnar table of tasks, to filter the tasks of all org files at once.
+
+The 'days' of the tasks are stored in an integer array, and each field that a
+query tests (the TODO state, tags, category, or a property) is stored as an
+array of integer codes, one for each distinct value. A clause of a query (see
+'orgpy.query') is then only tested once for each distinct value, which gives
+a mask over all tasks, and the masks of all clauses are combined in a single
+pass. The columns are built the first time a query uses them, so the views of
+a batch (see 'orgpy.batch') share them.
+
+If NumPy is installed, the masks are vectorized, and the code arrays of a
+table made from org trees are filled from the index of each tree (see
+'orgpy.index') instead of reading every task. Building a column still costs
+more than an index lookup, so a query whose clauses aren't all in columns yet
+is run with the index of each tree (see 'Query.select') when that narrows the
+tasks down. Without NumPy, the index is always used, since it is faster than
+testing every task in Python; only a table without indexes is filtered with
+pure-Python masks.
+"""
+from array import array
+from itertools import compress
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .index import coded_fields
+from .query import _compare
+
+__all__ = ['TaskTable']
+
+class TaskTable:
+    """Class definition for a columnar table of tasks.
+
+    Args:
+        tasks (list): 'Task' objects (with 'days' already calculated), or
+            None with 'parts'
+        parts (list): the tasks and the 'TaskIndex' of each tree (see
+            'from_trees'), in order; the table's tasks are all of them
+
+    Attributes:
+        codes (dict): for each of 'states', 'tags', and 'categories' used by
+            a query (or ('properties', name) for a property), an array with
+            an integer code for each task
+        values (dict): the distinct values for each code array, so that
+            'values[key][codes[key][i]]' is the value for task 'i'
+
+    Example:
+        table = TaskTable.from_trees(trees)
+        todolist = table.select(Query.parse('state:TODO tag:work days<7'))
+    """
+    def __init__(self, tasks, parts=()):
+        self.parts = list(parts)
+        self.codes = {}
+        self.values = {}
+        self._tasks = tasks
+        self._days = None
+
+    @classmethod
+    def from_trees(cls, trees):
+        """Return the table of the tasks of some 'OrgTree' objects."""
+        return cls(None, [(tree.tasks, tree.index) for tree in trees])
+
+    def __len__(self):
+        return len(self.tasks)
+
+    @property
+    def tasks(self):
+        """All tasks, in their original order (a list)."""
+        if self._tasks is None:
+            self._tasks = [d for tasks, index in self.parts for d in tasks]
+        return self._tasks
+
+    @property
+    def days(self):
+        """The # of days until each task is due (an array)."""
+        if self._days is None:
+            self._days = array('l', map(attrgetter('days'), self.tasks))
+        return self._days
+
+    def column(self, key):
+        """Return the codes for a field (building them on first use)."""
+        if key not in self.codes:
+            if self.parts and np is not None:
+                self.codes[key], self.values[key] = self._indexed_column(key)
+            else:
+                if isinstance(key, tuple):
+                    empty = {}
+                    column = [(d.get('properties') or empty).get(key[1]) for d in self.tasks]
+                else:
+                    field = coded_fields[key]
+                    column = [d[field] for d in self.tasks]
+                index = {}
+                self.codes[key] = array('L', [index.setdefault(x, len(index)) for x in column])
+                self.values[key] = list(index)
+        return self.codes[key]
+
+    def _indexed_column(self, key):
+        """Return the codes and the distinct values of a field, from the
+        postings of each index (with NumPy)."""
+        codes = np.zeros(len(self.tasks), dtype=np.uint32)
+        values = {None: 0} if isinstance(key, tuple) else {}   # (Tasks without the property)
+        start = 0
+        for tasks, index in self.parts:
+            if isinstance(key, tuple):
+                post = index.properties.get(key[1], {})
+            else:
+                post = index.postings[key]
+            if post:
+                ids = np.concatenate([np.frombuffer(x, dtype=x.typecode) for x in post.values()])
+                part = np.array([values.setdefault(x, len(values)) for x in post], dtype=np.uint32)
+                codes[ids + start] = np.repeat(part, [len(x) for x in post.values()])
+            start += len(tasks)
+        return codes, list(values)
+
+    @staticmethod
+    def _key(clause):
+        """Return the key of the column that a clause tests (not for 'days')."""
+        return ('properties', clause.name) if clause.option == 'properties' else clause.option
+
+    def _columnar(self, query):
+        """Return whether masks are cheaper than the indexes for a query: if
+        the columns that it needs are already built, or if no index narrows
+        the tasks down (see 'Query.select')."""
+        if all(self._key(c) in self.codes for c in query.clauses if c.option != 'days'):
+            return True
+        for tasks, index in self.parts:
+            lead = query.plan(index)[0]
+            if lead.indexed and lead.estimate(index) < 0.5:
+                return False
+        return True
+
+    def mask(self, clause):
+        """Return whether each task matches a 'Clause' (a NumPy array of
+        bools, or an iterator if NumPy isn't installed)."""
+        if clause.option == 'days':
+            compare = _compare[clause.op]
+            if np is not None:
+                mask = compare(np.frombuffer(self.days, dtype=self.days.typecode), clause.value)
+                return ~mask if clause.negate else mask
+            return (compare(x, clause.value) != clause.negate for x in self.days)
+
+        key = self._key(clause)
+        codes = self.column(key)
+        lut = [bool(clause.check(x)) != clause.negate for x in self.values[key]]
+        if np is not None:
+            return np.array(lut, dtype=bool)[np.asarray(codes)]
+        return map(lut.__getitem__, codes)
+
+    def select(self, query):
+        """Return the tasks matching a 'Query', in their original order (see
+        the module's docstring)."""
+        if not query:
+            return list(self.tasks)
+        if self.parts and (np is None or not self._columnar(query)):
+            todolist = []
+            for tasks, index in self.parts:
+                todolist += query.select(tasks, index)
+            return todolist
+
+        masks = [self.mask(c) for c in query.clauses]
+        if np is not None:
+            mask = masks[0]
+            for other in masks[1:]:
+                mask &= other
+            return [self.tasks[i] for i in np.flatnonzero(mask)]
+        if len(masks) == 1:
+            return list(compress(self.tasks, masks[0]))
+        return list(compress(self.tasks, map(all, zip(*masks))))
@@ -0,0 +1,101 @@
+"""
+A compact record for a single task (a heading or list item of an org file).
+"""
+from . import const
+
+__all__ = ['Task']
+
+class Task:
+    """A single task, with the fields in 'const.task_fields', plus the
+    'ordinal' of its due date, its 'days' until then, and the 'properties'
+    of its heading (see 'orgpy.outline').
+
+    The fields are stored in '__slots__', which takes much less memory than a
+    dict with the same keys. For compatibility, a 'Task' can also be used like
+    a dict; e.g., 'task['text']', 'task.update(text=...)', and
+    '"{text}".format(**task)' all work. A field that hasn't been set (such as
+    'ordinal' and 'days' before the due date is parsed) is treated as a
+    missing key.
+
+    Example:
+        task = Task(todostate=' TODO ', text='Call the dentist')
+        task['days'] = 3
+    """
+    __slots__ = const.task_fields + ('ordinal', 'days', 'properties')
+    _keys = frozenset(__slots__)        # For fast membership tests
+
+    def __init__(self, level='', todostate='', text='', num_tasks='', date_one='',
+                 tag='', date_two='', category='', ordinal=None, days=None, properties=None):
+        self.level = level
+        self.todostate = todostate
+        self.text = text
+        self.num_tasks = num_tasks
+        self.date_one = date_one
+        self.tag = tag
+        self.date_two = date_two
+        self.category = category
+        if ordinal is not None:
+            self.ordinal = ordinal
+        if days is not None:
+            self.days = days
+        if properties is not None:
+            self.properties = properties
+
+    def __repr__(self):
+        return 'Task(%s)' % ', '.join('%s=%r' % x for x in self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Task, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __reduce__(self):
+        """Pickle as a plain tuple of the field values."""
+        return (Task, tuple(getattr(self, k, None) for k in self.__slots__))
+
+    #-------------------------------------------------------
+    # Methods for compatibility with dict's
+    #-------------------------------------------------------
+    def __getitem__(self, key):
+        if key in self._keys:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._keys:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._keys and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return [k for k in self.__slots__ if hasattr(self, k)]
+
+    def values(self):
+        return [getattr(self, k) for k in self.keys()]
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in self.keys()]
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self._keys else default
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def copy(self):
+        new = Task.__new__(Task)
+        for k, v in self.items():
+            setattr(new, k, v)
+        return new
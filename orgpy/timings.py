@@ -0,0 +1,165 @@
+"""
+Lightweight timings and counters for the stages of 'orgTreeFromFile'.
+
+Everything is disabled by default: 'stage' then returns a shared context
+manager that does nothing, and counters are only updated after checking
+'enabled'. Once 'enable' is called (e.g., by the '--timings' CLI option),
+the wall time of each stage is recorded, and calls to orgpy's precompiled
+regex patterns (e.g., 'const.regex' and those of 'lexer') are counted. The
+patterns are swapped for counted ones, and restored by 'disable'; the 're'
+module itself is left alone.
+
+Example:
+    timings.enable()
+    with timings.stage('parse'):
+        ...
+    timings.count('bytes read', 1024)
+    timings.report()
+"""
+import sys
+import time
+import importlib
+
+__all__ = ['enable', 'disable', 'stage', 'count', 'merge', 'report']
+
+enabled = False
+times = {}          # Stage name -> total seconds (in the order first seen)
+counters = {}       # Counter name -> total
+
+_re_methods = ('match', 'fullmatch', 'search', 'sub', 'subn', 'split', 'findall', 'finditer')
+
+# The precompiled patterns that are counted: (module, name of a pattern or of a
+# dict of patterns); the modules are only imported when counting starts, so
+# that importing this module is cheap
+_patterns = (('const', 'regex'), ('lexer', '_planning'), ('lexer', '_drawer'),
+             ('lexer', '_num_tasks'), ('properties', '_regex'), ('query', '_term'),
+             ('repeat', '_regex'))
+_originals = {}     # (module, name) -> the original pattern or dict
+
+#-------------------------------------------------------------------------------
+# Timing stages
+#-------------------------------------------------------------------------------
+class _Stage:
+    """Context manager adding the elapsed time to a stage."""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        times[self.name] = times.get(self.name, 0) + time.perf_counter() - self.start
+
+class _NullStage:
+    """Context manager that does nothing (when timings are disabled)."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_null_stage = _NullStage()
+
+def stage(name):
+    """Return a context manager timing the stage 'name' (if enabled)."""
+    return _Stage(name) if enabled else _null_stage
+
+def count(name, n=1):
+    """Add 'n' to a counter (if enabled)."""
+    if enabled:
+        counters[name] = counters.get(name, 0) + n
+
+def merge(other):
+    """Add the counters from another process (see 'tree.load_trees')."""
+    for name, n in other.items():
+        count(name, n)
+
+#-------------------------------------------------------------------------------
+# Counting regex calls
+#-------------------------------------------------------------------------------
+def _counted(func):
+    def wrapper(*args, **kwargs):
+        counters['regex calls'] = counters.get('regex calls', 0) + 1
+        return func(*args, **kwargs)
+    return wrapper
+
+class _CountedPattern:
+    """A compiled regex whose matching methods are counted."""
+    def __init__(self, pattern):
+        self._pattern = pattern
+        for name in _re_methods:
+            setattr(self, name, _counted(getattr(pattern, name)))
+
+    def __getattr__(self, name):
+        return getattr(self._pattern, name)
+
+def _wrap_patterns():
+    """Replace orgpy's precompiled patterns with counted versions."""
+    for module, name in _patterns:
+        module = importlib.import_module('.' + module, __package__)
+        patterns = getattr(module, name)
+        if isinstance(patterns, dict):
+            _originals[module, name] = dict(patterns)
+            patterns.update((k, _CountedPattern(v)) for k, v in _originals[module, name].items())
+        else:
+            _originals[module, name] = patterns
+            setattr(module, name, _CountedPattern(patterns))
+    const = importlib.import_module('.const', __package__)
+    _originals[const, 'inline'] = {k: v['pattern'] for k, v in const.inline.items()}
+    for key, pattern in _originals[const, 'inline'].items():
+        const.inline[key]['pattern'] = _CountedPattern(pattern)
+
+def _unwrap_patterns():
+    """Restore the original patterns."""
+    for (module, name), patterns in _originals.items():
+        if name == 'inline':
+            for key, pattern in patterns.items():
+                module.inline[key]['pattern'] = pattern
+        elif isinstance(patterns, dict):
+            getattr(module, name).update(patterns)
+        else:
+            setattr(module, name, patterns)
+    _originals.clear()
+
+#-------------------------------------------------------------------------------
+# Turning timings on and off, and printing a summary
+#-------------------------------------------------------------------------------
+def enable(regex=True):
+    """Start recording timings and counters (clearing any previous ones).
+
+    Args:
+        regex (bool): whether to count regex calls, which adds a little time
+            to each call
+    """
+    global enabled
+    disable()
+    times.clear()
+    counters.clear()
+    if regex:
+        _wrap_patterns()
+    enabled = True
+
+def disable():
+    """Stop recording timings and counters."""
+    global enabled
+    if _originals:
+        _unwrap_patterns()
+    enabled = False
+
+def report(file=None):
+    """Print a summary of the timings and counters (to stderr by default)."""
+    file = file or sys.stderr
+    total = sum(times.values())
+    print('%-16s %10s %6s' % ('Stage', 'Time (ms)', '%'), file=file)
+    for name, secs in times.items():
+        print('%-16s %10.1f %6.1f' % (name, secs * 1e3, 100 * secs / (total or 1)), file=file)
+    print('%-16s %10.1f' % ('total', total * 1e3), file=file)
+    if counters:
+        print('', file=file)
+        for name, n in counters.items():
+            print('%-16s %10s' % (name, format(n, ',')), file=file)
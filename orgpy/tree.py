@@ -1,10 +1,19 @@
-import re
+import io
 import os
-import copy
-
-from . import const, utils
-
-__all__ = ['OrgTree', 'orgTreeFromFile']
+import mmap
+import hashlib
+
+from . import cache, config, const, lexer, render, timings, utils
+from .agenda import next_occurrence
+from .index import TaskIndex
+from .mapped import MappedLines, keyword_lines, node_offsets
+from .outline import Outline
+from .prefilter import NodeFilter
+from .query import Query
+from .table import TaskTable
+from .task import Task
+
+__all__ = ['OrgTree', 'load_trees', 'orgTreeFromFile', 'print_todolist']
 #===============================================================================
 # Class definition for an org "tree"; i.e., a unit of the outline hierarchy
 #===============================================================================
@@ -13,7 +22,21 @@ class OrgTree:
 
     If there are multiple level-one headings---with a single asterisk---they
     will be stored in the 'children' attribute. The tasks from the children
-    will be merged into the 'active' attribute.
+    will be merged into the 'tasks' attribute, and those matching the CLI
+    options are in the 'active' attribute.
+
+    If the 'cache' option is set, the tasks and file-wide properties are
+    loaded from (or saved to) the on-disk cache; see 'orgpy.cache'. In that
+    case, there are no children if the file was unchanged since it was cached.
+
+    If the 'mmap' option is set, the file is memory-mapped instead of read
+    line by line, and each top-level node is decoded only when it is parsed
+    (see 'orgpy.mapped'); this keeps memory low for very large files.
+
+    If the cache isn't used, the state, tag, and category options are also
+    used to skip parsing the parts of nodes that can't match (see
+    'orgpy.prefilter'). In that case, 'tasks' only has the tasks of the parts
+    that were parsed.
 
     Args:
         orgfile (str): full pathname of the org file
@@ -22,31 +45,33 @@ class OrgTree:
         **kwargs: dictionary containing the command-line arguments
 
     Attributes:
-        active (list): dicts of all active (incomplete) tasks (from all children)
+        tasks (list): all active (incomplete) tasks (from all children), as
+            'Task' objects
+        active (list): the tasks that match the CLI options
+        index (TaskIndex): inverted index of the tasks' states, tags, and
+            categories (see 'orgpy.index')
         properties (dict): contains file-wide variables and the CLI options
         children (list): list of 'OrgNode' objects
-        data (str): string containing all text in the org file
 
     Example:
         tree = OrgTree('~/notes.org', todostates, **cli_opts)
     """
     def __init__(self, orgfile, todostates, **kwargs):
-        self.properties = {
-            'file': orgfile,
-            'base': os.path.split(orgfile)[1],
-            'todostates': todostates,
-            'regex_line': utils.get_parse_string(todostates),
-            'cli': kwargs,
-        }
-
-        with open(orgfile, 'r') as f:
-            self.data = f.read()
-        self.check_properties()
+        self.init_properties(orgfile, todostates, **kwargs)
 
         # Parse the file for child nodes, and combine the child lists
         self.children = []
-        self.parse()
-        self.merge_children()
+        key = cache.get_key(orgfile, todostates) if kwargs.get('cache') else None
+        if key and self.load_cache(key):
+            timings.count('files cached')
+        else:
+            self.read()
+            self.merge_children()
+            if key:
+                self.save_cache(key)
+
+        # Filter active tasks by agenda, category, or 'todo' state
+        self.subset()
 
     def __repr__(self):
         return 'Org file "%s" with %i children' % (self.properties['base'], len(self))
@@ -55,12 +80,73 @@ class OrgTree:
         """Returns the number of child objects."""
         return(len(self.children))
 
-    def check_properties(self):
-        """Look for file-wide properties in the org file.
+    def __getstate__(self):
+        """Keep only the tasks and file-wide properties when pickling.
 
-        Returns:
-            A list of tuples with the property name as its first element
-            and the value as its second.
+        Each task is stored as a tuple of its values (in the order given by
+        'const.task_fields'), which is much more compact than a dict, and the
+        drawer properties of the tasks are stored in a separate list (the
+        tasks of a heading share the same dict, which is pickled once). The
+        children and the CLI options are not kept, but the index is.
+        """
+        properties = {k: v for k, v in self.properties.items() if k != 'cli'}
+        tasks = [tuple(d[k] for k in const.task_fields) for d in self.tasks]
+        drawers = [d.get('properties') for d in self.tasks]
+        return {'properties': properties, 'tasks': tasks, 'drawers': drawers,
+                'index': self.index}
+
+    def __setstate__(self, state):
+        """Restore an 'OrgTree'; call 'subset' after setting the CLI options."""
+        self.properties = dict(state['properties'], cli={})
+        self.children = []
+        self.tasks = [Task(*x, properties=p) for x, p in zip(state['tasks'], state['drawers'])]
+        self.index = state['index']
+        self.active = self.tasks
+
+    @classmethod
+    def from_cache(cls, orgfile, todostates, key=None, **kwargs):
+        """Return an 'OrgTree' from the cache, or None if it isn't cached.
+
+        The cache 'key' is looked up if it isn't given.
+        """
+        tree = cls.__new__(cls)
+        tree.properties = {'cli': kwargs}
+        if not tree.load_cache(key or cache.get_key(orgfile, todostates)):
+            return None
+        timings.count('files cached')
+        tree.subset()
+        return tree
+
+    @classmethod
+    def from_text(cls, orgfile, todostates, text, key=None, **kwargs):
+        """Return an 'OrgTree' from the contents of an org file that was
+        already read (e.g., asynchronously; see 'orgpy.aio').
+
+        If the 'cache' option is set, the tree is saved with 'key', which must
+        be the key from before the file was read (see 'cache.get_key').
+        """
+        tree = cls.__new__(cls)
+        tree.init_properties(orgfile, todostates, **kwargs)
+        tree.children = []
+        tree.read(text=text)
+        tree.merge_children()
+        if key:
+            tree.save_cache(key)
+        tree.subset()
+        return tree
+
+    def init_properties(self, orgfile, todostates, **kwargs):
+        """Set the properties that don't depend on the file's contents."""
+        self.properties = {
+            'file': orgfile,
+            'base': os.path.split(orgfile)[1],
+            'todostates': todostates,
+            'keywords': lexer.get_keywords(todostates),
+            'cli': kwargs,
+        }
+
+    def check_properties(self, line):
+        """Look for a file-wide property in a line of the org file.
 
         These are lines beginning with "#+", followed by a word in all
         uppercase and a colon. The property value ends the line. For
@@ -68,44 +154,230 @@ class OrgTree:
             #+TITLE: My org file
             #+CATEGORY: personal
 
-        which would return
-            [('TITLE', 'My org file'), ('CATEGORY', 'personal')]
+        which would add the keys 'title' and 'category' to 'properties'.
+        A property applies to the nodes that follow it in the file.
         """
-        matches = const.regex['properties'].findall(self.data)
-        if matches:
-            for _, x in enumerate(matches):
-                self.properties[x[0].lower()] = x[1]
+        match = const.regex['properties'].search(line)
+        if match:
+            self.properties[match.group(1).lower()] = match.group(2)
 
     #-------------------------------------------------------
     # The main class method to parse child nodes
     #-------------------------------------------------------
-    def parse(self):
+    def read(self, reuse=None, text=None):
+        """Open the org file (memory-mapped if the 'mmap' option is set), and
+        parse it (see 'parse'), pre-filtering the nodes unless caching.
+
+        If the file's contents were already read, they can be given as 'text'.
+        """
+        orgfile = self.properties['file']
+        cli = self.properties['cli']
+        node_filter = None if cli.get('cache') else NodeFilter.from_options(**cli)
+        if text is not None:
+            size = len(text)
+            counts = self.parse(io.StringIO(text), reuse, node_filter)
+        elif cli.get('mmap'):
+            with open(orgfile, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:           # An empty file can't be mapped
+                    counts = self.parse([], reuse, node_filter)
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                        counts = self.parse(buf, reuse, node_filter)
+        else:
+            with open(orgfile, 'r') as f:
+                size = os.fstat(f.fileno()).st_size
+                counts = self.parse(f, reuse, node_filter)
+
+        if timings.enabled:
+            timings.count('files parsed')
+            timings.count('bytes read', size)
+        return counts
+
+    def parse(self, lines, reuse=None, node_filter=None):
         """Parse org file into a tree or trees if there are multiple roots.
 
-        The 'parse' method searches for top-level nodes in the file (i.e.,
-        those beginning with a single asterisk and space) and creates a list
-        of "OrgNode" objects for each node.
+        The 'parse' method reads the file one line at a time, searching for
+        top-level nodes (i.e., those beginning with a single asterisk and
+        space), and creates an "OrgNode" object as soon as each node ends.
+        Only the lines of the current node are held in memory.
+
+        Each node gets a 'hash' of its text and of the file-wide property
+        lines read so far. If 'reuse' is given, it maps hashes to lists of
+        existing nodes, and a node with the same hash is reused instead of
+        being parsed again.
+
+        If 'lines' is a memory-mapped file, the nodes are found by their byte
+        offsets instead (see 'split_mapped').
+
+        If 'node_filter' is given, only the parts of each node that may match
+        it are parsed (see 'OrgNode'). These nodes get no hash, so they are
+        never reused.
+
+        Returns:
+            A tuple with the number of nodes that were reused and rebuilt
         """
-        lines = self.data.splitlines()
-        level = 1
-        bounds = []
-        for i, x in enumerate(lines):
-            if re.search(r'^\*{' + str(level) + '} ', x):
-                bounds.append(i)
-        bounds.append(len(lines))   # To get the last heading and its content
+        reused = rebuilt = 0
+        split = self.split_mapped if isinstance(lines, mmap.mmap) else self.split
+        for block in split(lines):
+            h = hashlib.blake2b(self.keyword_hash, digest_size=16)
+            if isinstance(block, MappedLines):
+                block.update_hash(h)
+            else:
+                for line in block:
+                    h.update(line.encode() + b'\n')
+            key = h.digest()
+
+            if reuse and reuse.get(key):
+                node = reuse[key].pop()
+                reused += 1
+            else:
+                node = OrgNode(block, node_filter, **self.properties)
+                node.hash = key if node_filter is None else None
+                rebuilt += 1
+            self.children.append(node)
+
+        timings.count('nodes', rebuilt)
+        return reused, rebuilt
+
+    def iter_active(self):
+        """Yield the active tasks of each top-level node as soon as it is parsed.
+
+        Unlike 'read', the nodes aren't kept, so only one node (and its
+        tasks) is held in memory at a time. The nodes are pre-filtered by the
+        CLI options, as in 'read', but the tasks aren't filtered exactly (see
+        'iter_tasks').
+        """
+        orgfile = self.properties['file']
+        cli = self.properties['cli']
+        node_filter = NodeFilter.from_options(**cli)
+        if cli.get('mmap'):
+            with open(orgfile, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:       # Can't be mapped
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    for block in self.split_mapped(buf):
+                        yield from OrgNode(block, node_filter, **self.properties).active
+        else:
+            with open(orgfile, 'r') as f:
+                for block in self.split(f):
+                    yield from OrgNode(block, node_filter, **self.properties).active
+
+    def split(self, lines):
+        """Yield the lines of each top-level node, checking for properties.
 
-        trees = []
-        for i in range(len(bounds) - 1):
-            trees.append(lines[bounds[i]:bounds[i+1]])
+        The property lines are also hashed into 'keyword_hash', which is part
+        of the hash of each node that follows them.
+        """
+        self.keyword_hash = b''
+        block = []
+        for line in lines:
+            line = line.rstrip('\n')
+            if '#+' in line:
+                self.check_properties(line)
+                self.keyword_hash = hashlib.blake2b(self.keyword_hash + line.encode(),
+                                                   digest_size=16).digest()
+            if line.startswith('* '):
+                if block:
+                    yield block
+                block = [line]
+            elif block:
+                block.append(line)
+
+        if block:
+            yield block
+
+    def split_mapped(self, buf):
+        """Yield a 'MappedLines' for each top-level node of a memory-mapped
+        file, checking for properties as 'split' does.
+
+        The property lines up to (and including) the first line of the next
+        node are checked before a node is yielded, as they are by 'split'.
+        """
+        self.keyword_hash = b''
+        keywords = keyword_lines(buf)
+        pending = next(keywords, None)
+        for start, end in node_offsets(buf):
+            while pending is not None and pending[0] <= end:
+                line = pending[1]
+                self.check_properties(line)
+                self.keyword_hash = hashlib.blake2b(self.keyword_hash + line.encode(),
+                                                   digest_size=16).digest()
+                pending = next(keywords, None)
+            yield MappedLines(buf, start, end)
+
+        # Property lines in a file without nodes
+        while pending is not None:
+            self.check_properties(pending[1])
+            pending = next(keywords, None)
+
+    def refresh(self):
+        """Read the org file again, and rebuild only the nodes that changed.
+
+        Nodes whose hash is unchanged are reused, wherever they are in the
+        file; changed or inserted nodes are parsed, and deleted ones dropped.
+        Afterwards, 'tasks' and 'active' are updated.
+
+        Returns:
+            A tuple with the number of nodes that were reused and rebuilt
+        """
+        old = {}
+        for ch in self.children:
+            old.setdefault(ch.hash, []).append(ch)
 
-        for tree in trees:
-            self.children.append(OrgNode('\n'.join(tree), **self.properties))
+        self.properties = {k: self.properties[k] for k in
+                           ['file', 'base', 'todostates', 'keywords', 'cli']}
+        self.children = []
+        counts = self.read(old)
+        self.merge_children()
+        self.subset()
+        return counts
 
     def merge_children(self):
-        """Join the active tasks from all children."""
-        self.active = []
+        """Join the active tasks from all children, and index them."""
+        self.tasks = []
         for ch in self.children:
-            self.active += ch.active
+            self.tasks += ch.active
+        self.index = TaskIndex(self.tasks)
+
+    #-------------------------------------------------------
+    # Loading and saving from the cache
+    #-------------------------------------------------------
+    def load_cache(self, key):
+        """Load the tasks and file-wide properties from the cache, if current."""
+        state = cache.load(key)
+        if state is None:
+            return False
+        cli = self.properties['cli']
+        self.__setstate__(state)
+        self.properties['cli'] = cli
+        return True
+
+    def save_cache(self, key):
+        """Save the tasks and file-wide properties to the cache."""
+        cache.save(key, self.__getstate__())
+
+    # Add # of days to the dicts, and subset based on CLI options
+    #-------------------------------------------------------
+    def subset(self):
+        """Keep the tasks matching the CLI options (see 'Query.from_options')."""
+        self.get_days_to_duedate()
+        self.active = self.select(Query.from_options(**self.properties['cli']))
+
+    def select(self, query):
+        """Return the tasks matching a 'Query', using the index (see 'Query.select')."""
+        return query.select(self.tasks, self.index)
+
+    def get_days_to_duedate(self):
+        """Update the active TODO dicts with the days left until the due date.
+
+        Each date is only parsed once, into the task's 'ordinal'.
+        """
+        today = const.today_ordinal
+        for d in self.tasks:
+            if 'ordinal' not in d:
+                d['ordinal'] = utils.date_ordinal(d['date_one'])
+            d['days'] = d['ordinal'] - today
 
 #===============================================================================
 # Class definition for an org "node", a single hierarchy (starting at any level)
@@ -114,115 +386,63 @@ class OrgNode:
     """Class definition for a single org 'node', or a single hierarchy.
 
     Args:
-        data (str): all text in the node
+        lines (list): all lines of text in the node
+        node_filter (NodeFilter): if given, only the sections of the node that
+            may have tasks matching it are parsed (see 'orgpy.prefilter')
         properties (dict): the properties from the parent 'OrgTree'
 
     Attributes:
-        data (str): copy of all text in the node
-        properties (dict): copy of parent's properties, plus any new ones
+        hash (bytes): set by the parent 'OrgTree' (see 'OrgTree.parse'); None
+            if the node was pre-filtered
+        properties (dict): the properties from the parent 'OrgTree'
         level (int): the # of asterisks of the node
-        parsed (list): the 'data', parsed into dict's
+        outline (Outline): the headings of the node, with their inherited
+            tags, categories, and properties (see 'orgpy.outline')
+        parsed (list): the headings and list items, parsed into 'Task' objects
         active (list): only "active" TODO's
     """
 
-    def __init__(self, data, **properties):
-        self.data = data
+    def __init__(self, lines, node_filter=None, **properties):
         self.properties = properties
-        self.update_properties()
-        levels = [len(x) - len(x.lstrip('*')) for x in self.data.splitlines()]
+        levels = [len(x) - len(x.lstrip('*')) for x in lines]
         self.max_level = max(levels)
         self.level = levels[0]
 
-        # Parse the lines in this node, and get active tasks
-        self.parse()
+        # Parse the lines in this node (that may match), and get active tasks
+        if node_filter is not None:
+            lines = node_filter.prune(lines, self.category())
+        self.parse(lines)
         self.get_active_todos()
 
-        #TODO This would apply a tag to all sub-nodes; is this appropriate?
-        if self.parsed[0]['tag'] != '':
-            self.add_tag()
-
-        if 'category' in self.properties:
-            if isinstance(self.properties['category'], list):
-                # Preserve categories that are all uppercase
-                new_cat = [x.title() if x.islower() else x for x in self.properties['category']]
-                self.properties.update(category=new_cat)
-            else:
-                if self.properties['category'].islower():
-                    self.properties.update(category=self.properties['category'].title())
-
-            self.add_category()
-
-        # If 'category' is a list, combine them; also, strip whitespace from tags
-        for i, d in enumerate(self.active):
-            self.active[i].update(tag=d['tag'].strip())
-            if isinstance(d['category'], list):
-                self.active[i].update(category=': '.join(d['category']))
-
-        # Filter active tasks by agenda, category, or 'todo' state
-        self.get_days_to_duedate()
-        for p in ['agenda', 'states', 'tags', 'categories']:
-            if self.properties['cli'][p]:
-                self.subset_by(p)
-
     #-------------------------------------------------------
     # Class methods
     #-------------------------------------------------------
-    def update_properties(self):
-        """Check if there are any node-specific 'PROPERTIES'."""
-        lines = self.data.splitlines()
-        bounds = []
-        for i, x in enumerate(lines):
-            if re.search(':PROPERTIES:', x):
-                bounds.append(i)
-                break
-        for i, x in enumerate(lines):
-            if re.search(':END:', x):
-                bounds.append(i)
-                break
-        if len(bounds) < 2:
-            return None
-
-        # Drawers in orgmode are key-value pairs associated with a node or tree
-        drawer = lines[bounds[0]:bounds[1]]
-        drawerlines = [x.split(':')[1:] for x in drawer[1:]]
-        properties = {d[0].lower(): d[1].strip() for d in drawerlines}
-        for k, v in properties.items():
-            #TODO isn't this always True?
-            if k in self.properties.keys():
-                self.properties.update({k: [self.properties[k], v]})
-            else:
-                self.properties.update({k: v})
+    def category(self):
+        """Return the category of the file ('' if there is none); lowercase
+        categories are title-cased."""
+        category = self.properties.get('category', '')
+        return category.title() if category.islower() else category
 
-    # Main method to parse the raw text into dict's for each line
+    # Main method to parse the raw text into a 'Task' for each line
     #-------------------------------------------------------
-    def parse(self):
-        """Parse each line in the node into a dictionary.
+    def parse(self, lines):
+        """Parse each heading or list item in the node into a 'Task', and
+        build the outline of its headings.
 
-        The components of the dictionary are:
+        The fields of each task are:
             - level (the # of asterisks)
             - todostate (TODO, STARTED, DONE, etc.)
             - text (the task's main text)
             - num_tasks (for checkboxes)
             - date_one (date string on the same line as the content)
             - date_two ('SCHEDULED'|'DEADLINE' plus date string if on 2nd line)
-            - tag
+            - tag (its own tags, then those of its ancestors, each once)
+            - category (see 'outline.join_category')
         """
-        regex_line = self.properties['regex_line']
-        matches = [x.groupdict() for x in regex_line.finditer(self.data)]
-        for _, d in enumerate(matches):
-            if not d['tag']:
-                d['tag'] = ''
-            if const.regex['date'].search(d['date_two']):
-                if re.search('SCHEDULED|DEADLINE', d['date_two']):
-                    d['date_one'] = d['date_two'].strip().split(': ')[1]
-                    d['date_two'] = d['date_two'].strip().split(': ')[0].title() + ':'
-                    if re.search('Deadline', d['date_two']):
-                        d['date_two'] = ' ' + d['date_two']
-            if d['date_two'] == '\n':
-                d['date_two'] = ' '*10
-            if '\n' not in d['date_one']:
-                d['date_one'] = d['date_one'] + '\n'
-        self.parsed = matches
+        self.outline = Outline(self.category())
+        self.parsed = list(lexer.tokenize(lines, self.properties['keywords'], self.outline))
+        self.outline.close()
+        timings.count('tasks created', len(self.parsed))
 
     def get_active_todos(self):
         """Keep only the active TODO tasks in 'self.active'."""
@@ -233,90 +453,271 @@ class OrgNode:
                     date_lines.append(d)
         self.active = date_lines
 
-    # Add category, tag, and # of days to the dicts
-    #-------------------------------------------------------
-    def add_category(self):
-        """Add a category, if present, to each line's 'dict' representation."""
-        node_cat = self.properties['category']
-        for d in self.active:
-            d.update(category=node_cat)
-
-    def add_tag(self):
-        """Add a tag, if present, to each line's 'dict' representation."""
-        node_tag = self.parsed[0]['tag']
-        for d in self.active:
-            d.update(tag=d.get('tag') + node_tag)
+#-----------------------------------------------------------
+# Parse several org files, in parallel if requested
+#-----------------------------------------------------------
+def load_trees(orgfiles, todostates, **kwargs):
+    """Create an 'OrgTree' for each org file.
 
-    def get_days_to_duedate(self):
-        """Update the active TODO dicts with the days left until the due date."""
-        for _, d in enumerate(self.active):
-            d['days'] = utils.days_until_due(d['date_one'])
-
-    #---------------------------------------------------------------------------
-    # Method for subsetting the active tasks based on CLI options
-    #---------------------------------------------------------------------------
-    def subset_by(self, type_):
-        todos = []
-        conds = {
-            'agenda': "d['days'] < " + str(self.properties['cli']['num_days']),
-            'states': "re.search(self.properties['cli']['states'], d['todostate'], re.IGNORECASE)",
-            'tags': "re.search(self.properties['cli']['tags'], d['tag'], re.IGNORECASE)"
-        }
-        if type_ == 'categories':
-            for _, d in enumerate(self.active):
-                if isinstance(d['category'], list):
-                    catstring = ' '.join(d['category'])
-                else:
-                    catstring = d['category']
-                if re.search(self.properties['cli']['categories'], catstring, re.IGNORECASE):
-                    todos.append(d)
-        else:
-            for _, d in enumerate(self.active):
-                if eval(conds[type_]):
-                    todos.append(d)
+    Files that are unchanged since they were cached are loaded directly. If
+    the 'jobs' option is larger than 1, the remaining files are parsed in a
+    pool of processes. The trees are returned in the same order as 'orgfiles'.
+    """
+    trees = [None] * len(orgfiles)
+    if kwargs.get('cache'):
+        trees = [OrgTree.from_cache(f, todostates, **kwargs) for f in orgfiles]
+    todo = [i for i, x in enumerate(trees) if x is None]
+
+    jobs = min(kwargs.get('jobs') or 1, len(todo))
+    if jobs > 1:
+        # The agenda is filtered here, after the (compact) trees are returned
+        # ('concurrent.futures' is slow to import, so only import it if needed)
+        from concurrent.futures import ProcessPoolExecutor
+        opts = dict(kwargs, agenda=False)
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = [pool.submit(_parse_tree, orgfiles[i], todostates, timings.enabled, **opts)
+                       for i in todo]
+            for i, future in zip(todo, futures):
+                trees[i], counters = future.result()
+                timings.merge(counters)
+                trees[i].properties['cli'] = kwargs
+                trees[i].subset()
+    else:
+        for i in todo:
+            trees[i] = OrgTree(orgfiles[i], todostates, **kwargs)
+
+    return trees
 
-        self.active = todos
+def _parse_tree(orgfile, todostates, timed, **kwargs):
+    """Create an 'OrgTree' in a worker process, and return it with the
+    timing counters (if 'timed')."""
+    if timed:
+        timings.enable()
+    try:
+        return OrgTree(orgfile, todostates, **kwargs), dict(timings.counters)
+    finally:
+        timings.disable()
 
 #-----------------------------------------------------------
 # Loop through all 'org' files listed in 'vimrc'
 #-----------------------------------------------------------
+def load_options(**kwargs):
+    """Return the options for loading the trees (see 'orgTreeFromFile')."""
+    opts = dict(kwargs, agenda=False)
+    if kwargs.get('cache'):
+        opts.update(states=None, tags=None, categories=None, properties=None, query=None)
+    return opts
+
+def load_all(orgfiles, todostates, **kwargs):
+    """Create an 'OrgTree' for each org file, reading the files concurrently
+    if the 'io_limit' option is set (e.g., on a network file system; see
+    'orgpy.aio'), or with 'load_trees' otherwise."""
+    if kwargs.get('io_limit'):
+        from . import aio
+        return aio.run(aio.load_trees(orgfiles, todostates, kwargs['io_limit'], **kwargs))
+    return load_trees(orgfiles, todostates, **kwargs)
+
+def get_config(**kwargs):
+    """Return the TODO states and the org files (the 'file' option, or the
+    agenda files in the 'rcfile')."""
+    with timings.stage('config'):
+        cfg = config.load(kwargs['rcfile'], kwargs.get('cache', True))
+        return cfg.todostates, cfg.agenda_files(kwargs['file'])
+
 def orgTreeFromFile(**kwargs):
     """Get list of org files and TODO states from vimrc, read them, and print."""
-    todostates = utils.get_todo_states(kwargs['rcfile'])
-    if kwargs['file']:
-        orgfiles = kwargs['file'].split()
-    else:
-        orgfiles = utils.get_org_files(kwargs['rcfile'])
-
-    # Loop through the org files
-    todolist = []
-    for f in orgfiles:
-        org = OrgTree(f, todostates, **kwargs)
-        todolist += org.active
+    if kwargs.get('format'):
+        with timings.stage('export'):
+            count = export_tasks(kwargs['format'], **kwargs)
+        timings.count('tasks matched', count)
+        return
 
+    if kwargs['colors']:
+        utils.init_colors()
+    todostates, orgfiles = get_config(**kwargs)
+    if kwargs.get('stream') and not kwargs['agenda']:
+        stream_todolist(orgfiles, todostates, **kwargs)
+        return
+
+    # Load the org files, and select the tasks of all of them at once with the
+    # query from the options (without the cache, the options are also used
+    # to skip parsing nodes that can't match)
+    query = Query.from_options(**kwargs)
+    with timings.stage('load'):
+        trees = load_all(orgfiles, todostates, **load_options(**kwargs))
+    with timings.stage('filter'):
+        todolist = TaskTable.from_trees(trees).select(query)
+    timings.count('tasks matched', len(todolist))
+
+    print_todolist(todolist, **kwargs)
+
+def print_todolist(todolist, colorized=None, **kwargs):
+    """Sort, colorize, and print the active tasks from all org files.
+
+    The tasks are modified in place, so pass copies if they are needed again
+    afterwards, unless 'colorized' is given: it is a dict of the colorized
+    copies of the tasks and their widths, keyed on the id of each task,
+    which is filled and reused when the tasks are printed again (except in
+    the agenda, which has copies of its own; see 'orgpy.batch').
+
+    The lines are written to the 'out' option (a file), or 'sys.stdout'.
+    """
     # Add dates even if there are no tasks, and add future deadlines for "today"
-    if kwargs['agenda']:
-        todolist = utils.update_agenda(todolist, **kwargs)
-    else:
-        todolist = sorted(todolist, key=lambda d: d['days'])
+    # (otherwise, overdue repeating tasks are listed at their next occurrence)
+    shared = colorized is not None and not kwargs['agenda']
+    with timings.stage('sort'):
+        if kwargs['agenda']:
+            todolist = utils.update_agenda(todolist, **kwargs)
+        else:
+            pairs = sorted(((next_occurrence(d), d) for d in todolist),
+                           key=lambda pair: pair[0]['days'])
+            todolist = [d for d, original in pairs]
+            keys = [id(original) for d, original in pairs]
+
+    # Find repeating dates (before the dates are colorized)
+    dates = [d['date_one'].strip() for d in todolist]
+    repeats = [i for i in range(1, len(dates)) if dates[i] == dates[i-1]]
 
-    # Colorize all tasks
+    # Colorize all tasks, keeping the widths of their plain text (the shared
+    # copies are keyed on the original tasks, which outlive them)
     if kwargs['colors']:
-        for d in todolist:
-            utils.colorize(d, **kwargs)
-
-    # Remove repeating dates
-    repeats = []
-    for i, d in enumerate(todolist):
-        d1 = const.regex['ansicolors'].sub('', todolist[i]['date_one'].strip())
-        d0 = const.regex['ansicolors'].sub('', todolist[i-1]['date_one'].strip())
-        if i > 0 and d1 == d0:
-            repeats.append(i)
-    for i in repeats:
-        todolist[i]['date_one'] = ''
-
-    # Print
-    if not todolist:
-        print("No tasks!")
+        with timings.stage('colorize'):
+            num_days = kwargs['num_days']
+            if shared:
+                todolist = list(todolist)
+                widths = []
+                for i, (d, key) in enumerate(zip(todolist, keys)):
+                    if key not in colorized:
+                        copy = d.copy()
+                        colorized[key] = (copy, utils.colorize(copy, num_days=num_days))
+                    todolist[i], w = colorized[key]
+                    widths.append(w)
+            else:
+                widths = [utils.colorize(d, num_days=num_days) for d in todolist]
     else:
-        utils.print_all(todolist, **kwargs)
+        widths = [render.plain_widths(d) for d in todolist]
+
+    # Remove repeating dates, and print
+    with timings.stage('print'):
+        for i in repeats:
+            if shared:
+                todolist[i] = todolist[i].copy()
+            todolist[i]['date_one'] = ''
+
+        if not todolist:
+            print("No tasks!", file=kwargs.get('out'))
+        else:
+            utils.print_all(todolist, widths, **kwargs)
+
+def stream_todolist(orgfiles, todostates, **kwargs):
+    """Print the tasks of each org file as soon as the file has been loaded.
+
+    The column widths are fixed ahead of time (see 'render.fixed_widths'),
+    and the tasks are sorted by date within each file (not across files).
+    If the 'max_rows' option is set, the remaining files aren't loaded once
+    there are more matching tasks than that, and a line with '...' marks the
+    tasks that weren't printed. The agenda can't be streamed, since it needs
+    the tasks from all files.
+    """
+    opts = load_options(**kwargs)
+    def trees():
+        for orgfile in orgfiles:
+            with timings.stage('load'):
+                tree = load_trees([orgfile], todostates, **opts)[0]
+            yield tree
+    stream_trees(trees(), todostates, **kwargs)
+
+def stream_trees(trees, todostates, copies=False, **kwargs):
+    """Print the tasks of each 'OrgTree' as soon as it is available (see
+    'stream_todolist'); 'trees' can be a generator that loads them.
+
+    The tasks are modified in place, unless 'copies' is True (e.g., for the
+    trees held in memory by the server).
+    """
+    writer = render.TaskWriter(render.fixed_widths(todostates, **kwargs), **kwargs)
+    writer.write(render.header(**kwargs))
+    query = Query.from_options(**kwargs)
+    max_rows = kwargs.get('max_rows')
+    count = 0
+    last = None
+    dropped = False
+    for tree in trees:
+        with timings.stage('filter'):
+            todolist = tree.select(query)
+        with timings.stage('sort'):
+            todolist = sorted(map(next_occurrence, todolist), key=lambda d: d['days'])
+        if max_rows is not None and len(todolist) > max_rows - count:
+            todolist = todolist[:max_rows - count]
+            dropped = True
+        if copies:
+            todolist = [d.copy() for d in todolist]
+        count += len(todolist)
+
+        dates = [last] + [d['date_one'].strip() for d in todolist]
+        if kwargs['colors']:
+            with timings.stage('colorize'):
+                num_days = kwargs['num_days']
+                widths = [utils.colorize(d, num_days=num_days) for d in todolist]
+        else:
+            widths = [render.plain_widths(d) for d in todolist]
+        with timings.stage('print'):
+            for i, d in enumerate(todolist):
+                if dates[i+1] == dates[i]:
+                    d['date_one'] = ''
+            writer.write(writer.rows(todolist, widths))
+        last = dates[-1]
+        if dropped:
+            writer.write(['...'])
+            break
+
+    timings.count('tasks matched', count)
+    if count == 0 and not dropped:
+        print("No tasks!", file=kwargs.get('out'))
+
+#-----------------------------------------------------------
+# Export the tasks as machine-readable records
+#-----------------------------------------------------------
+def iter_tasks(**kwargs):
+    """Yield a record (see 'export.record') for each task matching the CLI
+    options, one org file at a time.
+
+    A file that is unchanged since it was cached is loaded from the cache;
+    otherwise, it is read one node at a time (see 'OrgTree.iter_active')
+    and not cached, so even huge files take little memory. The records are
+    in the order of the tasks in each file. With the 'agenda' option, only
+    the tasks due within 'num_days' are kept.
+    """
+    from . import export
+    todostates, orgfiles = get_config(**kwargs)
+    opts = load_options(**kwargs)
+    query = Query.from_options(**kwargs)
+    for orgfile in orgfiles:
+        tree = OrgTree.from_cache(orgfile, todostates, **opts) if kwargs.get('cache') else None
+        if tree is not None:
+            tasks = tree.select(query)
+        else:
+            tree = OrgTree.__new__(OrgTree)
+            tree.init_properties(orgfile, todostates, **dict(kwargs, cache=False))
+            tasks = query.filter(_with_days(tree.iter_active()))
+
+        for d in tasks:
+            yield export.record(d, orgfile)
+
+def _with_days(tasks):
+    """Yield the tasks, with the days left until their due dates (as
+    'OrgTree.get_days_to_duedate' sets them)."""
+    today = const.today_ordinal
+    for d in tasks:
+        d['ordinal'] = utils.date_ordinal(d['date_one'])
+        d['days'] = d['ordinal'] - today
+        yield d
+
+def export_tasks(fmt='json', out=None, **kwargs):
+    """Write the tasks matching the CLI options as 'json', 'ndjson', or 'csv'
+    records (see 'iter_tasks' and 'export.write').
+
+    Returns:
+        The number of tasks written
+    """
+    from . import export
+    return export.write(iter_tasks(**kwargs), fmt, out)
@@ -1,71 +1,63 @@
-import re
-import copy
-import shutil
 from math import ceil
-from datetime import datetime, timedelta
+from functools import lru_cache
+from datetime import date, datetime
 
-from colorama import Style
-
-from . import const
+from . import const, render
+from .agenda import AgendaIndex
 
 def get_org_files(rcfile):
-    """Get a list of org files from a 'vimrc' file."""
-    with open(rcfile, 'r') as vimrc:
-        data = vimrc.read()
-    orgfiles = re.search(r'org_agenda_files\s=.*?\[.*?\]', data, re.DOTALL).group()
-    orgfiles = orgfiles.split('[')[1].split(', ')
-    orgfiles = [slugify(x) for x in orgfiles]
-
-    return orgfiles
+    """Get a list of org files from a 'vimrc' file (see 'config.load')."""
+    from . import config
+    return list(config.load(rcfile).agenda_files())
 
 def get_todo_states(rcfile):
     """Get the 'TODO' states/keywords from a 'vimrc' file.
 
     Returns a dictionary for both the 'in progress' and 'completed' states.
-    The values are regular expression pattern objects.
-
-    For example, you may have the following in your '.vimrc':
-
-        let g:org_todo_keywords =
-            \ ['TODO(t)', 'DOING(s)', 'WAIT(w)', '|',
-            \ 'DONE(d)', 'CANCELED(c)', 'DEFERRED(f)']
-
-    In this case, the 'in progress' states are matched by 'TODO|DOING|WAIT',
-    and similarly for the 'completed' states.
+    The values are regular expression pattern objects (see
+    'config.parse_todo_states').
     """
-    with open(rcfile, 'r') as vimrc:
-        data = vimrc.read()
-    todostates = re.search(r'org_todo_keywords\s=.*?\[.*?\]', data, re.DOTALL)
-
-    if todostates is None:
-        todostates = {
-            'in_progress': re.compile('TODO'),
-            'completed': re.compile('DONE')
-        }
-    else:
-        todostates = todostates.group()
-        todostates = re.sub(r'\([a-z]\)', '', todostates)
-        todostates = [x.strip(', ') for x in slugify(todostates.split('[')[1]).split('|')]
-        todostates = [re.compile(r'' + x.replace(', ', r'|') + r'') for x in todostates]
-        todostates = {
-            'in_progress': todostates[0],
-            'completed': todostates[1]
-        }
-
-    return todostates
+    from . import config
+    return config.load(rcfile).todostates
 
 #-------------------------------------------------------------------------------
 # Date-related functions
 #-------------------------------------------------------------------------------
+_ordinals = {}      # Memo tables, keyed on the date strings
+_day_names = {}
+
+def update_today():
+    """Reset today's date in 'const' (e.g., for a long-running server)."""
+    const.today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    const.today_date = '<' + const.today.strftime('%Y-%m-%d %a') + '>'
+    const.today_ordinal = const.today.toordinal()
+
+def date_ordinal(datestr):
+    """Return the ordinal (as in 'date.toordinal') of a date string.
+
+    The year, month, and day are read by their position, which is much faster
+    than 'strptime'. Since many tasks share a date, the result is memoized.
+
+    Args:
+        datestr (str): format should be '<%Y-%m-%d %a>' (the brackets and
+            any trailing newline are optional)
+    """
+    try:
+        return _ordinals[datestr]
+    except KeyError:
+        i = 1 if datestr[:1] in ('<', '[') else 0
+        ordinal = date(int(datestr[i:i+4]), int(datestr[i+5:i+7]),
+                       int(datestr[i+8:i+10])).toordinal()
+        _ordinals[datestr] = ordinal
+        return ordinal
+
 def days_until_due(duedate):
     """Calculate the (int) number of days left until a task's due date.
 
     Args:
         duedate (str): format should be '<%Y-%m-%d %a>' (including brackets)
     """
-    dt = datetime.strptime(slugify(duedate), '%Y-%m-%d %a')
-    timediff = dt - const.today
-    return timediff.days
+    return date_ordinal(duedate) - const.today_ordinal
 
 def day_names(str_):
     """Convert a date string to include full day name, padded.
@@ -80,10 +72,11 @@ def day_names(str_):
         added for padding the output.
     """
     match = const.regex['date'].search(str_).group()
-    repl = datetime.strptime(match, '<%Y-%m-%d %a>').strftime('%A %d %b').split()
-    repl = repl[0].ljust(10) + ' '.join(repl[1:])
-    tmp = re.sub(match, repl, str_)
-    return tmp
+    repl = _day_names.get(match)
+    if repl is None:
+        repl = date.fromordinal(date_ordinal(match)).strftime('%A %d %b').split()
+        repl = _day_names[match] = repl[0].ljust(10) + ' '.join(repl[1:])
+    return str_.replace(match, repl)
 
 #-------------------------------------------------------------------------------
 # String formatting functions
@@ -96,21 +89,56 @@ def slugify(str_):
 
     return str_
 
+_colors_initialized = False
+
+def init_colors():
+    """Initialize 'colorama' (once), resetting the style after each print."""
+    global _colors_initialized
+    if not _colors_initialized:
+        import colorama
+        colorama.init(autoreset=True)
+        _colors_initialized = True
+
 def format_inline(str_, reset='normal'):
     """Format a string if there is any markup present."""
-    if const.regex['url'].search(str_):
-        text = slugify(str_.split('[[')[1].split('][')[1].split(']]')[0])
-        str_ = const.regex['url'].sub(const.styles['url'] + text + const.styles[reset], str_)
-
-    for key, val in const.inline.items():
-        if val['pattern'].search(str_):
-            matches = val['pattern'].findall(str_)
-            repls = [val["cols"] + x.replace(val["delim"], "") + const.styles[reset]
-                        for x in matches]
-            for x, y in zip(matches, repls):
-                str_ = str_.replace(x, y)
+    return format_inline_width(str_, reset)[0]
 
-    return str_
+@lru_cache(maxsize=16384)
+def format_inline_width(str_, reset='normal'):
+    """Format a string's markup, and also return the width of its plain text.
+
+    The links and markup are found in one pass (see 'const.regex["markup"]');
+    each link is replaced by its description (or its target, if it has none),
+    and the delimiters of bold, code, and verbatim text are removed. The
+    width is counted as the markup is replaced, so the result doesn't need
+    to be stripped to measure it. The same headings are often formatted
+    again (e.g., by the server, or for repeated dates in the agenda), so the
+    results for the most recent strings are cached.
+
+    Args:
+        str_ (str): the text of a heading
+        reset (str): the key in 'const.styles' of the style after the markup
+
+    Returns:
+        A tuple with the formatted string and the width of its plain text
+    """
+    styles = const.styles
+    removed = 0
+
+    def replace(match):
+        nonlocal removed
+        kind, markup = match.lastgroup, match.group()
+        if kind == 'url':
+            text = slugify(markup[2:-2].split('][')[-1])
+            style = styles['url']
+        else:
+            text = markup[1:-1]
+            style = styles[const.inline[kind]['style']]
+        removed += len(markup) - len(text)
+        return style + text + styles[reset]
+
+    width = len(str_)
+    return const.regex['markup'].sub(replace, str_), width - removed
 
 #===============================================================================
 # Main function applying styles to a line's dict object
@@ -128,19 +156,25 @@ def colorize(dict_, **kwargs):
         - date_two ('Scheduled:', 'Deadline:', or 'In X d.:' for "agenda")
         - category
         - days (int.; the # of days from today to duedate)
+
+    Returns:
+        A tuple with the widths of the plain text of the padded columns (in
+        the order of 'render.columns'), so they don't need to be measured again
     """
     styles = const.styles
-    tagtype = 'tag'
-    if re.search('urgent', dict_['tag'], re.IGNORECASE):
-        tagtype = 'urgent'
+    tagtype = 'urgent' if 'urgent' in dict_['tag'].lower() else 'tag'
+
+    # The widths of the columns, in the order of 'render.columns'
+    widths = [len(dict_[k]) for k in render.columns]
 
     # Update "todostate" (2) element
     #-------------------------------------------------------
     state = dict_['todostate'].strip().lower()
     if state != '':
+        widths[0] = len(dict_['todostate'].strip())
         dict_.update(todostate=styles[state] + dict_['todostate'].strip() + styles['normal'])
         if dict_['days'] <= 0:
-            dict_.update(todostate=Style.BRIGHT + dict_['todostate'])
+            dict_.update(todostate=styles['bold'] + dict_['todostate'])
 
     # Update "date_two" (7) element
     #-------------------------------------------------------
@@ -179,12 +213,15 @@ def colorize(dict_, **kwargs):
     # Update "category" (8) and "text" (3) elements
     #-------------------------------------------------------
     if dict_['days'] > 0:
-        dict_.update(category=styles['category'] + dict_['category'],
-                     text=format_inline(dict_['text']))
+        text, widths[2] = format_inline_width(dict_['text'])
+        dict_.update(category=styles['category'] + dict_['category'], text=text)
     else:
-        dict_.update(text=styles[duedate] + format_inline(dict_['text'], dtype),
+        text, widths[2] = format_inline_width(dict_['text'], dtype)
+        dict_.update(text=styles[duedate] + text,
                      category=styles[duedate] + dict_['category'])
 
+    return tuple(widths)
+
 #===============================================================================
 # Function to update the line's dict for 'agenda' mode
 #===============================================================================
@@ -193,40 +230,10 @@ def update_agenda(list_, **kwargs):
 
     For days in which no task is due, a blank entry is added to the list.
     Furthermore, dates with a future Deadline are repeated so that they
-    appear with the current date's tasks (if any).
+    appear with the current date's tasks (if any). The tasks are looked up
+    by date in an 'AgendaIndex'.
     """
-    num_days = kwargs['num_days']
-    todolist = copy.deepcopy(list_)
-
-    # Pad output if there are late tasks or larger 'num_days' is requested
-    repeat_tasks = []
-    max_days = max([len(str(x['days'])) for x in todolist])
-    for i, d in enumerate(todolist):
-        if re.search('Deadline', d['date_two']):
-            day_str = str(d['days']).rjust(max_days+1)
-            if 0 < d['days'] < num_days:
-                d_copy = dict(d)
-                d_copy['date_one'] = const.regex['date'].sub(const.today_date, d['date_one'])
-                d_copy['date_two'] = ' In' + day_str + ' d.:'
-                repeat_tasks.append(d_copy)
-            elif d['days'] < 0:
-                todolist[i].update(date_one=const.today_date + '\n',
-                                   date_two=' In' + day_str + ' d.:')
-
-    todolist = todolist + repeat_tasks
-
-    # Add a blank entry for dates with no active tasks
-    for n in range(num_days):
-        d = (const.today + timedelta(n)).strftime('<%Y-%m-%d %a>')
-        if not any(re.search(d, item) for item in [x['date_one'] for x in todolist]):
-            blank_dict = {
-                'date_one': d,
-                'date_two': '', 'category': '', 'text': '', 'level': '',
-                'num_tasks': '', 'tag': '', 'todostate': '', 'days': days_until_due(d)
-            }
-            todolist.append(blank_dict)
-
-    todolist = sorted(todolist, key=lambda d: (d['date_one'], d['days']))
+    todolist = AgendaIndex(list_).agenda(kwargs['num_days'])
 
     # Change '<%Y-%m-%d %a>' to '%A %d %b' for all entries
     for i, d in enumerate(todolist):
@@ -239,129 +246,41 @@ def update_agenda(list_, **kwargs):
 
     return todolist
 
-#-------------------------------------------------------------------------------
-# Main function concerned with parsing each task line/groups of lines
-#-------------------------------------------------------------------------------
-def get_parse_string(todostates):
-    """Calculate the correct regex pattern for parsing an entire org line.
-
-    Depends on the set of TODO "states"/keywords present in the files.
-
-    Returns:
-        A "re" pattern object (compiled) which can be matched into a dictionary
-        with keys:
-        - level     (the number of leading asterisks, e.g. "***")
-        - todostate (one of "TODO", "DONE", etc.)
-        - text      (the text of the task)
-        - num_tasks (a box for tasks with multiple sub-tasks, e.g. "[2/5]")
-        - date_one  (the date string, e.g. "Saturday  27 Feb";
-                     can be blank if multiple tasks are due for a given date)
-        - tag       (tags surrounded by ":", if present; e.g. ":work:urgent:")
-        - date_two  (either the number of days until duedate, e.g. "In 5 d.:",
-                     or "Deadline:" or "Scheduled:" with the date in format
-                     "<%Y-%m-%d %a>")
-    """
-    # TODO The following gets *all* content between 2 consecutive headings/sets of asterisks
-    # Should use this, in some way, to e.g. look for the date on line 2
-    #all_content = re.findall(r'(?P<all>\*{1,9}.*?)(?:\n\*)', org.data, re.DOTALL)
-    # TODO
-
-    level_string = r'(?P<level>\*{1,9}|[^\S\n ]{1,9}-)'#\h{1,9}-)'
-    todos = [x.pattern.split('|') for x in todostates.values()]
-    todos = [item for sublist in todos for item in sublist]
-    todos = [r'\s' + x + r'\s' for x in todos]
-    todostate_string = r'(?P<todostate>(' + r'|'.join(todos) + r')|)'
-    headerText_string = r'(?P<text>.*?)'
-    numTasks_string = r'(?P<num_tasks>\s*\[\d+/\d+\]|)'
-    date1 = r'(?P<date_one>' + const.date_str + '|)'
-    tag_string = r'(?P<tag>[ \t]*:[\w:]*:)*'
-    date2 = r'(?P<date_two>\n\s+[A-Z]+:\s' + const.date_str + r'(?:\n|$)|(?:\n|$))'
-    line_string = level_string + todostate_string + headerText_string \
-            + numTasks_string + date1 + tag_string + date2
-    pattern_line = re.compile(line_string, re.MULTILINE)
-
-    return pattern_line
-
 #===============================================================================
 # Print functions
 #===============================================================================
 def print_delim(n=30):
     """Print a line of blue '#' symbols."""
-    print('\t\t' + const.styles['url'] + n*'#')
+    print(render.delim(n))
 
 def print_header(**kwargs):
     """Print a colorful, informative header."""
-    styles = const.styles
-    if kwargs['colors']:
-        print_delim(40)
-        if kwargs['agenda']:
-            if kwargs['num_days'] == 7:
-                print('\t\t\t      {}WEEK AGENDA{}'.format(styles['checkbox'], styles['normal']))
-            else:
-                print('\t\t\t     {}{} DAY AGENDA{}'.format(styles['checkbox'], kwargs['num_days'], styles['normal']))
-        elif kwargs['tags']:
-            print('\t\t    {}Headlines with {}TAGS {}match: {}{}'.format(
-                styles['checkbox'],
-                styles['tag'],
-                styles['checkbox'],
-                styles['late'],
-                kwargs['tags']))
-        elif kwargs['categories']:
-            print('\t\t {}Headlines with {}CATEGORY {}match: {}{}'.format(
-                styles['checkbox'],
-                styles['tag'],
-                styles['checkbox'],
-                styles['late'],
-                kwargs['categories']))
-
-        # All dates and tags
-        else:
-            if kwargs['states']:
-                state = styles[kwargs['states'].lower()] + kwargs['states'].upper()
-            else:
-                state = styles['late'] + 'ALL'
-            statelen = len(const.regex['ansicolors'].sub('', state))
-            print('\t\t' + styles['checkbox'] + ' '*(5 - statelen) + 'Global list of ' \
-                  + styles['todo'] + 'TODO' + styles['checkbox'] + ' items of type: ' + state)
-
-        print_delim(40)
-
-def print_all(list_, **kwargs):
-    """Print the todo list lines, padding the columns."""
-    #TODO can I use the terminal width in some way? Maybe if truncation is needed
-    termwidth = shutil.get_terminal_size()[0]
-    print_header(**kwargs)
-
-    # Most of the rest of the function is an ugly hack to make sure everything
-    # is aligned whether ANSI color sequences are present or not
-    tag_lens = []; state_lens = []; text_lens = []; check_lens = []; cat_lens = []; date2_lens = []
-    for _, d in enumerate(list_):
-        state_lens.append(len(const.regex['ansicolors'].sub('', d['todostate'])))
-        cat_lens.append(len(const.regex['ansicolors'].sub('', d['category'])))
-        text_lens.append(len(const.regex['ansicolors'].sub('', d['text'])))
-        check_lens.append(len(const.regex['ansicolors'].sub('', d['num_tasks'])))
-        tag_lens.append(len(const.regex['ansicolors'].sub('', d['tag'])))
-        date2_lens.append(len(const.regex['ansicolors'].sub('', d['date_two'])))
-
-    longest_state = max(state_lens)
-    if kwargs['agenda']:
-        maxdatelen = 16     # Date string includes full day name
+    for line in render.header(**kwargs):
+        print(line)
+
+def print_all(list_, widths=None, **kwargs):
+    """Print the todo list lines, padding the columns (with a single write).
+
+    Args:
+        list_ (list): the tasks
+        widths (list): the plain widths of each task's columns, as returned by
+            'colorize' (by default, the tasks shouldn't be colorized)
+        **kwargs: dictionary containing the command-line arguments
+    """
+    #TODO can I use the terminal width ('shutil.get_terminal_size') in some way?
+    # Maybe if truncation is needed
+    if widths is None:
+        widths = [render.plain_widths(d) for d in list_]
+    lines = render.header(**kwargs)
+    max_rows = kwargs.get('max_rows')
+    if max_rows is not None and len(list_) > max_rows:
+        hidden = len(list_) - max_rows
+        list_, widths = list_[:max_rows], widths[:max_rows]
     else:
-        maxdatelen = 14
-    longest_cat = max(maxdatelen, max(cat_lens))
-    longest_text = max(text_lens)
-    longest_check = max(check_lens)
-    longest_tag = max(tag_lens)
-    longest_date = max(date2_lens)
-
-    for i, d in enumerate(list_):
-        d['date_one'] = re.sub('<|>', '', d['date_one'])
-        d['category'] = d['category'] + ' '*(longest_cat + 1 - cat_lens[i])
-        d['date_two'] = ' '*(longest_date + 1 - date2_lens[i]) + d['date_two']
-        d['todostate'] = d['todostate'] + ' '*(longest_state + 2 - state_lens[i])
-        d['num_tasks'] = d['num_tasks'] + ' '*(longest_text + 1 - text_lens[i]) \
-            + ' '*(longest_check + 1 - check_lens[i])
-        d['tag'] = d['tag'] + ' '*(longest_tag + 1 - tag_lens[i])
-        #print(re.sub('<|>', '', d['date_one']) + '  ' + d['category'] \
-        #      + d['date_two'] + '  ' + d['todostate'] + ' ' + d['text'] + d['num_tasks'] + d['tag'])
-        print('{date_one} {category}{date_two} {todostate}{text}{num_tasks}{tag}'.format(**d))
+        hidden = 0
+
+    writer = render.TaskWriter(render.table_widths(widths, kwargs['agenda']), **kwargs)
+    lines += writer.rows(list_, widths)
+    if hidden:
+        lines.append('... and %i more (see --max-rows)' % hidden)
+    writer.write(lines)
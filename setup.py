@@ -17,8 +17,9 @@ setup(
         'Operating System :: POSIX :: Linux',
     ],
     license = 'Apache 2.0',
-    packages = find_packages(),
+    packages = find_packages(exclude=['benchmarks', 'benchmarks.*', 'tests', 'tests.*']),
     keywords = ['orgmode'],
     install_requires = ['setuptools', 'argparse', 'colorama', 'copy', 'datetime', 'io', 'os', 're', 'shutil', 'sys'],
+    extras_require = {'inotify': ['inotify_simple'], 'numpy': ['numpy']},
     python_requires = '>=3.6',
 )
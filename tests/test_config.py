@@ -0,0 +1,44 @@
+"""
+Tests for reading the vim-orgmode settings ('orgpy.config').
+"""
+import pytest
+
+from orgpy import config
+
+KEYWORDS = "let g:org_todo_keywords = ['TODO', 'DOING', '|', 'DONE']\n"
+
+def test_agenda_files():
+    cfg = config.parse("let g:org_agenda_files = ['~/a.org', '~/b.org']\n" + KEYWORDS)
+    assert cfg.agenda_files() == ['~/a.org', '~/b.org']
+    assert cfg.agenda_files('/tmp/c.org /tmp/d.org') == ['/tmp/c.org', '/tmp/d.org']
+
+def test_agenda_files_not_set_with_file():
+    # A vimrc with only the TODO keywords works with '-f'
+    cfg = config.parse(KEYWORDS, 'vimrc')
+    assert cfg.todostates['in_progress'].pattern == 'TODO|DOING'
+    assert cfg.agenda_files('/tmp/todo.org') == ['/tmp/todo.org']
+    with pytest.raises(config.ConfigError, match='is not set'):
+        cfg.agenda_files()
+
+def test_agenda_files_empty():
+    cfg = config.parse("let g:org_agenda_files = []\n" + KEYWORDS)
+    with pytest.raises(config.ConfigError, match='is empty'):
+        cfg.agenda_files()
+
+def test_invalid_keywords():
+    with pytest.raises(config.ConfigError):
+        config.parse("let g:org_todo_keywords = ['TODO', '|']\n")
+
+def test_missing_rcfile(tmp_path):
+    with pytest.raises(config.ConfigError, match='No such file'):
+        config.load(str(tmp_path / 'vimrc'), use_cache=False)
+
+def test_unreadable_rcfile(tmp_path, monkeypatch):
+    # The file can be removed (or made unreadable) after it was found
+    rcfile = tmp_path / 'vimrc'
+    rcfile.write_text(KEYWORDS)
+    def fail(*args, **kwargs):
+        raise PermissionError(13, 'Permission denied')
+    monkeypatch.setattr('builtins.open', fail)
+    with pytest.raises(config.ConfigError, match='Permission denied'):
+        config.load(str(rcfile), use_cache=False)
@@ -0,0 +1,48 @@
+"""
+Tests for writing tasks as records ('orgpy.export').
+"""
+import io
+import json
+from datetime import date
+
+from orgpy import const, export
+from orgpy.task import Task
+
+def make_task(**kwargs):
+    fields = dict(level='**', todostate=' TODO ', text='Call the dentist ',
+                  date_one='<2021-03-08 Mon>\n', tag='\t:health:urgent:',
+                  date_two=' Deadline:', category='Personal',
+                  ordinal=date(2021, 3, 8).toordinal())
+    fields.update(kwargs)
+    return Task(**fields)
+
+def test_record():
+    rec = export.record(make_task(), '/tmp/todo.org')
+    assert list(rec) == list(export.fields)
+    assert rec['level'] == 2
+    assert rec['state'] == 'TODO'
+    assert rec['tags'] == ['health', 'urgent']
+    assert rec['date'] == '2021-03-08'
+    assert rec['type'] == 'deadline'
+    assert rec['days'] == date(2021, 3, 8).toordinal() - const.today_ordinal
+
+def test_record_text_is_stripped():
+    # The tokenizer keeps the spaces around the text, e.g. before the tags
+    assert export.record(make_task(), 'todo.org')['text'] == 'Call the dentist'
+    rec = export.record(make_task(level='\t-', todostate='', text=' Buy milk'), 'todo.org')
+    assert rec['level'] == 0
+    assert rec['text'] == 'Buy milk'
+
+def test_write_formats():
+    records = [export.record(make_task(), 'todo.org')]
+    out = io.StringIO()
+    assert export.write(iter(records), 'ndjson', out) == 1
+    assert json.loads(out.getvalue()) == records[0]
+    out = io.StringIO()
+    assert export.write(iter(records), 'csv', out) == 1
+    header, row = out.getvalue().splitlines()
+    assert header == ','.join(export.fields)
+    assert row.startswith('todo.org,2,TODO,Call the dentist,Personal,health:urgent,')
+    out = io.StringIO()
+    assert export.write(iter([]), 'json', out) == 0
+    assert out.getvalue() == '[]\n'
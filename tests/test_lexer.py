@@ -0,0 +1,48 @@
+"""
+Tests for the line tokenizer ('orgpy.lexer').
+"""
+import re
+
+from orgpy import lexer
+
+KEYWORDS = lexer.get_keywords({'in_progress': re.compile('TODO|DOING'),
+                               'completed': re.compile('DONE')})
+
+def tokenize(text):
+    return list(lexer.tokenize(text.splitlines(), KEYWORDS))
+
+def test_heading():
+    task, = tokenize('** TODO Call the dentist <2021-03-08 Mon>\t:health:')
+    assert task['level'] == '**'
+    assert task['todostate'] == ' TODO '
+    assert task['text'] == 'Call the dentist '
+    assert task['date_one'] == '<2021-03-08 Mon>\n'
+    assert task['tag'] == '\t:health:'
+
+def test_num_tasks():
+    task, = tokenize('* DOING Plan the trip [1/2]')
+    assert task['text'] == 'Plan the trip'
+    assert task['num_tasks'] == ' [1/2]'
+
+def test_keyword_without_title():
+    # The keyword ends the line, and the date is on the planning line
+    task, = tokenize('** TODO\n   DEADLINE: <2021-03-08 Mon>')
+    assert task['todostate'] == ' TODO '
+    assert task['text'] == ''
+    assert task['date_one'] == '<2021-03-08 Mon>\n'
+    assert task['date_two'] == ' Deadline:'
+
+def test_keyword_prefix():
+    task, = tokenize('* TODOS for today')
+    assert task['todostate'] == ''
+    assert task['text'] == ' TODOS for today'
+
+def test_list_items_indented_with_tabs():
+    tasks = tokenize('* Top\n'
+                     '\t- TODO tab item <2021-03-08 Mon>\n'
+                     '  - TODO space item <2021-03-09 Tue>\n'
+                     '\t+ TODO plus item <2021-03-10 Wed>\n'
+                     '- TODO top-level item <2021-03-11 Thu>')
+    assert [d['text'] for d in tasks] == [' Top', 'tab item ']
+    assert tasks[1]['level'] == '\t-'
+    assert tasks[1]['todostate'] == ' TODO '
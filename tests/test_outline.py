@@ -0,0 +1,55 @@
+"""
+Tests for the inherited tags and categories of the outline ('orgpy.outline').
+"""
+import re
+
+from orgpy import lexer
+from orgpy.outline import Outline
+from orgpy.prefilter import NodeFilter
+
+KEYWORDS = lexer.get_keywords({'in_progress': re.compile('TODO'),
+                               'completed': re.compile('DONE')})
+
+LINES = """\
+* Project\t:urgent:work:
+  :PROPERTIES:
+  :CATEGORY: proj5
+  :END:
+** TODO Plan\t:urgent:tag3:
+*** Sub
+    :PROPERTIES:
+    :CATEGORY: proj3
+    :END:
+**** TODO Order parts\t:tag7:urgent:
+\t- Call the shop
+** TODO Review
+* TODO Other""".splitlines()
+
+def parse(lines, category='Synth1'):
+    outline = Outline(category)
+    tasks = list(lexer.tokenize(lines, KEYWORDS, outline))
+    outline.close()
+    return {d['text'].strip(): d for d in tasks}
+
+def test_tags_are_distinct():
+    tasks = parse(LINES)
+    assert tasks['Plan']['tag'] == ':urgent:tag3:work:'
+    assert tasks['Order parts']['tag'] == ':tag7:urgent:tag3:work:'
+    assert tasks['Call the shop']['tag'] == ':tag7:urgent:tag3:work:'
+    assert tasks['Review']['tag'] == ':urgent:work:'
+    assert tasks['Other']['tag'] == ''
+
+def test_nearest_category():
+    tasks = parse(LINES)
+    assert tasks['Plan']['category'] == 'Synth1: Proj5'
+    assert tasks['Order parts']['category'] == 'Synth1: Proj3'
+    assert tasks['Call the shop']['category'] == 'Synth1: Proj3'
+    assert tasks['Review']['category'] == 'Synth1: Proj5'
+    assert tasks['Other']['category'] == 'Synth1'
+    assert parse(LINES, '')['Order parts']['category'] == 'Proj3'
+
+def test_prefilter_category():
+    # Only the sections with the category (and their ancestors) are kept
+    kept = NodeFilter(categories='^Synth1: Proj3$').prune(LINES, 'Synth1')
+    assert list(parse(kept)) == ['Project', 'Plan', 'Sub', 'Order parts', 'Call the shop']
+    assert NodeFilter(categories='Proj5: Proj3').prune(LINES, 'Synth1') == []
@@ -0,0 +1,21 @@
+"""
+Tests for the conditions on drawer properties ('orgpy.properties').
+"""
+import pytest
+
+from orgpy import properties
+
+def test_condition():
+    name, check = properties.condition('EFFORT>=1:30')
+    assert name == 'effort'
+    assert check('2h') and check('1:30') and not check('45min')
+    assert not check(None)
+
+    name, check = properties.condition('OWNER')
+    assert check('alice') and not check(None)
+    assert properties.condition('OWNER!=alice')[1](None)
+
+@pytest.mark.parametrize('text', ['EFFORT>', 'OWNER=', 'EFFORT >=  ', '=alice', ''])
+def test_invalid_condition(text):
+    with pytest.raises(ValueError):
+        properties.condition(text)
@@ -0,0 +1,68 @@
+"""
+Tests for repeating dates ('orgpy.repeat', and their use in 'orgpy.agenda').
+"""
+from datetime import date, timedelta
+
+from orgpy import const, repeat
+from orgpy.agenda import AgendaIndex, next_occurrence
+from orgpy.task import Task
+
+DAY = date(2021, 3, 8).toordinal()
+
+def test_repeater():
+    assert repeat.repeater('<2021-03-08 Mon +1w>') == ('+', 1, 'w')
+    assert repeat.repeater('<2021-03-08 Mon .+2y -1m>') == ('.+', 2, 'y')
+    assert repeat.repeater('<2021-03-08 Mon>') is None
+    assert repeat.warning('<2021-03-08 Mon +1m -3d>') == 3
+
+def test_daily_and_weekly():
+    assert list(repeat.occurrences(DAY, ('+', 3, 'd'), DAY, DAY + 10)) == [
+        DAY + 3, DAY + 6, DAY + 9]
+    assert list(repeat.occurrences(DAY, ('+', 1, 'w'), DAY + 100, DAY + 110)) == [
+        DAY + 105]
+
+def test_monthly():
+    day = date(2021, 1, 31).toordinal()
+    got = repeat.occurrences(day, ('+', 1, 'm'), day, date(2021, 5, 1).toordinal())
+    assert [date.fromordinal(x) for x in got] == [
+        date(2021, 2, 28), date(2021, 3, 31), date(2021, 4, 30)]
+
+def test_hourly():
+    # Every day after the date has an occurrence if the interval is a day or less
+    assert repeat.repeater('<2021-03-08 Mon +5h>') == ('+', 5, 'h')
+    assert list(repeat.occurrences(DAY, ('+', 5, 'h'), DAY, DAY + 3)) == [DAY + 1, DAY + 2]
+    assert list(repeat.occurrences(DAY, ('+', 5, 'h'), DAY + 1000, DAY + 1002)) == [
+        DAY + 1000, DAY + 1001]
+    # 36 hours after midnight is noon the next day, then midnight two days after that
+    assert list(repeat.occurrences(DAY, ('+', 36, 'h'), DAY, DAY + 8)) == [
+        DAY + 1, DAY + 3, DAY + 4, DAY + 6, DAY + 7]
+    assert list(repeat.occurrences(DAY, ('+', 120, 'h'), DAY + 1, DAY + 12)) == [
+        DAY + 5, DAY + 10]
+
+def test_next_occurrence():
+    assert repeat.next_occurrence(DAY, ('+', 1, 'w'), DAY + 10) == DAY + 14
+    assert repeat.next_occurrence(DAY, ('+', 1, 'w'), DAY + 14) == DAY + 14
+    day = date(2021, 1, 31).toordinal()
+    assert repeat.next_occurrence(day, ('+', 1, 'm'), day + 1) == date(2021, 2, 28).toordinal()
+    assert repeat.next_occurrence(DAY, ('+', 0, 'd'), DAY + 1) is None
+
+def make_task(days, repeater=''):
+    day = const.today + timedelta(days)
+    return Task(todostate=' TODO ', text='Review', category='Work',
+                date_one=day.strftime('<%Y-%m-%d %a' + repeater + '>\n'),
+                date_two=' Scheduled:', ordinal=const.today_ordinal + days, days=days)
+
+def test_agenda_past_repeater():
+    # A weekly task dated 6 days ago recurs tomorrow and in 8 days, and is
+    # no longer shown as overdue on its own date
+    todolist = AgendaIndex([make_task(-6, ' +1w')]).agenda(num_days=14)
+    assert [d['days'] for d in todolist if d['text']] == [1, 8]
+    assert next_occurrence(make_task(-6, ' +1w'))['days'] == 1
+
+    # Without an occurrence within the agenda's days, it stays overdue
+    todolist = AgendaIndex([make_task(-6, ' +1m')]).agenda(num_days=7)
+    assert [d['days'] for d in todolist if d['text']] == [-6]
+
+    # Other tasks are unchanged
+    task = make_task(-6)
+    assert next_occurrence(task) is task
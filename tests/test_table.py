@@ -0,0 +1,42 @@
+"""
+Tests for filtering with a columnar table ('orgpy.table').
+"""
+import random
+
+import pytest
+
+from orgpy import table
+from orgpy.index import TaskIndex
+from orgpy.query import Query
+from orgpy.table import TaskTable
+from orgpy.task import Task
+
+QUERIES = ['state:TODO', 'tag:work -tag:urgent', 'category:proj days<7', 'days>=0 -days>20',
+           'property:EFFORT>=1:00', '-property:EFFORT<1:00 state:WAIT', '-category:home', '']
+
+def make_tasks(n, seed):
+    rand = random.Random(seed)
+    return [Task(level='**', todostate=rand.choice([' TODO ', ' WAIT ']), text='Task %d' % i,
+                 tag=rand.choice(['', ':work:', ':work:urgent:', ':home:']),
+                 category=rand.choice(['Home', 'Proj1', 'Proj2']), days=rand.randint(-10, 30),
+                 properties=rand.choice([{}, {'effort': '0:30'}, {'effort': '2:00'}]))
+            for i in range(n)]
+
+@pytest.fixture(params=['numpy', 'pure'])
+def numpy(request, monkeypatch):
+    if request.param == 'pure':
+        monkeypatch.setattr(table, 'np', None)
+    elif table.np is None:
+        pytest.skip('NumPy is not installed')
+
+@pytest.mark.parametrize('text', QUERIES)
+def test_select(numpy, text):
+    parts = [make_tasks(300, seed) for seed in range(3)]
+    tasks = [d for part in parts for d in part]
+    query = Query.parse(text)
+    expected = [d for d in tasks if query(d)]
+    assert TaskTable(tasks).select(query) == expected
+    tab = TaskTable(None, [(part, TaskIndex(part)) for part in parts])
+    assert tab.select(query) == expected
+    # Again, with the columns already built
+    assert tab.select(query) == expected
@@ -0,0 +1,21 @@
+"""
+Tests for the timings and counters ('orgpy.timings').
+"""
+import re
+
+from orgpy import const, lexer, repeat, timings
+
+def test_patterns_are_restored():
+    search, date, planning = re.search, const.regex['date'], lexer._planning
+    timings.enable()
+    try:
+        assert re.search is search
+        assert lexer._planning is not planning
+        assert repeat.repeater('<2021-03-08 Mon +7d>') == ('+', 7, 'd')
+        assert const.regex['date'].search('<2021-03-08 Mon>')
+        assert timings.counters['regex calls'] >= 1
+    finally:
+        timings.disable()
+    assert const.regex['date'] is date
+    assert lexer._planning is planning
+    assert not timings.enabled